@@ -6,7 +6,6 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import seaborn as sns
-import hashlib
 import json
 import os
 import smtplib
@@ -15,12 +14,78 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from io import BytesIO
 import warnings
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestClassifier
-import pickle
-from pathlib import Path
 import base64
 
+from edutrack_core import (
+    MARKSHEET_FILE_TYPES,
+    STREAM_CHUNK_ROWS,
+    build_course_results,
+    create_default_copo_mapping,
+    copo_mapping_frame,
+    detect_co_columns,
+    validate_copo_mapping,
+    get_grade_description,
+    iter_excel_chunks,
+    list_workbook_sheets,
+    process_workbook_batch,
+    read_excel_preview,
+    read_marksheet,
+    validate_marksheet,
+    validate_marksheet_chunks,
+    persist_course_data,
+    load_student_data,
+    load_course_catalog,
+    get_student_cgpa_data,
+    upload_cache_key,
+    load_cached_results,
+    store_cached_results,
+    get_saved_upload_key,
+    load_course_results,
+    apply_delta_results,
+    active_storage_backend,
+    migrate_pickles_to_parquet,
+    migrate_pickles_to_sqlite,
+    hash_password,
+    default_users,
+    load_user_directory,
+    save_user_directory,
+    active_user_backend,
+    find_user,
+    add_user,
+    remove_user,
+    list_users,
+    count_users_by_type,
+    migrate_users_to_sqlite,
+    provision_course_accounts,
+    load_grade_scales,
+    get_active_grade_scale,
+    set_active_grade_scale,
+    save_grade_scale,
+    regrade_semester,
+    DEFAULT_CREDIT_HOURS,
+    load_program_rollup,
+    rebuild_program_rollup,
+    program_attainment_table,
+    program_course_contributions,
+    CO_ATTAINMENT_METHODS,
+    DEFAULT_ATTAINMENT_CONFIG,
+    normalize_attainment_config,
+    recompute_stored_attainment,
+    semester_sort_key,
+    load_student_transcript,
+    MERIT_LIST_MIN_CGPA,
+    PROBATION_CGPA,
+    compute_cohort_standings,
+    merit_list,
+    probation_list,
+    student_standing,
+    student_batches,
+    load_prediction_models,
+    list_prediction_models,
+    train_prediction_models,
+    activate_prediction_models
+)
+
 warnings.filterwarnings('ignore')
 
 # ==============================================================================
@@ -70,6 +135,10 @@ if 'selected_course' not in st.session_state:
     st.session_state.selected_course = ""
 if 'co_po_mapping' not in st.session_state:
     st.session_state.co_po_mapping = None
+if 'credit_hours' not in st.session_state:
+    st.session_state.credit_hours = DEFAULT_CREDIT_HOURS
+if 'attainment_config' not in st.session_state:
+    st.session_state.attainment_config = dict(DEFAULT_ATTAINMENT_CONFIG)
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "dashboard"
 if 'all_semester_data' not in st.session_state:
@@ -101,6 +170,10 @@ def force_reset():
     if os.path.exists("users.json"):
         os.remove("users.json")
 
+    for users_db in ("users.db", "users.db-wal", "users.db-shm"):
+        if os.path.exists(users_db):
+            os.remove(users_db)
+
     if os.path.exists("course_data"):
         shutil.rmtree("course_data")
 
@@ -546,129 +619,38 @@ def show_baete_copo_framework():
 # ==============================================================================
 def load_users():
     """Load user data from JSON file or create default users"""
-    default_users = {
-        "admins": {
-            "admin": {
-                "username": "admin",
-                "password": hash_password("admin123"),
-                "email": "admin@stamford.edu.bd",
-                "full_name": "System Administrator",
-                "department": "IT & Administration",
-                "designation": "System Admin",
-                "user_type": "admin"
-            }
-        },
-        "teachers": {
-            "teacher": {
-                "username": "teacher",
-                "password": hash_password("teacher123"),
-                "email": "teacher@stamford.edu.bd",
-                "full_name": "Dr. Dilshad Mahajabeen",
-                "department": "Electrical & Electronic Engineering",
-                "designation": "Professor & Chairman",
-                "user_type": "teacher"
-            }
-        },
-        "students": {
-            "student": {
-                "username": "student",
-                "password": hash_password("student123"),
-                "email": "student@stamford.edu.bd",
-                "full_name": "John Smith",
-                "student_id": "2021001",
-                "batch": "2021",
-                "guardian_email": "parent@email.com",
-                "user_type": "student"
-            },
-            "fahmida": {
-                "username": "fahmida",
-                "password": hash_password("fahmida123"),
-                "email": "fahmida@stamford.edu.bd",
-                "full_name": "Fahmida Islam",
-                "student_id": "2021002",
-                "batch": "2021",
-                "guardian_email": "parent2@email.com",
-                "user_type": "student"
-            },
-            "rowshan": {
-                "username": "rowshan",
-                "password": hash_password("rowshan123"),
-                "email": "rowshan@stamford.edu.bd",
-                "full_name": "Rowshan-E- Gule Jannat",
-                "student_id": "2021003",
-                "batch": "2021",
-                "guardian_email": "parent3@email.com",
-                "user_type": "student"
-            },
-            "sawkat": {
-                "username": "sawkat",
-                "password": hash_password("sawkat123"),
-                "email": "sawkat@stamford.edu.bd",
-                "full_name": "Sawkat Islam",
-                "student_id": "2021004",
-                "batch": "2021",
-                "guardian_email": "parent4@email.com",
-                "user_type": "student"
-            }
-        },
-        "parents": {
-            "parent": {
-                "username": "parent",
-                "password": hash_password("parent123"),
-                "email": "parent@email.com",
-                "full_name": "Sarah Johnson",
-                "student_linked": "2021001",
-                "user_type": "parent"
-            }
-        }
-    }
-
     try:
-        if os.path.exists("users.json"):
-            with open("users.json", 'r') as f:
-                return json.load(f)
+        return load_user_directory()
     except Exception as e:
         st.warning(f"Could not load user file: {e}")
 
-    return default_users
-
-
-def hash_password(password):
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    return default_users()
 
 
 def authenticate_user(username, password, user_type):
     """Authenticate user credentials"""
-    users = load_users()
-
-    # Admin can login with any type if admin credentials are correct
-    if user_type == "admin" or st.session_state.get('admin_mode', False):
-        if "admins" in users and username in users["admins"]:
-            stored_hash = users["admins"][username]["password"]
-            if hash_password(password) == stored_hash:
-                return True, users["admins"][username]
-
-    # Regular user authentication
-    user_category = user_type + "s"
-
-    if user_category in users and username in users[user_category]:
-        stored_hash = users[user_category][username]["password"]
-        if hash_password(password) == stored_hash:
-            return True, users[user_category][username]
+    try:
+        # Admin can login with any type if admin credentials are correct
+        if user_type == "admin" or st.session_state.get('admin_mode', False):
+            admin = find_user("admins", username)
+            if admin and hash_password(password) == admin["password"]:
+                return True, admin
+
+        # Regular user authentication
+        user = find_user(user_type + "s", username)
+        if user and hash_password(password) == user["password"]:
+            return True, user
+    except Exception as e:
+        st.warning(f"Could not load user file: {e}")
 
     return False, None
 
 
 def register_user(username, password, user_type, full_name, email, **kwargs):
     """Register new user"""
-    users = load_users()
     user_category = user_type + "s"
 
-    if user_category not in users:
-        users[user_category] = {}
-
-    if username in users[user_category]:
+    if find_user(user_category, username) is not None:
         return False, "Username already exists"
 
     user_data = {
@@ -701,11 +683,10 @@ def register_user(username, password, user_type, full_name, email, **kwargs):
             "designation": kwargs.get("designation", "System Administrator")
         })
 
-    users[user_category][username] = user_data
-
     try:
-        with open("users.json", 'w') as f:
-            json.dump(users, f, indent=4)
+        # Another session may have taken the username since the check above
+        if not add_user(user_category, username, user_data):
+            return False, "Username already exists"
         return True, "Registration successful"
     except Exception as e:
         return False, f"Registration failed: {str(e)}"
@@ -713,40 +694,34 @@ def register_user(username, password, user_type, full_name, email, **kwargs):
 
 def delete_user(username, user_type):
     """Delete user from system"""
-    users = load_users()
-    user_category = user_type + "s"
-
-    if user_category in users and username in users[user_category]:
-        del users[user_category][username]
-
-        try:
-            with open("users.json", 'w') as f:
-                json.dump(users, f, indent=4)
+    try:
+        if remove_user(user_type + "s", username):
             return True, f"User {username} deleted successfully"
-        except Exception as e:
-            return False, f"Error deleting user: {str(e)}"
+    except Exception as e:
+        return False, f"Error deleting user: {str(e)}"
 
     return False, "User not found"
 
 
-def get_all_users():
-    """Get all users from system"""
-    users = load_users()
+USERS_PAGE_SIZE = 50
+
+
+def get_all_users(offset=0, limit=None):
+    """One page of user accounts (all of them when no limit is given) as a DataFrame"""
     all_users = []
 
-    for category, user_dict in users.items():
-        for username, user_data in user_dict.items():
-            all_users.append({
-                "username": username,
-                "full_name": user_data.get("full_name", ""),
-                "email": user_data.get("email", ""),
-                "user_type": user_data.get("user_type", category[:-1]),
-                "department": user_data.get("department", ""),
-                "designation": user_data.get("designation", ""),
-                "student_id": user_data.get("student_id", ""),
-                "batch": user_data.get("batch", ""),
-                "student_linked": user_data.get("student_linked", "")
-            })
+    for category, username, user_data in list_users(offset, limit):
+        all_users.append({
+            "username": username,
+            "full_name": user_data.get("full_name", ""),
+            "email": user_data.get("email", ""),
+            "user_type": user_data.get("user_type", category[:-1]),
+            "department": user_data.get("department", ""),
+            "designation": user_data.get("designation", ""),
+            "student_id": user_data.get("student_id", ""),
+            "batch": user_data.get("batch", ""),
+            "student_linked": user_data.get("student_linked", "")
+        })
 
     return pd.DataFrame(all_users)
 
@@ -754,335 +729,19 @@ def get_all_users():
 # ==============================================================================
 # DATA STORAGE SYSTEM
 # ==============================================================================
-def save_course_data(semester, course_code, results):
+def save_course_data(semester, course_code, results, upload_key=None, student_ids=None):
     """Save course data to file for persistent storage"""
     try:
-        # Create data directory if it doesn't exist
-        data_dir = Path("course_data")
-        data_dir.mkdir(exist_ok=True)
-
-        # Save each student's data individually for easy access
-        for student_id, student_data in results['students'].items():
-            student_file = data_dir / f"student_{student_id}.pkl"
-
-            # Load existing student data or create new
-            if student_file.exists():
-                with open(student_file, 'rb') as f:
-                    all_student_data = pickle.load(f)
-            else:
-                all_student_data = {}
-
-            # Add/update course data
-            course_key = f"{semester}_{course_code}"
-            all_student_data[course_key] = {
-                'course_code': course_code,
-                'semester': semester,
-                'student_data': student_data,
-                'course_stats': results.get('course_stats', {}),
-                'co_attainment': results.get('co_attainment', {}),
-                'po_attainment': results.get('po_attainment', {}),
-                'predictions': results.get('predictions', {}).get(student_id, {}),
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-
-            # Save back to file
-            with open(student_file, 'wb') as f:
-                pickle.dump(all_student_data, f)
-
-        # Also save course-wide data
-        course_file = data_dir / f"course_{semester}_{course_code}.pkl"
-        with open(course_file, 'wb') as f:
-            pickle.dump(results, f)
-
+        persist_course_data(semester, course_code, results, upload_key, student_ids)
         return True
     except Exception as e:
         st.error(f"Error saving course data: {e}")
         return False
 
 
-def load_student_data(student_id):
-    """Load all course data for a specific student"""
-    try:
-        student_file = Path("course_data") / f"student_{student_id}.pkl"
-        if student_file.exists():
-            with open(student_file, 'rb') as f:
-                return pickle.load(f)
-        return {}
-    except Exception as e:
-        return {}
-
-
-def load_all_courses():
-    """Load all available courses from data directory"""
-    courses = {}
-    try:
-        data_dir = Path("course_data")
-        if data_dir.exists():
-            for file in data_dir.glob("course_*.pkl"):
-                with open(file, 'rb') as f:
-                    course_data = pickle.load(f)
-                    key = f"{course_data.get('semester')} - {course_data.get('course_code')}"
-                    courses[key] = course_data
-    except Exception as e:
-        pass
-    return courses
-
-
-def get_student_cgpa_data(student_id):
-    """Get CGPA progression data for a student"""
-    student_data = load_student_data(student_id)
-    if not student_data:
-        return None
-
-    # Organize data by semester
-    semester_data = {}
-    for course_key, course_info in student_data.items():
-        semester = course_info['semester']
-        if semester not in semester_data:
-            semester_data[semester] = {
-                'courses': [],
-                'sGPAs': [],
-                'credits': []
-            }
-
-        # Assume 3 credit hours per course
-        semester_data[semester]['courses'].append(course_info['course_code'])
-        semester_data[semester]['sGPAs'].append(course_info['student_data']['sgpa'])
-        semester_data[semester]['credits'].append(3)  # Standard credit hours
-
-    # Calculate semester-wise SGPA and cumulative CGPA
-    semester_results = []
-    cumulative_gpa_points = 0
-    cumulative_credits = 0
-
-    for semester in sorted(semester_data.keys()):
-        sGPAs = semester_data[semester]['sGPAs']
-        credits = semester_data[semester]['credits']
-
-        # Calculate semester SGPA
-        semester_sgpa = np.average(sGPAs, weights=credits)
-
-        # Update cumulative CGPA
-        semester_gpa_points = sum(sgpa * credit for sgpa, credit in zip(sGPAs, credits))
-        semester_credits = sum(credits)
-
-        cumulative_gpa_points += semester_gpa_points
-        cumulative_credits += semester_credits
-        cumulative_cgpa = cumulative_gpa_points / cumulative_credits if cumulative_credits > 0 else 0
-
-        semester_results.append({
-            'semester': semester,
-            'courses': semester_data[semester]['courses'],
-            'semester_sgpa': round(semester_sgpa, 2),
-            'cumulative_cgpa': round(cumulative_cgpa, 2),
-            'credits_completed': cumulative_credits
-        })
-
-    return semester_results
-
-
 # ==============================================================================
 # AI PREDICTION MODULE
 # ==============================================================================
-def generate_ai_predictions(results):
-    """Generate AI predictions for each student's academic growth and career prospects"""
-    predictions = {}
-
-    if not results.get('students'):
-        return predictions
-
-    # Get all students data
-    students_data = []
-    student_ids = []
-
-    for student_id, student in results['students'].items():
-        # Extract features for prediction
-        features = [
-            student.get('total_marks', 0),
-            student.get('mid', 0),
-            student.get('final', 0),
-            student.get('ct', 0),
-            student.get('assignment', 0),
-            student.get('sgpa', 0),
-            np.mean(list(student.get('co_scores', {}).values())) if student.get('co_scores') else 0
-        ]
-
-        students_data.append(features)
-        student_ids.append(student_id)
-
-    if len(students_data) < 3:
-        # Not enough data for proper ML predictions
-        for student_id, student in results['students'].items():
-            predictions[student_id] = generate_rule_based_prediction(student)
-        return predictions
-
-    # Convert to numpy array
-    X = np.array(students_data)
-
-    # 1. Predict future academic performance (next semester)
-    y_academic = X[:, 0]  # Current total marks as target (simplified)
-
-    # Create synthetic next semester prediction
-    model_academic = LinearRegression()
-    model_academic.fit(X[:, 1:], y_academic)
-
-    # 2. Predict career sector suitability
-    career_sectors = [
-        "Power Systems & Energy",
-        "Electronics & Embedded Systems",
-        "Telecommunications",
-        "Control & Automation",
-        "Research & Academia",
-        "Renewable Energy",
-        "AI & Machine Learning in EEE"
-    ]
-
-    # Create synthetic career labels based on performance patterns
-    y_career = []
-    for features in X:
-        total_marks = features[0]
-        sgpa = features[5]
-        co_avg = features[6]
-
-        if total_marks >= 80 and sgpa >= 3.5:
-            y_career.append(0)  # Research & Academia
-        elif total_marks >= 75 and features[3] >= 15:
-            y_career.append(1)  # Electronics & Embedded Systems
-        elif total_marks >= 70 and features[2] >= 30:
-            y_career.append(2)  # Power Systems
-        elif total_marks >= 65 and co_avg >= 15:
-            y_career.append(3)  # Control & Automation
-        elif total_marks >= 60:
-            y_career.append(4)  # Telecommunications
-        elif total_marks >= 50:
-            y_career.append(5)  # Renewable Energy
-        else:
-            y_career.append(6)  # AI & ML in EEE
-
-    model_career = RandomForestClassifier(n_estimators=50, random_state=42)
-    model_career.fit(X[:, 1:], y_career)
-
-    # Generate predictions for each student
-    for idx, student_id in enumerate(student_ids):
-        student = results['students'][student_id]
-        features = X[idx]
-
-        # Academic growth prediction
-        next_sem_pred = model_academic.predict([features[1:]])[0]
-        next_sem_pred = max(40, min(95, next_sem_pred))
-
-        # Career sector prediction
-        career_idx = model_career.predict([features[1:]])[0]
-        career_sector = career_sectors[career_idx]
-
-        # Growth percentage
-        current_marks = features[0]
-        growth_percent = ((next_sem_pred - current_marks) / current_marks * 100) if current_marks > 0 else 0
-
-        # Performance category
-        if current_marks >= 80:
-            performance = "Excellent"
-            recommendation = "Consider graduate studies or research positions"
-        elif current_marks >= 70:
-            performance = "Good"
-            recommendation = "Focus on specialization in your strong areas"
-        elif current_marks >= 60:
-            performance = "Average"
-            recommendation = "Improve weak areas through practice and mentorship"
-        elif current_marks >= 40:
-            performance = "Satisfactory"
-            recommendation = "Maintain consistency and seek guidance"
-        else:
-            performance = "Needs Improvement"
-            recommendation = "Seek academic support and focus on fundamentals"
-
-        # Skill assessment based on CO scores
-        co_scores = student.get('co_scores', {})
-        skills = []
-        if co_scores.get('CO1', 0) >= 15:
-            skills.append("Strong theoretical foundation")
-        if co_scores.get('CO2', 0) >= 15:
-            skills.append("Good problem-solving ability")
-        if co_scores.get('CO3', 0) >= 15:
-            skills.append("Analytical and investigative skills")
-        if co_scores.get('CO4', 0) >= 15:
-            skills.append("Strong professional and communication skills")
-
-        if not skills:
-            skills = ["Developing core engineering skills"]
-
-        predictions[student_id] = {
-            'student_name': student['name'],
-            'current_performance': f"{current_marks:.1f} marks ({performance})",
-            'predicted_next_semester': f"{next_sem_pred:.1f} marks",
-            'growth_percentage': f"{growth_percent:.1f}%",
-            'recommended_career_sector': career_sector,
-            'key_strengths': skills[:3],
-            'recommendation': recommendation,
-            'confidence_level': "Medium" if len(students_data) >= 5 else "Low"
-        }
-
-    return predictions
-
-
-def generate_rule_based_prediction(student):
-    """Generate rule-based predictions when insufficient data for ML"""
-    total_marks = student.get('total_marks', 0)
-    sgpa = student.get('sgpa', 0)
-
-    if total_marks >= 80:
-        performance = "Excellent"
-        next_sem = min(95, total_marks + np.random.uniform(0, 5))
-        career = np.random.choice(["Research & Academia", "Power Systems Design", "Advanced Electronics"])
-        recommendation = "Pursue graduate studies or competitive industry positions"
-    elif total_marks >= 70:
-        performance = "Good"
-        next_sem = min(90, total_marks + np.random.uniform(-2, 8))
-        career = np.random.choice(["Energy Management", "Control Systems", "Telecommunications"])
-        recommendation = "Focus on specialization and internships"
-    elif total_marks >= 60:
-        performance = "Average"
-        next_sem = min(85, total_marks + np.random.uniform(-5, 10))
-        career = np.random.choice(["Renewable Energy", "Maintenance Engineering", "Technical Sales"])
-        recommendation = "Improve fundamentals and seek practical experience"
-    elif total_marks >= 40:
-        performance = "Satisfactory"
-        next_sem = max(40, total_marks + np.random.uniform(-10, 15))
-        career = "General Engineering with focused skill development"
-        recommendation = "Maintain consistency and seek academic guidance"
-    else:
-        performance = "Needs Improvement"
-        next_sem = max(30, total_marks + np.random.uniform(-5, 20))
-        career = "Foundation strengthening required"
-        recommendation = "Seek academic support and focus on core concepts"
-
-    strengths = []
-    if student.get('mid', 0) >= 20:
-        strengths.append("Good exam preparation skills")
-    if student.get('final', 0) >= 30:
-        strengths.append("Strong comprehensive understanding")
-    if student.get('ct', 0) >= 15:
-        strengths.append("Consistent performance in assessments")
-    if student.get('assignment', 0) >= 4:
-        strengths.append("Good assignment completion")
-
-    if not strengths:
-        strengths = ["Developing engineering competencies"]
-
-    growth = ((next_sem - total_marks) / total_marks * 100) if total_marks > 0 else 0
-
-    return {
-        'student_name': student['name'],
-        'current_performance': f"{total_marks:.1f} marks ({performance})",
-        'predicted_next_semester': f"{next_sem:.1f} marks",
-        'growth_percentage': f"{growth:.1f}%",
-        'recommended_career_sector': career,
-        'key_strengths': strengths[:3],
-        'recommendation': recommendation,
-        'confidence_level': "Low (Rule-based)"
-    }
-
-
 def show_ai_prediction(prediction, is_student=False):
     """Display AI prediction for a student"""
     st.markdown('<div class="prediction-box">', unsafe_allow_html=True)
@@ -1369,10 +1028,14 @@ def show_user_management():
     """User management for admin"""
     st.markdown("#### 👥 User Account Management")
 
-    # Get all users
-    users_df = get_all_users()
+    # Only one page of accounts is loaded at a time
+    total_users = sum(count_users_by_type().values())
 
-    if not users_df.empty:
+    if total_users:
+        pages = (total_users + USERS_PAGE_SIZE - 1) // USERS_PAGE_SIZE
+        page = st.number_input(f"Page (of {pages}, {total_users} users)", min_value=1, max_value=pages,
+                               value=1, step=1, key="admin_users_page")
+        users_df = get_all_users((page - 1) * USERS_PAGE_SIZE, USERS_PAGE_SIZE)
         st.dataframe(users_df, use_container_width=True, height=300)
 
         col1, col2 = st.columns(2)
@@ -1431,17 +1094,68 @@ def show_user_management():
             st.markdown("---")
             st.markdown("##### Bulk Operations")
             if st.button("📥 Export Users to CSV", key="export_users"):
-                csv = users_df.to_csv(index=False)
+                csv = get_all_users().to_csv(index=False)
                 st.download_button(
                     label="Download CSV",
                     data=csv,
                     file_name="edutrack_users.csv",
                     mime="text/csv"
                 )
+
+        show_account_provisioning()
     else:
         st.info("No users found in the system.")
 
 
+def show_account_provisioning():
+    """Create student and parent accounts for every student of a processed course"""
+    st.markdown("---")
+    st.markdown("##### 🎓 Provision Accounts from a Course")
+
+    course_catalog = load_course_catalog()
+    if not course_catalog:
+        st.info("Process a marksheet first - accounts are created from its students.")
+        return
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        selected_course = st.selectbox("Course", list(course_catalog.keys()), key="provision_course")
+    with col2:
+        batch = st.text_input("Batch", placeholder="e.g. 2025", key="provision_batch")
+
+    st.caption("Creates a student account (username = Student ID) and a linked parent account "
+               "(username = parent_<Student ID>) for everyone who doesn't have one yet.")
+
+    if st.button("👥 Create Missing Accounts", key="provision_accounts", type="primary"):
+        course = course_catalog[selected_course]
+        with st.spinner("Creating accounts..."):
+            try:
+                results = load_course_results(course['semester'], course['course_code'])
+                report = provision_course_accounts(results, batch=batch)
+            except Exception as e:
+                st.error(f"❌ Provisioning failed: {e}")
+                return
+
+        col_a, col_b, col_c, col_d = st.columns(4)
+        col_a.metric("Students Created", report['students_created'])
+        col_b.metric("Parents Created", report['parents_created'])
+        col_c.metric("Students Skipped", report['students_skipped'])
+        col_d.metric("Parents Skipped", report['parents_skipped'])
+
+        if not report['credentials'].empty:
+            st.warning("⚠️ Initial passwords are shown only once - download them now and share them securely.")
+            st.download_button(
+                label="⬇️ Download Initial Credentials (CSV)",
+                data=report['credentials'].to_csv(index=False),
+                file_name=f"edutrack_accounts_{course['course_code']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv",
+                key="provision_credentials"
+            )
+        if not report['skipped'].empty:
+            with st.expander(f"Skipped ({len(report['skipped'])})"):
+                st.dataframe(report['skipped'], use_container_width=True, hide_index=True)
+
+
 def show_data_management():
     """Data management for admin"""
     st.markdown("#### 🗄️ System Data Management")
@@ -1450,15 +1164,15 @@ def show_data_management():
 
     with col1:
         st.markdown("##### Course Data")
-        all_courses = load_all_courses()
+        course_catalog = load_course_catalog()
 
-        if all_courses:
-            course_list = list(all_courses.keys())
+        if course_catalog:
+            course_list = list(course_catalog.keys())
             selected_course = st.selectbox("Select Course", course_list, key="admin_course_select")
 
             if selected_course:
-                course_data = all_courses[selected_course]
-                st.metric("Students", len(course_data.get('students', {})))
+                course_data = course_catalog[selected_course]
+                st.metric("Students", course_data.get('student_count', 0))
                 st.metric("Average Marks", f"{course_data.get('course_stats', {}).get('average_marks', 0):.1f}")
                 st.metric("Pass %", f"{course_data.get('course_stats', {}).get('pass_percentage', 0):.1f}%")
 
@@ -1483,9 +1197,10 @@ def show_data_management():
                     total_size += os.path.getsize(file_path)
                     file_count += 1
 
-        if os.path.exists("users.json"):
-            total_size += os.path.getsize("users.json")
-            file_count += 1
+        for users_file in ("users.json", "users.db"):
+            if os.path.exists(users_file):
+                total_size += os.path.getsize(users_file)
+                file_count += 1
 
         st.metric("Total Files", file_count)
         st.metric("Storage Used", f"{total_size / 1024 / 1024:.2f} MB")
@@ -1497,40 +1212,81 @@ def show_data_management():
                 st.success("✅ All course data cleared!")
                 st.rerun()
 
+        st.markdown("##### Storage Backend")
+        backend = active_storage_backend()
+        st.metric("Active Backend", backend.title())
+
+        if backend == "pickle":
+            st.caption("Per-student pickle files. The columnar store writes each course in one shot "
+                       "and answers student lookups with predicate pushdown; the SQLite store serves "
+                       "them as indexed lookups and lets sessions read while an upload is saving.")
+            migrate_col1, migrate_col2 = st.columns(2)
+            with migrate_col1:
+                migrate_parquet = st.button("🗃️ Migrate to Columnar Store (Parquet)", key="migrate_parquet")
+            with migrate_col2:
+                migrate_sqlite = st.button("🗄️ Migrate to SQLite Database", key="migrate_sqlite")
+
+            if migrate_parquet or migrate_sqlite:
+                with st.spinner("Migrating course data..."):
+                    try:
+                        if migrate_sqlite:
+                            migrated = migrate_pickles_to_sqlite()
+                        else:
+                            migrated = migrate_pickles_to_parquet()
+                        st.success(f"✅ Migrated {migrated} courses!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Migration failed: {e}")
+
+        st.markdown("##### User Store")
+        user_backend = active_user_backend()
+        st.metric("Active User Store", "SQLite" if user_backend == "sqlite" else "JSON")
+
+        if user_backend == "json":
+            st.caption("users.json is rewritten in full for every registration. The SQLite user store "
+                       "indexes accounts by username, student ID and linked student and writes one row at a time.")
+            if st.button("🗄️ Migrate Users to SQLite", key="migrate_users_sqlite"):
+                try:
+                    migrated = migrate_users_to_sqlite()
+                    st.success(f"✅ Migrated {migrated} user accounts!")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Migration failed: {e}")
+
 
 def show_system_analytics():
     """System analytics for admin"""
     st.markdown("#### 📊 System Analytics Dashboard")
 
     # Get all data
-    users_df = get_all_users()
-    all_courses = load_all_courses()
+    user_counts = count_users_by_type()
+    course_catalog = load_course_catalog()
 
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        total_users = len(users_df) if not users_df.empty else 0
+        total_users = sum(user_counts.values())
         st.metric("Total Users", total_users)
 
     with col2:
-        teachers = len(users_df[users_df['user_type'] == 'teacher']) if not users_df.empty else 0
+        teachers = user_counts.get('teacher', 0)
         st.metric("Teachers", teachers)
 
     with col3:
-        students = len(users_df[users_df['user_type'] == 'student']) if not users_df.empty else 0
+        students = user_counts.get('student', 0)
         st.metric("Students", students)
 
     with col4:
-        parents = len(users_df[users_df['user_type'] == 'parent']) if not users_df.empty else 0
+        parents = user_counts.get('parent', 0)
         st.metric("Parents", parents)
 
     st.markdown("---")
 
-    if all_courses:
+    if course_catalog:
         st.markdown("##### 📈 Course Performance Overview")
 
         course_stats = []
-        for course_name, course_data in all_courses.items():
+        for course_name, course_data in course_catalog.items():
             stats = course_data.get('course_stats', {})
             course_stats.append({
                 'Course': course_data.get('course_code', 'N/A'),
@@ -1603,8 +1359,7 @@ def show_backup_restore():
 
                 if st.button("🔄 Restore from Backup", key="restore_backup", type="secondary", use_container_width=True):
                     # Save users
-                    with open("users.json", 'w') as f:
-                        json.dump(backup_data.get("users", {}), f, indent=4)
+                    save_user_directory(backup_data.get("users", {}))
 
                     # Note: Course data backup/restore would need more complex handling
                     st.success("✅ Users restored from backup!")
@@ -1662,6 +1417,138 @@ def show_system_settings():
         if st.button("🔄 Clear All Logs", key="clear_logs"):
             st.info("Logs cleared (simulated)")
 
+    st.markdown("---")
+    show_grade_scale_settings()
+
+    st.markdown("---")
+    show_attainment_recompute()
+
+    st.markdown("---")
+    show_prediction_model_settings()
+
+
+def show_grade_scale_settings():
+    """Choose, define and bulk-apply grade scales"""
+    st.markdown("##### 🎓 Grade Scales")
+
+    scales = load_grade_scales()
+    active_name, _ = get_active_grade_scale()
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        scale_names = list(scales.keys())
+        selected_scale = st.selectbox("Grade Scale", scale_names, index=scale_names.index(active_name),
+                                      key="grade_scale_select")
+        st.dataframe(pd.DataFrame(scales[selected_scale],
+                                  columns=["Min Marks", "Grade", "Points", "Description"]),
+                     use_container_width=True, hide_index=True)
+
+        if selected_scale != active_name:
+            if st.button("✅ Use for New Uploads", key="activate_grade_scale"):
+                set_active_grade_scale(selected_scale)
+                st.success(f"✅ New uploads are graded on {selected_scale}")
+                st.rerun()
+        else:
+            st.caption("✅ Active for new uploads")
+
+        semesters = sorted({course['semester'] for course in load_course_catalog().values()}, key=semester_sort_key)
+        if semesters:
+            regrade_semester_name = st.selectbox("Re-grade Stored Semester", semesters, key="regrade_semester")
+            if st.button(f"🔁 Re-grade {regrade_semester_name} on {selected_scale}", key="regrade_button"):
+                with st.spinner("Re-grading..."):
+                    try:
+                        courses, students = regrade_semester(regrade_semester_name, selected_scale)
+                        st.success(f"✅ Re-graded {students} results in {courses} courses")
+                    except Exception as e:
+                        st.error(f"❌ Re-grading failed: {e}")
+
+    with col2:
+        st.markdown("###### Define a Scale")
+        new_scale_name = st.text_input("Scale Name", placeholder="e.g. EEE Department 2025", key="new_scale_name")
+        new_scale = st.data_editor(
+            pd.DataFrame(scales[selected_scale], columns=["Min Marks", "Grade", "Points", "Description"]),
+            num_rows="dynamic", use_container_width=True, hide_index=True, key="new_scale_editor")
+
+        if st.button("💾 Save Scale", key="save_grade_scale"):
+            if not new_scale_name:
+                st.warning("Please give the scale a name")
+            else:
+                try:
+                    save_grade_scale(new_scale_name, new_scale.dropna(how='all').values.tolist())
+                    st.success(f"✅ Saved grade scale {new_scale_name}")
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+
+
+def show_attainment_recompute():
+    """Re-measure CO/PO attainment of stored courses under new targets, without re-uploading"""
+    st.markdown("##### 🎯 Recompute CO Attainment")
+
+    catalog = load_course_catalog()
+    if not catalog:
+        st.info("No stored courses yet")
+        return
+
+    semesters = ["All semesters"] + sorted({course['semester'] for course in catalog.values()}, key=semester_sort_key)
+    col1, col2 = st.columns(2)
+    with col1:
+        semester = st.selectbox("Semester", semesters, key="recompute_semester")
+    with col2:
+        courses = ["All courses"] + sorted({course['course_code'] for course in catalog.values()
+                                            if semester == "All semesters" or course['semester'] == semester})
+        course_code = st.selectbox("Course", courses, key="recompute_course")
+
+    keep_own = st.checkbox("Keep each course's own method and targets", value=True, key="recompute_keep_own")
+    config = None if keep_own else attainment_config_inputs(DEFAULT_ATTAINMENT_CONFIG, key_prefix="recompute")
+
+    if st.button("🔁 Recompute Attainment", key="recompute_attainment"):
+        with st.spinner("Recomputing..."):
+            try:
+                updated = recompute_stored_attainment(
+                    None if semester == "All semesters" else semester,
+                    None if course_code == "All courses" else course_code,
+                    config
+                )
+                st.success(f"✅ Recomputed CO/PO attainment of {updated} courses")
+            except Exception as e:
+                st.error(f"❌ Recompute failed: {e}")
+
+
+def show_prediction_model_settings():
+    """Stored AI prediction model versions: retrain on all stored courses or roll back"""
+    st.markdown("##### 🤖 Prediction Models")
+    st.caption("Uploads reuse the active model version. Retraining fits new models on every stored course.")
+
+    versions = list_prediction_models()
+    if versions:
+        st.dataframe(pd.DataFrame(versions).rename(columns={
+            'version': 'Version', 'trained_at': 'Trained', 'training_rows': 'Training Rows',
+            'courses': 'Courses', 'active': 'Active'}), use_container_width=True, hide_index=True)
+    else:
+        st.info("No models stored yet; the first processed course trains version 1")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🧠 Retrain on All Stored Courses", key="retrain_models", use_container_width=True):
+            with st.spinner("Training..."):
+                trained = train_prediction_models()
+            if trained:
+                st.success(f"✅ Version {trained['version']} trained on {trained['training_rows']} results "
+                           f"and now active")
+                st.rerun()
+            else:
+                st.warning("Not enough stored results to train on")
+    with col2:
+        inactive = [entry['version'] for entry in versions if not entry['active']]
+        if inactive:
+            version = st.selectbox("Activate Version", inactive, key="activate_model_version")
+            if st.button(f"↩️ Use Version {version}", key="activate_model", use_container_width=True):
+                activate_prediction_models(version)
+                st.success(f"✅ Version {version} is now active")
+                st.rerun()
+
 
 # ==============================================================================
 # SAMPLE DATA GENERATION
@@ -1784,7 +1671,9 @@ def create_sample_excel():
             ["1. Attendance marks are NOT included in CO-PO attainment calculations"],
             ["2. Total academic marks for CO-PO = Mid + Final + CT + Assignment = 95 marks"],
             ["3. CO scores should be out of 20 marks each"],
-            ["4. All email fields are required for bulk email functionality"]
+            ["4. All email fields are required for bulk email functionality"],
+            ["5. Courses with more outcomes can add CO5, CO6, ... columns, each out of 20 marks"],
+            ["6. A custom CO-PO mapping may have any number of CO rows and PO/PSO columns (strengths 0-3)"]
         ]
 
         instructions_df = pd.DataFrame(instructions)
@@ -1799,266 +1688,65 @@ def create_sample_excel():
 
 
 # ==============================================================================
-# CALCULATION FUNCTIONS
+# DATA PROCESSING
 # ==============================================================================
-def calculate_sgpa(total_marks):
-    """Convert total marks to SGPA (4.0 scale)"""
-    if total_marks >= 80:
-        return 4.00
-    elif total_marks >= 75:
-        return 3.75
-    elif total_marks >= 70:
-        return 3.50
-    elif total_marks >= 65:
-        return 3.25
-    elif total_marks >= 60:
-        return 3.00
-    elif total_marks >= 55:
-        return 2.75
-    elif total_marks >= 50:
-        return 2.50
-    elif total_marks >= 45:
-        return 2.25
-    elif total_marks >= 40:
-        return 2.00
-    elif total_marks >= 35:
-        return 1.75
-    elif total_marks >= 30:
-        return 1.50
-    elif total_marks >= 25:
-        return 1.25
-    elif total_marks >= 20:
-        return 1.00
-    else:
-        return 0.00
-
-
-def get_grade_from_marks(total_marks):
-    """Get letter grade from total marks"""
-    if total_marks >= 80:
-        return "A+"
-    elif total_marks >= 75:
-        return "A"
-    elif total_marks >= 70:
-        return "A-"
-    elif total_marks >= 65:
-        return "B+"
-    elif total_marks >= 60:
-        return "B"
-    elif total_marks >= 55:
-        return "B-"
-    elif total_marks >= 50:
-        return "C+"
-    elif total_marks >= 45:
-        return "C"
-    elif total_marks >= 40:
-        return "D"
-    else:
-        return "F"
-
-
-def get_grade_description(grade):
-    """Get description for grade"""
-    grade_descriptions = {
-        "A+": "Excellent",
-        "A": "Very Good",
-        "A-": "Good",
-        "B+": "Above Average",
-        "B": "Average",
-        "B-": "Below Average",
-        "C+": "Satisfactory",
-        "C": "Marginal",
-        "D": "Pass",
-        "F": "Fail"
-    }
-    return grade_descriptions.get(grade, "Unknown")
-
-
-def calculate_total_marks(student_data):
-    """Calculate total marks out of 100"""
-    academic_marks = (
-            student_data['mid'] +
-            student_data['final'] +
-            student_data['ct'] +
-            student_data['assignment']
-    )
-    return min(academic_marks + student_data['attendance'], 100)
-
-
-def create_default_copo_mapping():
-    """Create default CO-PO mapping matrix (4 COs x 12 POs)"""
-    mapping = {
-        'PO1': [3, 3, 2, 1],
-        'PO2': [3, 3, 3, 1],
-        'PO3': [2, 3, 2, 1],
-        'PO4': [1, 2, 3, 2],
-        'PO5': [2, 2, 3, 1],
-        'PO6': [1, 1, 1, 3],
-        'PO7': [1, 1, 1, 2],
-        'PO8': [1, 1, 1, 3],
-        'PO9': [1, 2, 2, 3],
-        'PO10': [1, 2, 2, 3],
-        'PO11': [1, 2, 2, 2],
-        'PO12': [2, 2, 2, 3]
-    }
-
-    return pd.DataFrame(mapping, index=['CO1', 'CO2', 'CO3', 'CO4'])
-
-
-def calculate_po_attainment(co_scores, co_po_mapping):
-    """Calculate PO attainment from CO scores using mapping matrix"""
-    if co_po_mapping is None or not co_scores:
-        return None
-
-    po_attainment = {}
-
-    for po in co_po_mapping.columns:
-        total_weight = 0
-        weighted_sum = 0
+def process_student_data(df, semester, course_code, upload_key=None):
+    """Process student data with 4 COs and BAETE standards"""
+    return process_student_chunks([df], semester, course_code, upload_key)
 
-        for co, score in co_scores.items():
-            if co in co_po_mapping.index:
-                weight = co_po_mapping.loc[co, po]
-                if weight > 0:
-                    weighted_sum += (score / 20 * 100) * weight
-                    total_weight += weight
 
-        if total_weight > 0:
-            po_attainment[po] = min(100, weighted_sum / total_weight)
-        else:
-            po_attainment[po] = 0
+def process_student_chunks(chunks, semester, course_code, upload_key=None):
+    """Process marksheet chunks as they arrive, then compute course-wide results once"""
+    results, invalid_rows = build_course_results(chunks, semester, course_code, st.session_state.co_po_mapping,
+                                                 st.session_state.credit_hours, st.session_state.attainment_config)
+    warn_skipped_rows(invalid_rows)
 
-    return po_attainment
+    st.session_state.predictions = results['predictions']
 
+    save_course_data(semester, course_code, results, upload_key=upload_key)
+    if upload_key:
+        store_cached_results(upload_key, results)
 
-# ==============================================================================
-# DATA PROCESSING
-# ==============================================================================
-def process_student_data(df, semester, course_code):
-    """Process student data with 4 COs and BAETE standards"""
-    results = {
-        'students': {},
-        'course_stats': {},
-        'co_attainment': {},
-        'po_attainment': {},
-        'semester': semester,
-        'course_code': course_code,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+    st.session_state.processed = True
+    return results
 
-    co_scores_all = []
-    guardian_email = ""
 
-    for idx, row in df.iterrows():
-        try:
-            student_id = str(row.get('Student_ID', f'STU{idx}'))
-            student_name = str(row.get('Student_Name', f'Student {idx}'))
-
-            marks = {
-                'mid': min(30, max(0, float(row.get('Mid_Total', 0)))),
-                'final': min(40, max(0, float(row.get('Final_Total', 0)))),
-                'ct': min(20, max(0, float(row.get('CT_Total', 0)))),
-                'assignment': min(5, max(0, float(row.get('Assignment_Total', 0)))),
-                'attendance': min(5, max(0, float(row.get('Attendance_Total', 0))))
-            }
+def process_student_delta(df, semester, course_code):
+    """Add or update only the students in `df` on the stored course, touching only their files"""
+    course_results = load_course_results(semester, course_code)
+    if course_results is None:
+        st.info("No stored data for this course yet - processing the file as a full upload.")
+        return process_student_data(df, semester, course_code)
 
-            academic_total = marks['mid'] + marks['final'] + marks['ct'] + marks['assignment']
-            total_with_attendance = academic_total + marks['attendance']
+    results, changed, invalid_rows = apply_delta_results(course_results, df, st.session_state.co_po_mapping)
+    warn_skipped_rows(invalid_rows)
 
-            sgpa = calculate_sgpa(total_with_attendance)
-            grade = get_grade_from_marks(total_with_attendance)
-            grade_desc = get_grade_description(grade)
+    st.session_state.predictions = results['predictions']
 
-            co_scores = {}
-            for i in range(1, 5):
-                co_key = f'CO{i}'
-                if co_key in row:
-                    co_scores[co_key] = min(20, max(0, float(row[co_key])))
-                else:
-                    co_scores[co_key] = 0
-
-            student_email = str(row.get('Student_Email', ''))
-            parent_email = str(row.get('Parent_Email', guardian_email))
-
-            results['students'][student_id] = {
-                'id': student_id,
-                'name': student_name,
-                **marks,
-                'academic_total': round(academic_total, 1),
-                'total_marks': round(total_with_attendance, 1),
-                'sgpa': sgpa,
-                'grade': grade,
-                'grade_desc': grade_desc,
-                'co_scores': co_scores,
-                'student_email': student_email,
-                'parent_email': parent_email,
-                'course_code': course_code,
-                'semester': semester,
-                'status': 'Pass' if total_with_attendance >= 40 else 'Fail',
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+    save_course_data(semester, course_code, results, student_ids=changed)
 
-            co_scores_all.append(co_scores)
+    st.session_state.processed = True
+    return results
 
-        except Exception as e:
-            st.warning(f"Error processing student {idx}: {str(e)}")
-
-    if results['students']:
-        marks_list = [s['total_marks'] for s in results['students'].values()]
-        academic_marks = [s['academic_total'] for s in results['students'].values()]
-        sgpas = [s['sgpa'] for s in results['students'].values()]
-
-        passing_students = len([m for m in marks_list if m >= 40])
-        total_students = len(marks_list)
-
-        results['course_stats'] = {
-            'average_marks': round(np.mean(marks_list), 2) if marks_list else 0.0,
-            'academic_average': round(np.mean(academic_marks), 2) if academic_marks else 0.0,
-            'highest_marks': round(max(marks_list), 2) if marks_list else 0.0,
-            'lowest_marks': round(min(marks_list), 2) if marks_list else 0.0,
-            'average_sgpa': round(np.mean(sgpas), 2) if sgpas else 0.0,
-            'total_students': total_students,
-            'passing_students': passing_students,
-            'pass_percentage': round((passing_students / total_students * 100) if total_students > 0 else 0, 1),
-            'fail_percentage': round(
-                ((total_students - passing_students) / total_students * 100) if total_students > 0 else 0, 1),
-            'std_deviation': round(np.std(marks_list), 2) if marks_list else 0.0
-        }
-    else:
-        results['course_stats'] = {
-            'average_marks': 0.0,
-            'academic_average': 0.0,
-            'highest_marks': 0.0,
-            'lowest_marks': 0.0,
-            'average_sgpa': 0.0,
-            'total_students': 0,
-            'passing_students': 0,
-            'pass_percentage': 0.0,
-            'fail_percentage': 0.0,
-            'std_deviation': 0.0
-        }
 
-    if co_scores_all and co_scores_all[0]:
-        df_co = pd.DataFrame(co_scores_all)
-        results['co_attainment'] = {col: round(df_co[col].mean() * 5, 2) for col in df_co.columns}
+def warn_skipped_rows(invalid_rows):
+    """Show one warning for all rows skipped because of non-numeric marks"""
+    if invalid_rows:
+        shown = ', '.join(str(idx) for idx in invalid_rows[:10])
+        more = f" and {len(invalid_rows) - 10} more" if len(invalid_rows) > 10 else ""
+        st.warning(f"⚠️ Skipped {len(invalid_rows)} rows with non-numeric marks (rows {shown}{more})")
 
-        if st.session_state.co_po_mapping is not None:
-            results['po_attainment'] = calculate_po_attainment(
-                {co: score / 5 for co, score in results['co_attainment'].items()},
-                st.session_state.co_po_mapping
-            )
-        else:
-            default_mapping = create_default_copo_mapping()
-            results['po_attainment'] = calculate_po_attainment(
-                {co: score / 5 for co, score in results['co_attainment'].items()},
-                default_mapping
-            )
 
-    results['predictions'] = generate_ai_predictions(results)
-    st.session_state.predictions = results['predictions']
+def load_cached_upload(upload_key, semester, course_code):
+    """Serve a previously processed upload from the cache, re-persisting it only if storage has moved on"""
+    results = load_cached_results(upload_key)
+    if results is None:
+        return None
 
-    save_course_data(semester, course_code, results)
+    if get_saved_upload_key(semester, course_code) != upload_key:
+        save_course_data(semester, course_code, results, upload_key=upload_key)
 
+    st.session_state.predictions = results.get('predictions', {})
     st.session_state.processed = True
     return results
 
@@ -2334,30 +2022,50 @@ def organized_upload_page():
             placeholder="e.g., Circuit Theory",
             key="course_name_input"
         )
+        st.session_state.credit_hours = st.number_input(
+            "Credit Hours:",
+            min_value=0.5,
+            max_value=6.0,
+            value=float(st.session_state.credit_hours),
+            step=0.5,
+            help="Weights this course in CGPA and the program-level PO rollup",
+            key="credit_hours_input"
+        )
 
     st.markdown(f"**📌 Selected:** **{selected_semester}** - **{course_code if course_code else 'Enter course code'}**")
 
     st.markdown("---")
 
-    st.markdown("#### 📁 Step 3: Upload Your XLSX File")
+    st.markdown("#### 📁 Step 3: Upload Your Marksheet File")
 
     uploaded_file = st.file_uploader(
-        "Choose your marksheet file (Excel format)",
-        type=['xlsx', 'xls'],
-        help="Upload the XLSX file containing student marks with email columns",
+        "Choose your marksheet file (Excel, CSV or Parquet format)",
+        type=MARKSHEET_FILE_TYPES,
+        help="Upload an XLSX, CSV or Parquet file with the template columns, e.g. an export from your SIS",
         key="file_uploader"
     )
 
+    stream_mode = st.checkbox(
+        "⚡ Streaming mode for large workbooks",
+        help=f"Read XLSX rows in chunks of {STREAM_CHUNK_ROWS} while processing instead of loading the whole sheet",
+        key="stream_mode"
+    )
+
     if uploaded_file is not None:
         try:
-            if uploaded_file.name.endswith('.xlsx'):
-                df = pd.read_excel(uploaded_file)
+            streaming = stream_mode and uploaded_file.name.endswith('.xlsx')
+
+            if streaming:
+                df = read_excel_preview(uploaded_file)
+                st.session_state.data = None
+
+                st.success("✅ File uploaded successfully! Rows will be streamed in chunks during processing.")
             else:
-                df = pd.read_excel(uploaded_file, engine='openpyxl')
+                df = read_marksheet(uploaded_file, uploaded_file.name)
 
-            st.session_state.data = df
+                st.session_state.data = df
 
-            st.success(f"✅ File uploaded successfully! Found **{len(df)}** student records.")
+                st.success(f"✅ File uploaded successfully! Found **{len(df)}** student records.")
 
             with st.expander("📋 Data Preview", expanded=True):
                 st.dataframe(df.head(10), use_container_width=True)
@@ -2371,12 +2079,19 @@ def organized_upload_page():
                 else:
                     st.success("✅ All required columns found")
 
-                    co_cols = [f'CO{i}' for i in range(1, 5)]
-                    missing_cos = [col for col in co_cols if col not in df.columns]
-                    if missing_cos:
-                        st.warning(f"⚠️ Missing CO columns: {', '.join(missing_cos)}")
+                    co_cols = [col for col in detect_co_columns(df.columns) if col in df.columns]
+                    if not co_cols:
+                        st.warning("⚠️ No CO columns found (expected CO1, CO2, ...)")
                     else:
-                        st.success("✅ All 4 CO columns found")
+                        st.success(f"✅ {len(co_cols)} CO columns found: {', '.join(co_cols)}")
+
+            validation_problems = None
+            if not streaming:
+                validation_problems = validate_marksheet(df)
+                if validation_problems.empty:
+                    st.success("✅ Validation passed: types, ranges, student IDs and emails look good")
+                else:
+                    show_validation_report(validation_problems)
 
             st.markdown("---")
             st.markdown("#### 🗺️ Step 4: CO-PO Mapping")
@@ -2406,19 +2121,44 @@ def organized_upload_page():
 
                 if mapping_file is not None:
                     try:
-                        mapping_df = pd.read_excel(mapping_file, index_col=0)
-                        if len(mapping_df) == 4 and len(mapping_df.columns) == 12:
-                            st.session_state.co_po_mapping = mapping_df
-                            st.success("✅ Custom CO-PO mapping loaded!")
-                        else:
-                            st.error("❌ Mapping file must have 4 rows (COs) and 12 columns (POs)")
+                        mapping_df = validate_copo_mapping(pd.read_excel(mapping_file, index_col=0))
+                        st.session_state.co_po_mapping = mapping_df
+                        st.success(f"✅ Custom CO-PO mapping loaded: {len(mapping_df)} COs x "
+                                   f"{len(mapping_df.columns)} POs/PSOs")
+                        unmapped = [co for co in detect_co_columns(df.columns)
+                                    if co in df.columns and co not in mapping_df.index]
+                        if unmapped:
+                            st.warning(f"⚠️ Not in the mapping, so not counted towards any PO: "
+                                       f"{', '.join(unmapped)}")
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
                     except Exception as e:
                         st.error(f"❌ Error loading mapping: {e}")
 
+            with st.expander("🎯 CO Attainment Method"):
+                st.session_state.attainment_config = attainment_config_inputs(
+                    st.session_state.attainment_config, key_prefix="upload")
+
             st.markdown("---")
 
             st.markdown("#### ⚙️ Step 5: Process Data")
 
+            col_opt1, col_opt2 = st.columns(2)
+
+            with col_opt1:
+                delta_upload = st.checkbox(
+                    "➕ Delta upload",
+                    help="Only add or update the students in this file; everyone else in the stored course is kept",
+                    key="delta_upload"
+                )
+
+            with col_opt2:
+                force_rebuild = st.checkbox(
+                    "🔁 Force rebuild",
+                    help="Reprocess the file even if the same file, course and mapping were processed before",
+                    key="force_rebuild"
+                )
+
             col_proc1, col_proc2, col_proc3 = st.columns([2, 1, 1])
 
             with col_proc1:
@@ -2426,21 +2166,68 @@ def organized_upload_page():
                     if not st.session_state.selected_course:
                         st.error("❌ Please enter a course code")
                     else:
-                        with st.spinner("Processing data with 4 COs..."):
+                        with st.spinner("Processing data..."):
                             try:
-                                results = process_student_data(
-                                    df,
-                                    st.session_state.selected_semester,
-                                    st.session_state.selected_course
-                                )
-
-                                st.session_state.results = results
-                                key = f"{st.session_state.selected_semester} - {st.session_state.selected_course}"
-                                st.session_state.all_semester_data[key] = results
-
-                                st.success("✅ Data processing complete! Data saved to persistent storage.")
-                                st.balloons()
-                                st.rerun()
+                                if streaming:
+                                    validation_problems = validate_marksheet_chunks(iter_excel_chunks(uploaded_file))
+
+                                if not validation_problems.empty:
+                                    if streaming:
+                                        show_validation_report(validation_problems)
+                                    st.error("❌ Nothing was processed. Please fix the problems above and re-upload.")
+                                else:
+                                    upload_key = upload_cache_key(
+                                        uploaded_file.getvalue(),
+                                        st.session_state.selected_semester,
+                                        st.session_state.selected_course,
+                                        st.session_state.co_po_mapping,
+                                        st.session_state.credit_hours,
+                                        st.session_state.attainment_config
+                                    )
+                                    results = None if force_rebuild or delta_upload else load_cached_upload(
+                                        upload_key,
+                                        st.session_state.selected_semester,
+                                        st.session_state.selected_course
+                                    )
+
+                                    if results is not None:
+                                        st.info("⚡ Same file already processed - loaded cached results.")
+                                    elif delta_upload:
+                                        results = process_student_delta(
+                                            pd.concat(iter_excel_chunks(uploaded_file)) if streaming else df,
+                                            st.session_state.selected_semester,
+                                            st.session_state.selected_course
+                                        )
+                                    elif streaming:
+                                        progress_bar = st.progress(0)
+                                        status_text = st.empty()
+
+                                        def report_progress(rows_read, total_rows):
+                                            if total_rows:
+                                                progress_bar.progress(min(rows_read / total_rows, 1.0))
+                                            status_text.text(f"Processed {rows_read} of ~{total_rows} rows...")
+
+                                        results = process_student_chunks(
+                                            iter_excel_chunks(uploaded_file, on_progress=report_progress),
+                                            st.session_state.selected_semester,
+                                            st.session_state.selected_course,
+                                            upload_key
+                                        )
+                                    else:
+                                        results = process_student_data(
+                                            df,
+                                            st.session_state.selected_semester,
+                                            st.session_state.selected_course,
+                                            upload_key
+                                        )
+
+                                    st.session_state.results = results
+                                    key = f"{st.session_state.selected_semester} - {st.session_state.selected_course}"
+                                    st.session_state.all_semester_data[key] = results
+
+                                    st.success("✅ Data processing complete! Data saved to persistent storage.")
+                                    st.balloons()
+                                    st.rerun()
 
                             except Exception as e:
                                 st.error(f"❌ Error: {str(e)}")
@@ -2460,14 +2247,118 @@ def organized_upload_page():
 
         except Exception as e:
             st.error(f"❌ Error reading file: {str(e)}")
-            st.info("Please ensure you're uploading a valid Excel file")
+            st.info("Please ensure you're uploading a valid Excel, CSV or Parquet file")
 
     else:
-        st.info("📁 Please upload your XLSX marksheet file")
+        st.info("📁 Please upload your XLSX, CSV or Parquet marksheet file")
+
+    st.markdown("---")
+
+    with st.expander("📚 Batch Ingest: One Workbook, Many Courses"):
+        show_batch_ingest()
 
     st.markdown("</div>", unsafe_allow_html=True)
 
 
+def show_validation_report(problems):
+    """Show one consolidated validation summary with a downloadable error table"""
+    affected_rows = problems['Row'].dropna().nunique()
+    st.error(f"❌ Validation found **{len(problems)}** problems in **{affected_rows}** rows. "
+             f"Nothing will be processed or saved until they are fixed.")
+
+    summary = problems.groupby(['Column', 'Problem']).size().reset_index(name='Count')
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    with st.expander("🔍 View All Problems"):
+        st.dataframe(problems, use_container_width=True, hide_index=True, height=300)
+
+    st.download_button(
+        label="📥 Download Error Report (CSV)",
+        data=problems.to_csv(index=False),
+        file_name="EduTrack_Validation_Errors.csv",
+        mime="text/csv"
+    )
+
+
+def show_batch_ingest():
+    """Process a workbook with one sheet per course in parallel worker processes"""
+    st.markdown("Upload a workbook with one sheet per course, map each sheet to a semester and course code, "
+                "and every sheet is processed in parallel and saved to persistent storage.")
+
+    batch_file = st.file_uploader(
+        "Choose multi-sheet workbook (XLSX)",
+        type=['xlsx'],
+        key="batch_uploader"
+    )
+
+    if batch_file is None:
+        return
+
+    try:
+        sheet_names = list_workbook_sheets(batch_file)
+    except Exception as e:
+        st.error(f"❌ Error reading workbook: {str(e)}")
+        return
+
+    sheet_map = pd.DataFrame({
+        'Sheet': sheet_names,
+        'Semester': st.session_state.selected_semester,
+        'Course Code': [name.strip().upper() for name in sheet_names],
+        'Credit Hours': DEFAULT_CREDIT_HOURS,
+        'Include': True
+    })
+
+    st.markdown(f"Found **{len(sheet_names)}** sheets. Edit the semester and course code for each sheet:")
+    edited_map = st.data_editor(sheet_map, disabled=['Sheet'], hide_index=True,
+                                use_container_width=True, key="batch_sheet_map")
+
+    with st.expander("🎯 CO Attainment Method"):
+        st.session_state.attainment_config = attainment_config_inputs(
+            st.session_state.attainment_config, key_prefix="batch")
+
+    if st.button("🚀 Process All Sheets", use_container_width=True, type="primary", key="process_batch"):
+        jobs = [(row['Sheet'], row['Semester'], str(row['Course Code']).strip().upper(),
+                 float(row['Credit Hours'] or DEFAULT_CREDIT_HOURS))
+                for _, row in edited_map.iterrows()
+                if row['Include'] and str(row['Course Code']).strip()]
+
+        if not jobs:
+            st.error("❌ Please include at least one sheet with a course code")
+            return
+
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        summary = []
+
+        batch_jobs = process_workbook_batch(batch_file.getvalue(), jobs, st.session_state.co_po_mapping,
+                                            attainment_config=st.session_state.attainment_config)
+        for done, (job, results, invalid_rows, error) in enumerate(batch_jobs, start=1):
+            sheet_name, semester, course_code, _ = job
+
+            if error is None and save_course_data(semester, course_code, results):
+                st.session_state.all_semester_data[f"{semester} - {course_code}"] = results
+                status = f"✅ Saved ({len(invalid_rows)} rows skipped)" if invalid_rows else "✅ Saved"
+                students = len(results['students'])
+            else:
+                status = f"❌ {error}" if error else "❌ Save failed"
+                students = 0
+
+            summary.append({
+                'Sheet': sheet_name,
+                'Semester': semester,
+                'Course Code': course_code,
+                'Students': students,
+                'Status': status
+            })
+
+            progress_bar.progress(done / len(jobs))
+            status_text.text(f"Finished sheet '{sheet_name}' ({done}/{len(jobs)})")
+
+        saved = len([row for row in summary if row['Status'].startswith("✅")])
+        st.success(f"✅ Batch ingest complete: {saved} of {len(jobs)} courses saved to persistent storage.")
+        st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+
+
 # ==============================================================================
 # STUDENT COURSES PAGE
 # ==============================================================================
@@ -2509,7 +2400,7 @@ def show_student_courses_page():
     st.markdown("#### 📋 Select Course to View Details")
 
     course_list = []
-    for course_key, course_data in student_all_data.items():
+    for course_data in sorted(student_all_data.values(), key=lambda course: semester_sort_key(course.get('semester'))):
         course_code = course_data.get('course_code', 'Unknown')
         semester = course_data.get('semester', 'Unknown')
         course_list.append(f"{semester} - {course_code}")
@@ -2534,53 +2425,51 @@ def show_student_courses_page():
     st.markdown("---")
     st.markdown("#### 📊 All Courses Summary")
 
-    summary_data = []
-    cgpa_total = 0
-    credit_hours_total = 0
-
-    for course_key, course_data in student_all_data.items():
-        student_data = course_data.get('student_data', {})
-
-        credit_hours = 3
-
-        summary_data.append({
-            'Course Code': course_data.get('course_code', 'N/A'),
-            'Semester': course_data.get('semester', 'N/A'),
-            'Marks': f"{student_data.get('total_marks', 0):.1f}/100",
-            'SGPA': f"{student_data.get('sgpa', 0):.2f}",
-            'Grade': student_data.get('grade', 'N/A'),
-            'Status': student_data.get('status', 'N/A'),
-            'Credit Hours': credit_hours,
-            'Grade Points': student_data.get('sgpa', 0) * credit_hours
-        })
-
-        cgpa_total += student_data.get('sgpa', 0) * credit_hours
-        credit_hours_total += credit_hours
+    transcript = load_student_transcript(student_id)
+    summary_data = [{
+        'Course Code': course['course_code'],
+        'Semester': course['semester'],
+        'Marks': f"{course['total_marks'] or 0:.1f}/100",
+        'SGPA': f"{course['sgpa']:.2f}",
+        'Grade': course['grade'] or 'N/A',
+        'Status': course['status'] or 'N/A',
+        'Credit Hours': course['credit_hours'],
+        'Grade Points': course['sgpa'] * course['credit_hours']
+    } for course in transcript['courses']]
 
     if summary_data:
         df_summary = pd.DataFrame(summary_data)
         st.dataframe(df_summary, use_container_width=True, hide_index=True)
 
-        if credit_hours_total > 0:
-            cgpa = cgpa_total / credit_hours_total
-            col_cgpa1, col_cgpa2, col_cgpa3 = st.columns(3)
+        if transcript['credits_completed'] > 0:
+            batch = st.session_state.user_data.get('batch')
+            standing = student_standing(student_id, str(batch)) if batch else None
+            cohort = f"Batch {batch}"
+            if standing is None:
+                standing, cohort = student_standing(student_id), "All Students"
+
+            col_cgpa1, col_cgpa2, col_cgpa3, col_cgpa4 = st.columns(4)
             with col_cgpa1:
-                st.metric("CGPA", f"{cgpa:.2f}/4.00")
+                st.metric("CGPA", f"{transcript['cgpa']:.2f}/4.00")
             with col_cgpa2:
-                st.metric("Total Credits", f"{credit_hours_total}")
+                st.metric("Total Credits", f"{transcript['credits_completed']:g}")
             with col_cgpa3:
                 st.metric("Courses Completed", len(student_all_data))
+            with col_cgpa4:
+                if standing:
+                    st.metric(f"Rank ({cohort})", f"#{standing['Rank']}",
+                              delta=f"{standing['Percentile']:.1f} percentile", delta_color="off")
 
     st.markdown("---")
     st.markdown("#### 📈 Batch Performance Comparison")
 
-    all_courses = load_all_courses()
+    course_catalog = load_course_catalog()
 
-    if all_courses:
+    if course_catalog:
         batch_year = st.session_state.user_data.get('batch', '2021')
 
         batch_stats = []
-        for course_key, course_data in all_courses.items():
+        for course_key, course_data in course_catalog.items():
             course_stats = course_data.get('course_stats', {})
             batch_stats.append({
                 'Course': course_data.get('course_code', 'N/A'),
@@ -2673,7 +2562,7 @@ def show_student_course_details(course_data, all_courses=None):
         co_df = pd.DataFrame({
             'CO': list(co_scores.keys()),
             'Your Score': list(co_scores.values()),
-            'Out of': [20, 20, 20, 20],
+            'Out of': [20] * len(co_scores),
             'Percentage': [f"{(score / 20) * 100:.1f}%" for score in co_scores.values()],
             'Attainment Level': ["Excellent" if score >= 16 else "Good" if score >= 14
             else "Average" if score >= 12 else "Needs Improvement"
@@ -2685,7 +2574,7 @@ def show_student_course_details(course_data, all_courses=None):
         fig = go.Figure(data=[go.Bar(
             x=list(co_scores.keys()),
             y=list(co_scores.values()),
-            marker_color=['#1e88e5', '#42a5f5', '#64b5f6', '#90caf9'],
+            marker_color=co_bar_colors(len(co_scores)),
             text=[f'{score}/20' for score in co_scores.values()],
             textposition='auto'
         )])
@@ -2699,6 +2588,10 @@ def show_student_course_details(course_data, all_courses=None):
         )
         st.plotly_chart(fig, use_container_width=True)
 
+    if student_data.get('po_attainment'):
+        st.markdown("#### 🏆 Your PO Attainment")
+        show_student_po_attainment(student_data['po_attainment'], course_data.get('po_attainment') or {})
+
     course_stats = course_data.get('course_stats', {})
     if course_stats:
         st.markdown("#### 📈 Batch Comparison")
@@ -2776,34 +2669,27 @@ def show_parent_child_progress_page():
     st.markdown("---")
     st.markdown("#### 📊 Overall Academic Summary")
 
-    all_marks = []
-    all_sgpas = []
-    course_summary = []
-
-    for course_key, course_data in child_data.items():
-        student_data = course_data.get('student_data', {})
-        all_marks.append(student_data.get('total_marks', 0))
-        all_sgpas.append(student_data.get('sgpa', 0))
-
-        course_summary.append({
-            'Course': course_data.get('course_code', 'N/A'),
-            'Semester': course_data.get('semester', 'N/A'),
-            'Marks': f"{student_data.get('total_marks', 0):.1f}/100",
-            'SGPA': f"{student_data.get('sgpa', 0):.2f}",
-            'Grade': student_data.get('grade', 'N/A'),
-            'Status': student_data.get('status', 'N/A')
-        })
+    transcript = load_student_transcript(linked_student_id)
+    all_marks = [course['total_marks'] or 0 for course in transcript['courses']]
+    course_summary = [{
+        'Course': course['course_code'],
+        'Semester': course['semester'],
+        'Credit Hours': course['credit_hours'],
+        'Marks': f"{course['total_marks'] or 0:.1f}/100",
+        'SGPA': f"{course['sgpa']:.2f}",
+        'Grade': course['grade'] or 'N/A',
+        'Status': course['status'] or 'N/A'
+    } for course in transcript['courses']]
 
     if all_marks:
         overall_avg = np.mean(all_marks)
-        overall_sgpa = np.mean(all_sgpas)
 
         col_overall1, col_overall2, col_overall3, col_overall4 = st.columns(4)
 
         with col_overall1:
             st.metric("Overall Average", f"{overall_avg:.1f}/100")
         with col_overall2:
-            st.metric("Overall SGPA", f"{overall_sgpa:.2f}/4.00")
+            st.metric("CGPA", f"{transcript['cgpa']:.2f}/4.00")
         with col_overall3:
             passing_courses = len([s for s in child_data.values() if s['student_data']['status'] == 'Pass'])
             st.metric("Courses Passed", f"{passing_courses}/{len(child_data)}")
@@ -3032,6 +2918,7 @@ def main_dashboard():
         # Admin pages (full access)
         admin_pages = {
             "👑 Admin Panel": "admin",
+            "🏛️ Program Dashboard": "program",
             "📤 Upload Data": "upload",
             "📧 Email Parents": "email",
             "📚 My Courses": "mycourses",
@@ -3117,6 +3004,148 @@ def main_dashboard():
             if st.button("🔙 Go to Dashboard"):
                 st.session_state.current_page = "dashboard"
                 st.rerun()
+    elif st.session_state.current_page == "program":
+        if st.session_state.user_type == "admin" or st.session_state.admin_mode:
+            show_program_dashboard()
+        else:
+            st.error("⛔ Admin access only")
+            if st.button("🔙 Go to Dashboard"):
+                st.session_state.current_page = "dashboard"
+                st.rerun()
+
+
+# ==============================================================================
+# PROGRAM DASHBOARD
+# ==============================================================================
+def show_program_dashboard():
+    """Program-level CO/PO attainment across every stored course, for accreditation reviews"""
+    st.markdown("### 🏛️ Program Dashboard")
+    st.caption("CO/PO attainment rolled up over all stored courses, each weighted by credit hours x enrolled students. "
+               "The rollup is updated whenever a course is saved.")
+
+    rollup = load_program_rollup()
+    table = program_attainment_table(rollup)
+
+    if table.empty:
+        st.info("No courses stored yet. Process marksheets on the Upload page to build the program rollup.")
+        return
+
+    overall = table.iloc[-1]
+    po_columns = [column for column in table.columns if column.startswith(('PO', 'PSO'))]
+    po_values = {po: overall[po] for po in po_columns if pd.notna(overall[po])}
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Semesters", len(table) - 1)
+    with col2:
+        st.metric("Courses", int(overall['Courses']))
+    with col3:
+        st.metric("Enrolments", int(overall['Enrolments']))
+    with col4:
+        if po_values:
+            st.metric("POs Above Target", f"{len([v for v in po_values.values() if v >= 70])}/{len(po_values)}")
+
+    if po_values:
+        fig = go.Figure(data=[go.Bar(
+            x=list(po_values.keys()),
+            y=list(po_values.values()),
+            marker_color=['#2e7d32' if v >= 70 else '#f9a825' if v >= 50 else '#c62828' for v in po_values.values()],
+            text=[f'{v:.1f}%' for v in po_values.values()],
+            textposition='auto'
+        )])
+        fig.add_hline(y=70, line_dash="dash", line_color="green", annotation_text="Target: 70%")
+        fig.update_layout(
+            title="Program PO Attainment (all semesters)",
+            height=400,
+            xaxis_title="Program Outcomes",
+            yaxis_title="Attainment (%)",
+            yaxis_range=[0, 100],
+            template='plotly_white'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    semester_rows = table.iloc[:-1]
+    if len(semester_rows) > 1 and po_columns:
+        st.markdown("#### 📈 PO Attainment by Semester")
+        fig = px.imshow(semester_rows.set_index('Semester')[po_columns].astype(float),
+                        color_continuous_scale='RdYlGn', zmin=0, zmax=100,
+                        text_auto='.1f', aspect="auto")
+        fig.update_layout(height=max(250, 60 * len(semester_rows)),
+                          xaxis_title="Program Outcomes", yaxis_title="Semester")
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("#### 📋 Rollup Table")
+    st.dataframe(table, use_container_width=True, hide_index=True)
+
+    semesters = ["All"] + list(semester_rows['Semester'])
+    selected = st.selectbox("Course contributions for semester:", semesters, key="program_semester")
+    contributions = program_course_contributions(rollup, None if selected == "All" else selected)
+    st.dataframe(contributions, use_container_width=True, hide_index=True)
+
+    col_dl, col_rebuild = st.columns(2)
+    with col_dl:
+        st.download_button(
+            "📥 Download Program Rollup (CSV)",
+            table.to_csv(index=False),
+            file_name="program_po_attainment.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    with col_rebuild:
+        if st.button("🔄 Rebuild From Stored Courses", use_container_width=True, key="rebuild_rollup"):
+            rebuild_program_rollup()
+            st.success("✅ Program rollup rebuilt")
+            st.rerun()
+
+    show_cohort_standings(list(semester_rows['Semester']))
+
+
+def show_cohort_standings(semesters):
+    """CGPA rank and percentile of every student in a batch, with merit and probation lists"""
+    st.markdown("---")
+    st.markdown("#### 🏅 Cohort Standings")
+
+    batches = sorted({batch for batch in student_batches().values() if batch})
+
+    col_batch, col_semester = st.columns(2)
+    with col_batch:
+        batch = st.selectbox("Batch:", ["All Students"] + batches, key="standings_batch")
+    with col_semester:
+        through = st.selectbox("Results through semester:", ["Latest"] + semesters[::-1], key="standings_semester")
+
+    standings = compute_cohort_standings(None if batch == "All Students" else batch,
+                                         None if through == "Latest" else through)
+    if standings.empty:
+        st.info("No stored results for this cohort yet.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Students", len(standings))
+    with col2:
+        st.metric("Average CGPA", f"{standings['CGPA'].mean():.2f}")
+    with col3:
+        st.metric("Merit List", len(merit_list(standings)))
+    with col4:
+        st.metric("On Probation", len(probation_list(standings)))
+
+    tab_all, tab_merit, tab_probation = st.tabs(["📋 All Students", "🏆 Merit List", "⚠️ Probation"])
+    with tab_all:
+        st.dataframe(standings, use_container_width=True, hide_index=True)
+        st.download_button("📥 Download Standings (CSV)", standings.to_csv(index=False),
+                           file_name="cohort_standings.csv", mime="text/csv", key="download_standings")
+    with tab_merit:
+        min_cgpa = st.number_input("Minimum CGPA", 0.0, 4.0, MERIT_LIST_MIN_CGPA, 0.05, key="merit_min_cgpa")
+        merit = merit_list(standings, min_cgpa)
+        st.dataframe(merit, use_container_width=True, hide_index=True)
+        st.download_button("📥 Download Merit List (CSV)", merit.to_csv(index=False),
+                           file_name="merit_list.csv", mime="text/csv", key="download_merit")
+    with tab_probation:
+        below_cgpa = st.number_input("CGPA below", 0.0, 4.0, PROBATION_CGPA, 0.05, key="probation_cgpa")
+        probation = probation_list(standings, below_cgpa)
+        st.dataframe(probation, use_container_width=True, hide_index=True)
+        st.download_button("📥 Download Probation List (CSV)", probation.to_csv(index=False),
+                           file_name="probation_list.csv", mime="text/csv", key="download_probation")
 
 
 # ==============================================================================
@@ -3223,7 +3252,7 @@ def show_dashboard_content():
                     st.success("🎉 All students are passing!")
 
     if results.get('co_attainment'):
-        st.markdown("#### 🎯 CO Attainment (4 COs)")
+        st.markdown(f"#### 🎯 CO Attainment ({len(results['co_attainment'])} COs)")
 
         cos = list(results['co_attainment'].keys())
         values = list(results['co_attainment'].values())
@@ -3232,7 +3261,7 @@ def show_dashboard_content():
             fig = go.Figure(data=[go.Bar(
                 x=cos,
                 y=values,
-                marker_color=['#1e88e5', '#42a5f5', '#64b5f6', '#90caf9'],
+                marker_color=co_bar_colors(len(cos)),
                 text=[f'{v:.1f}%' for v in values],
                 textposition='auto'
             )])
@@ -3280,7 +3309,7 @@ def show_dashboard_content():
                         st.progress(progress)
 
             with col_top2:
-                at_risk = [s for s in students_list if s.get('total_marks', 0) < 40]
+                at_risk = [s for s in students_list if s.get('status') != 'Pass']
                 if at_risk:
                     st.markdown("##### 📉 Needs Attention (Below Passing)")
                     for student in at_risk[:3]:
@@ -3297,7 +3326,7 @@ def show_dashboard_content():
                             progress = min(marks / 100, 1.0)
                             st.progress(progress)
                 else:
-                    st.success("🎉 All students are passing (marks ≥ 40)!")
+                    st.success("🎉 All students are passing!")
         else:
             st.info("Student marks data not available")
 
@@ -3595,7 +3624,7 @@ def show_student_details(student, results):
         fig = go.Figure(data=[go.Bar(
             x=list(student['co_scores'].keys()),
             y=list(student['co_scores'].values()),
-            marker_color=['#1e88e5', '#42a5f5', '#64b5f6', '#90caf9'],
+            marker_color=co_bar_colors(len(student['co_scores'])),
             text=[f'{score}/20' for score in student['co_scores'].values()],
             textposition='auto'
         )])
@@ -3665,6 +3694,12 @@ def show_copo_analytics(results):
     """Show CO-PO attainment analytics"""
     st.markdown("#### 🎯 CO-PO Attainment Analysis")
 
+    config = results.get('attainment_config')
+    if config and config['method'] == 'threshold':
+        level1, level2, level3 = config['level_thresholds']
+        st.caption(f"CO attainment = % of students scoring at least {config['student_target']:.0f}% on the CO. "
+                   f"Level 1 from {level1:.0f}%, level 2 from {level2:.0f}%, level 3 from {level3:.0f}% of students.")
+
     col1, col2 = st.columns(2)
 
     with col1:
@@ -3682,6 +3717,9 @@ def show_copo_analytics(results):
                     color = "red"
                     status = "❌ Below Target"
 
+                if co in results.get('co_attainment_levels', {}):
+                    status += f" · Level {results['co_attainment_levels'][co]}"
+
                 fig = go.Figure(go.Indicator(
                     mode="gauge+number+delta",
                     value=attainment,
@@ -3749,11 +3787,11 @@ def show_copo_analytics(results):
 
             col_stat1, col_stat2 = st.columns(2)
             with col_stat1:
-                st.metric("POs Above Target", f"{po_above_target}/12",
-                          delta=f"{po_above_target / 12 * 100:.0f}%")
+                st.metric("POs Above Target", f"{po_above_target}/{len(po_values)}",
+                          delta=f"{po_above_target / len(po_values) * 100:.0f}%")
             with col_stat2:
-                st.metric("POs Below Minimum", f"{po_below_target}/12",
-                          delta=f"{-po_below_target / 12 * 100:.0f}%", delta_color="inverse")
+                st.metric("POs Below Minimum", f"{po_below_target}/{len(po_values)}",
+                          delta=f"{-po_below_target / len(po_values) * 100:.0f}%", delta_color="inverse")
         else:
             st.info("PO attainment data not available")
 
@@ -3761,9 +3799,13 @@ def show_copo_analytics(results):
         st.markdown("---")
         st.markdown("##### 🔗 CO-PO Correlation Insights")
 
-        if st.session_state.co_po_mapping is not None:
+        if results.get('co_po_mapping'):
+            mapping_df = copo_mapping_frame(results['co_po_mapping'])
+        else:
             mapping_df = st.session_state.co_po_mapping
 
+        if mapping_df is not None:
+
             fig = px.imshow(mapping_df.values,
                             x=mapping_df.columns,
                             y=mapping_df.index,
@@ -3791,6 +3833,102 @@ def show_copo_analytics(results):
             for insight in insights:
                 st.markdown(insight)
 
+    show_student_po_breakdown(results)
+
+
+def attainment_config_inputs(config, key_prefix):
+    """Widgets for a course's CO attainment method and targets; returns the chosen settings"""
+    config = normalize_attainment_config(config)
+    methods = list(CO_ATTAINMENT_METHODS)
+    method = st.radio("Attainment method:", methods, index=methods.index(config['method']),
+                      format_func=CO_ATTAINMENT_METHODS.get, horizontal=True, key=f"{key_prefix}_attainment_method")
+    if method == 'average':
+        return {**config, 'method': method}
+
+    student_target = st.number_input("Student target (% of CO marks)", min_value=1.0, max_value=100.0,
+                                     value=config['student_target'], step=5.0, key=f"{key_prefix}_student_target")
+    col1, col2, col3 = st.columns(3)
+    thresholds = []
+    for column, level, value in zip((col1, col2, col3), (1, 2, 3), config['level_thresholds']):
+        with column:
+            thresholds.append(st.number_input(f"Level {level}: % of students", min_value=0.0, max_value=100.0,
+                                              value=value, step=5.0, key=f"{key_prefix}_level_{level}"))
+
+    try:
+        return normalize_attainment_config({'method': method, 'student_target': student_target,
+                                            'level_thresholds': thresholds})
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return config
+
+
+def co_bar_colors(count):
+    """Blue shades for CO bar charts, repeated for courses with more than four COs"""
+    shades = ['#1e88e5', '#42a5f5', '#64b5f6', '#90caf9']
+    return [shades[i % len(shades)] for i in range(count)]
+
+
+def show_student_po_attainment(student_po, course_po):
+    """Bar chart of one student's PO attainment against the course-wide figure"""
+    pos = list(student_po.keys())
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=pos,
+        y=[student_po[po] for po in pos],
+        name="Student",
+        marker_color='#1e88e5',
+        text=[f'{student_po[po]:.1f}%' for po in pos],
+        textposition='auto'
+    ))
+    if course_po:
+        fig.add_trace(go.Scatter(
+            x=pos,
+            y=[course_po.get(po, 0) for po in pos],
+            name="Course Average",
+            mode='markers+lines',
+            line=dict(color='#F44336', dash='dash')
+        ))
+
+    fig.add_hline(y=70, line_dash="dash", line_color="green", annotation_text="Target: 70%")
+    fig.update_layout(
+        height=350,
+        xaxis_title="Program Outcomes (POs)",
+        yaxis_title="Attainment (%)",
+        yaxis_range=[0, 100],
+        template='plotly_white'
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def show_student_po_breakdown(results):
+    """Per-student PO attainment table with a drill-down chart for one student"""
+    students = [student for student in results.get('students', {}).values() if student.get('po_attainment')]
+    if not students:
+        return
+
+    st.markdown("---")
+    st.markdown("##### 👤 Per-Student PO Attainment")
+
+    po_df = pd.DataFrame([{'Student ID': student['id'], 'Name': student['name'], **student['po_attainment']}
+                          for student in students])
+    po_columns = [column for column in po_df.columns if column not in ('Student ID', 'Name')]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Students Meeting Target on All POs", int((po_df[po_columns] >= 70).all(axis=1).sum()))
+    with col2:
+        st.metric("Students Below 50% on Any PO", int((po_df[po_columns] < 50).any(axis=1).sum()))
+
+    st.dataframe(po_df, use_container_width=True, hide_index=True, height=300,
+                 column_config={po: st.column_config.ProgressColumn(po, format="%.1f%%", min_value=0, max_value=100)
+                                for po in po_columns})
+
+    student_options = {f"{student['id']} - {student['name']}": student for student in students}
+    selected = st.selectbox("Student", list(student_options.keys()), key="po_student_select")
+    if selected:
+        show_student_po_attainment(student_options[selected]['po_attainment'], results.get('po_attainment') or {})
+
 
 def show_performance_metrics(results):
     """Show detailed performance metrics"""
@@ -4227,6 +4365,8 @@ def show_no_data_analytics():
 # ==============================================================================
 def main():
     apply_professional_theme()
+    # Warm the shared prediction models once per server process, not on the first upload
+    load_prediction_models()
 
     if not st.session_state.logged_in:
         login_page()
@@ -0,0 +1,620 @@
+"""Headless batch processor for EduTrack Pro marksheets.
+
+Runs every marksheet in a directory through validation, grading, CO-PO
+attainment, AI predictions and the persistent course store without a
+Streamlit session, e.g. for nightly bulk loads from cron:
+
+    python edutrack_cli.py process /srv/marksheets --semester "Spring 2025"
+    python edutrack_cli.py process /srv/marksheets --manifest courses.csv --mapping copo.xlsx
+    python edutrack_cli.py migrate --to sqlite
+    python edutrack_cli.py migrate-users
+    python edutrack_cli.py provision --semester "Spring 2025" --course EEE101 --credentials eee101_accounts.csv
+    python edutrack_cli.py regrade --semester "Spring 2025" --scale "UGC Uniform Grading"
+    python edutrack_cli.py rollup --output program_po.csv
+    python edutrack_cli.py attainment --semester "Spring 2025" --method threshold --student-target 60
+    python edutrack_cli.py transcript --student 2021001
+    python edutrack_cli.py standings --batch 2021 --merit 10 --output merit_2021.csv
+    python edutrack_cli.py train-models --if-older-than 7
+    python edutrack_cli.py stress --uploads 40 --students 300
+    python edutrack_cli.py benchmark-predictions --sizes 100 10000 100000
+
+Without a manifest each file is one course whose code is the file name
+(EEE101.xlsx -> EEE101). Files whose content, course and mapping are
+unchanged since the last run are skipped unless --force is given. With
+--delta each file only adds or updates its students in the stored course.
+`migrate` moves an existing pickle course store into the Parquet or SQLite store;
+`migrate-users` moves users.json into the indexed SQLite user store.
+`provision` creates the missing student and parent accounts of a stored course.
+`regrade` re-grades a stored semester on another grade scale.
+`rollup` prints the program-level CO/PO attainment across all stored courses.
+`attainment` recomputes CO/PO attainment of stored courses, e.g. under new targets.
+`transcript` prints a student's materialized transcript or rebuilds all of them.
+`standings` ranks a batch by CGPA and prints its merit or probation list.
+`train-models` refits the stored AI prediction models on every stored course,
+which uploads then reuse; run it from cron to retrain on a schedule.
+`stress` saves many courses with overlapping students at once into a
+scratch store and checks that no student lost a course record, then that a
+marks-only delta correction leaves the course's CO results unchanged.
+`benchmark-predictions` times batch AI predictions against predicting one
+student at a time, for synthetic cohorts in a scratch store.
+"""
+import argparse
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import edutrack_core
+from edutrack_core import (
+    CO_ATTAINMENT_METHODS,
+    CO_MAX_SCORE,
+    DEFAULT_CREDIT_HOURS,
+    MARK_COMPONENTS,
+    MARKSHEET_FILE_TYPES,
+    MERIT_LIST_MIN_CGPA,
+    PROBATION_CGPA,
+    activate_prediction_models,
+    apply_delta_results,
+    build_course_results,
+    compute_cohort_standings,
+    fit_prediction_models,
+    generate_ai_predictions,
+    get_saved_upload_key,
+    list_prediction_models,
+    load_cached_results,
+    load_course_catalog,
+    load_grade_scales,
+    load_student_transcript,
+    load_course_results,
+    load_student_data,
+    merit_list,
+    migrate_pickles_to_parquet,
+    migrate_pickles_to_sqlite,
+    migrate_users_to_sqlite,
+    persist_course_data,
+    prediction_features,
+    probation_list,
+    program_attainment_table,
+    provision_course_accounts,
+    read_marksheet,
+    rebuild_program_rollup,
+    rebuild_transcripts,
+    recompute_stored_attainment,
+    regrade_semester,
+    store_cached_results,
+    train_prediction_models,
+    upload_cache_key,
+    validate_copo_mapping,
+    validate_marksheet
+)
+
+
+def discover_marksheets(directory):
+    """List marksheet files in a directory, sorted by name"""
+    return sorted(path for path in Path(directory).iterdir()
+                  if path.is_file() and path.suffix.lower().lstrip('.') in MARKSHEET_FILE_TYPES)
+
+
+def load_manifest(manifest_file):
+    """Read a CSV manifest with file, semester and course_code columns and an optional credit_hours column"""
+    manifest = pd.read_csv(manifest_file, dtype=str).fillna('')
+    return {row['file']: (row.get('semester', ''), row.get('course_code', ''),
+                          float(row['credit_hours']) if row.get('credit_hours', '') else None)
+            for _, row in manifest.iterrows()}
+
+
+def load_mapping(mapping_file):
+    """Read a CO-PO mapping workbook in the same layout the upload page accepts"""
+    return validate_copo_mapping(pd.read_excel(mapping_file, index_col=0))
+
+
+def process_marksheet_file(path, semester, course_code, co_po_mapping=None, force=False, reports_dir=None,
+                           delta=False, credit_hours=None, attainment_config=None):
+    """Validate, process and persist one marksheet, returning a summary row"""
+    summary = {'file': path.name, 'semester': semester, 'course_code': course_code,
+               'students': 0, 'status': '', 'detail': ''}
+
+    file_bytes = path.read_bytes()
+    upload_key = upload_cache_key(file_bytes, semester, course_code, co_po_mapping, credit_hours, attainment_config)
+
+    if not force and not delta and get_saved_upload_key(semester, course_code) == upload_key:
+        summary['status'] = 'unchanged'
+        return summary
+
+    df = read_marksheet(BytesIO(file_bytes), path.name)
+
+    problems = validate_marksheet(df)
+    if not problems.empty:
+        summary['status'] = 'invalid'
+        summary['detail'] = f"{len(problems)} validation problems"
+        if reports_dir:
+            report_file = Path(reports_dir) / f"{path.stem}_validation_errors.csv"
+            report_file.parent.mkdir(parents=True, exist_ok=True)
+            problems.to_csv(report_file, index=False)
+            summary['detail'] += f" (see {report_file})"
+        return summary
+
+    course_results = load_course_results(semester, course_code) if delta else None
+    if course_results is not None:
+        results, changed, invalid_rows = apply_delta_results(course_results, df, co_po_mapping)
+        persist_course_data(semester, course_code, results, student_ids=changed)
+
+        summary['students'] = len(changed)
+        summary['status'] = 'updated'
+        return summary
+
+    results = None if force else load_cached_results(upload_key)
+    if results is None:
+        results, invalid_rows = build_course_results([df], semester, course_code, co_po_mapping, credit_hours,
+                                                     attainment_config)
+        store_cached_results(upload_key, results)
+
+    persist_course_data(semester, course_code, results, upload_key)
+
+    summary['students'] = len(results['students'])
+    summary['status'] = 'saved'
+    return summary
+
+
+def make_stress_marksheet(student_ids, seed, co_columns=('CO1', 'CO2', 'CO3')):
+    """Random but valid marksheet for the given students"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Student_ID': student_ids,
+        'Student_Name': [f"Student {student_id}" for student_id in student_ids],
+        'Parent_Email': [f"parent{student_id}@example.com" for student_id in student_ids]
+    })
+    for column, _, maximum in MARK_COMPONENTS:
+        df[column] = rng.uniform(0, maximum, len(df)).round(1)
+    for column in co_columns:
+        df[column] = rng.uniform(0, CO_MAX_SCORE, len(df)).round(1)
+    return df
+
+
+def check_co_less_delta(semester, course_code):
+    """Apply a marks-only delta to a stored course; returns the problems found (none if CO results are kept)"""
+    results = load_course_results(semester, course_code)
+    corrected = list(results['students'])[:10]
+    before = {'co_attainment': dict(results['co_attainment']),
+              'co_scores': {student_id: dict(results['students'][student_id]['co_scores'])
+                            for student_id in corrected}}
+
+    results, _, _ = apply_delta_results(results, make_stress_marksheet(corrected, 1, co_columns=()))
+    problems = []
+    if results['co_attainment'] != before['co_attainment']:
+        problems.append(f"CO attainment changed from {before['co_attainment']} to {results['co_attainment']}")
+    problems += [f"student {student_id} CO scores changed" for student_id in corrected
+                 if results['students'][student_id]['co_scores'] != before['co_scores'][student_id]]
+    return problems
+
+
+def _stress_upload(job):
+    data_dir, backend, semester, course_code, results = job
+    edutrack_core.DATA_DIR = Path(data_dir)
+    edutrack_core.STORAGE_BACKEND = backend
+    persist_course_data(semester, course_code, results)
+    return course_code
+
+
+def run_stress(args):
+    data_dir = Path(args.stress_dir) if args.stress_dir else Path(tempfile.mkdtemp(prefix="edutrack_stress_"))
+    edutrack_core.DATA_DIR = data_dir
+    edutrack_core.STORAGE_BACKEND = args.backend
+
+    # Every course draws from one shared pool so most students are in several uploads at once
+    rng = np.random.default_rng(0)
+    pool = np.arange(10000, 10000 + args.students * 2).astype(str)
+    semester = "Stress Test"
+    jobs, expected = [], {}
+    for upload in range(args.uploads):
+        course_code = f"STR{upload:03d}"
+        student_ids = list(rng.choice(pool, args.students, replace=False))
+        results, _ = build_course_results([make_stress_marksheet(student_ids, upload)], semester, course_code)
+        jobs.append((str(data_dir), args.backend, semester, course_code, results))
+        for student_id in student_ids:
+            expected.setdefault(student_id, set()).add(f"{semester}_{course_code}")
+
+    print(f"Saving {len(jobs)} courses x {args.students} students with {args.workers} concurrent "
+          f"{args.mode} workers into {data_dir} ({edutrack_core.active_storage_backend()} backend)", flush=True)
+    executor = ThreadPoolExecutor if args.mode == "thread" else ProcessPoolExecutor
+    started = pd.Timestamp.now()
+    with executor(max_workers=args.workers) as pool_executor:
+        list(pool_executor.map(_stress_upload, jobs))
+    elapsed = (pd.Timestamp.now() - started).total_seconds()
+
+    lost = {student_id: sorted(courses - set(load_student_data(student_id)))
+            for student_id, courses in expected.items()}
+    lost = {student_id: courses for student_id, courses in lost.items() if courses}
+    missing_courses = [job[3] for job in jobs if load_course_results(semester, job[3]) is None]
+    missing_catalog = [job[3] for job in jobs if f"{semester} - {job[3]}" not in load_course_catalog()]
+
+    print(f"Saved in {elapsed:.1f}s")
+    print(f"Students checked: {len(expected)}, with lost course records: {len(lost)}")
+    print(f"Courses missing from the store: {len(missing_courses)}, from the catalog: {len(missing_catalog)}")
+    for student_id, courses in list(lost.items())[:10]:
+        print(f"  student {student_id} lost {', '.join(courses)}")
+
+    delta_problems = check_co_less_delta(semester, jobs[0][3]) if jobs else []
+    print(f"Marks-only delta keeps CO results: {'no' if delta_problems else 'yes'}")
+    for problem in delta_problems:
+        print(f"  {problem}")
+
+    return 1 if lost or missing_courses or missing_catalog or delta_problems else 0
+
+
+def run_benchmark_predictions(args):
+    # Cohorts are processed in a scratch store seeded by a small course, so building them never fits on the cohort
+    edutrack_core.DATA_DIR = Path(tempfile.mkdtemp(prefix="edutrack_benchmark_"))
+    build_course_results([make_stress_marksheet([str(i) for i in range(100)], 0)], "Benchmark", "SEED")
+
+    rows = []
+    for size in args.sizes:
+        student_ids = [str(100000 + i) for i in range(size)]
+        results, _ = build_course_results([make_stress_marksheet(student_ids, size)], "Benchmark", f"B{size}")
+        _, X = prediction_features(results)
+
+        started = pd.Timestamp.now()
+        models = fit_prediction_models(X)
+        fit_seconds = (pd.Timestamp.now() - started).total_seconds()
+
+        started = pd.Timestamp.now()
+        predictions = generate_ai_predictions(results, models=models)
+        batch_seconds = (pd.Timestamp.now() - started).total_seconds()
+
+        # What scoring cost before: both models called once per student
+        sample = X[:min(size, args.loop_sample), 1:]
+        started = pd.Timestamp.now()
+        for features in sample:
+            models['academic'].predict([features])
+            models['career'].predict([features])
+        loop_seconds = (pd.Timestamp.now() - started).total_seconds() * size / len(sample)
+
+        rows.append({'students': size, 'predictions': len(predictions), 'fit_s': round(fit_seconds, 3),
+                     'batch_predict_s': round(batch_seconds, 3), 'per_student_predict_s': round(loop_seconds, 3),
+                     'speedup': round(loop_seconds / batch_seconds, 1) if batch_seconds else None})
+        print(f"{size} students done", flush=True)
+
+    print()
+    print(pd.DataFrame(rows).to_string(index=False))
+    if any(size > args.loop_sample for size in args.sizes):
+        print(f"\nper_student_predict_s is scaled up from the first {args.loop_sample} students of each cohort")
+    return 0
+
+
+def add_attainment_arguments(parser):
+    parser.add_argument("--method", choices=list(CO_ATTAINMENT_METHODS),
+                        help="CO attainment: class average, or share of students reaching --student-target")
+    parser.add_argument("--student-target", type=float, help="CO score (%% of its marks) a student must reach")
+    parser.add_argument("--level-thresholds", type=float, nargs=3, metavar=("L1", "L2", "L3"),
+                        help="%% of students reaching the target for attainment levels 1, 2 and 3")
+
+
+def attainment_config_from_args(args):
+    """Attainment settings given on the command line, or None if none were given"""
+    config = {key: value for key, value in (('method', args.method), ('student_target', args.student_target),
+                                            ('level_thresholds', args.level_thresholds)) if value is not None}
+    return config or None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="EduTrack Pro batch jobs that run without Streamlit.")
+    parser.add_argument("--data-dir", default=str(Path(__file__).resolve().parent / "course_data"),
+                        help="Course store directory shared with the app (default: course_data next to this script)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    process = commands.add_parser("process", help="Process a directory of marksheets into the course store")
+    process.add_argument("directory", help="Directory containing .xlsx, .xls, .csv or .parquet marksheets")
+    process.add_argument("--semester", help="Semester for every file, e.g. \"Spring 2025\"")
+    process.add_argument("--manifest", help="CSV with file, semester and course_code columns (overrides defaults)")
+    process.add_argument("--mapping", help="CO-PO mapping workbook with any number of CO rows and PO/PSO columns; "
+                                           "the default mapping is used otherwise")
+    process.add_argument("--credit-hours", type=float, default=DEFAULT_CREDIT_HOURS,
+                         help="Credit hours of every course unless the manifest gives them (default: %(default)s)")
+    process.add_argument("--reports-dir", help="Write a validation error CSV here for every rejected file")
+    process.add_argument("--force", action="store_true", help="Reprocess files even if unchanged since the last run")
+    process.add_argument("--delta", action="store_true",
+                         help="Treat files as corrections: add or update only the listed students of stored courses")
+    add_attainment_arguments(process)
+
+    migrate = commands.add_parser("migrate", help="One-time migration of the pickle course store")
+    migrate.add_argument("--to", choices=["parquet", "sqlite"], default="parquet",
+                         help="Target store: partitioned Parquet files or an indexed SQLite database")
+
+    migrate_users = commands.add_parser("migrate-users", help="One-time copy of users.json into the SQLite user store")
+    migrate_users.add_argument("--users-file", default=str(Path(__file__).resolve().parent / "users.json"),
+                               help="users.json to migrate; users.db is created next to it")
+
+    provision = commands.add_parser("provision", help="Create missing student and parent accounts for a stored course")
+    provision.add_argument("--semester", required=True, help="Semester of the stored course")
+    provision.add_argument("--course", required=True, help="Course code of the stored course")
+    provision.add_argument("--batch", default="", help="Batch recorded on new student accounts")
+    provision.add_argument("--users-file", default=str(Path(__file__).resolve().parent / "users.json"),
+                           help="users.json of the app; users.db next to it is used if present")
+    provision.add_argument("--credentials", required=True,
+                           help="CSV to write the new accounts' initial passwords to")
+
+    regrade = commands.add_parser("regrade", help="Re-grade every stored course of a semester on a grade scale")
+    regrade.add_argument("--semester", required=True, help="Semester to re-grade")
+    regrade.add_argument("--scale", help="Grade scale name (default: the active scale)")
+
+    rollup = commands.add_parser("rollup", help="Program-level CO/PO attainment across all stored courses")
+    rollup.add_argument("--rebuild", action="store_true", help="Recompute the rollup from the stored courses first")
+    rollup.add_argument("--output", help="Also write the rollup table to this CSV file")
+
+    attainment = commands.add_parser("attainment", help="Recompute CO/PO attainment of stored courses")
+    attainment.add_argument("--semester", help="Only this semester (default: all)")
+    attainment.add_argument("--course", help="Only this course code (default: all)")
+    add_attainment_arguments(attainment)
+
+    transcript = commands.add_parser("transcript", help="Show a student's transcript and CGPA by semester")
+    transcript.add_argument("--student", help="Student ID to show")
+    transcript.add_argument("--rebuild", action="store_true",
+                            help="Recompute every student's transcript from the stored courses first")
+
+    standings = commands.add_parser("standings", help="Rank a batch by CGPA, or list its merit or probation students")
+    standings.add_argument("--batch", help="Batch of the student accounts to rank (default: every stored student)")
+    standings.add_argument("--semester", help="Rank on results up to and including this semester (default: all)")
+    group = standings.add_mutually_exclusive_group()
+    group.add_argument("--merit", type=int, nargs="?", const=0, metavar="TOP",
+                       help="Only students with a CGPA of at least --min-cgpa, optionally only the first TOP")
+    group.add_argument("--probation", action="store_true", help="Only students with a CGPA below --min-cgpa")
+    standings.add_argument("--min-cgpa", type=float,
+                           help=f"CGPA cut-off (default: {MERIT_LIST_MIN_CGPA} for --merit, {PROBATION_CGPA} for --probation)")
+    standings.add_argument("--users-file", default=str(Path(__file__).resolve().parent / "users.json"),
+                           help="users.json of the app, for student batches; users.db next to it is used if present")
+    standings.add_argument("--output", help="Also write the list to this CSV file")
+
+    train = commands.add_parser("train-models", help="Refit the AI prediction models on every stored course")
+    train.add_argument("--if-older-than", type=float, metavar="DAYS",
+                       help="Only retrain if the active models are at least this many days old (for cron)")
+    train.add_argument("--activate", type=int, metavar="VERSION", help="Roll back to a kept version instead")
+    train.add_argument("--list", action="store_true", help="Only list the stored model versions")
+
+    stress = commands.add_parser("stress", help="Check that concurrent uploads never lose student records")
+    stress.add_argument("--uploads", type=int, default=24, help="Number of courses saved at once")
+    stress.add_argument("--students", type=int, default=200, help="Students per course, drawn from a shared pool")
+    stress.add_argument("--workers", type=int, default=12, help="Concurrent writers")
+    stress.add_argument("--mode", choices=["thread", "process"], default="thread",
+                        help="Writers as threads (like Streamlit sessions) or separate processes (like CLI runs)")
+    stress.add_argument("--backend", choices=["pickle", "parquet", "sqlite"], default="pickle",
+                        help="Storage backend to exercise (default: pickle files)")
+    stress.add_argument("--stress-dir", help="Scratch store to write into (default: a new temporary directory); "
+                                             "never point this at live data")
+
+    benchmark = commands.add_parser("benchmark-predictions",
+                                    help="Time batch AI predictions against one predict call per student")
+    benchmark.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000],
+                           help="Cohort sizes to time (default: %(default)s)")
+    benchmark.add_argument("--loop-sample", type=int, default=500,
+                           help="Students timed one at a time; the per-student figure is scaled up from them")
+    return parser
+
+
+def run_process(args):
+    manifest = load_manifest(args.manifest) if args.manifest else {}
+    co_po_mapping = load_mapping(args.mapping) if args.mapping else None
+    attainment_config = attainment_config_from_args(args)
+
+    summaries = []
+    for path in discover_marksheets(args.directory):
+        semester, course_code, credit_hours = manifest.get(path.name, ('', '', None))
+        semester = semester or args.semester
+        course_code = (course_code or path.stem).strip().upper()
+
+        if not semester:
+            summaries.append({'file': path.name, 'semester': '', 'course_code': course_code,
+                              'students': 0, 'status': 'skipped', 'detail': "no semester given"})
+            continue
+
+        try:
+            summaries.append(process_marksheet_file(path, semester, course_code, co_po_mapping,
+                                                    args.force, args.reports_dir, args.delta,
+                                                    credit_hours or args.credit_hours, attainment_config))
+        except Exception as e:
+            summaries.append({'file': path.name, 'semester': semester, 'course_code': course_code,
+                              'students': 0, 'status': 'failed', 'detail': str(e)})
+
+        print(f"{path.name}: {summaries[-1]['status']}", flush=True)
+
+    if not summaries:
+        print(f"No marksheets found in {args.directory}")
+        return 0
+
+    print()
+    print(pd.DataFrame(summaries).to_string(index=False))
+
+    failed = [row for row in summaries if row['status'] in ('invalid', 'failed', 'skipped')]
+    return 1 if failed else 0
+
+
+def run_migrate(args):
+    if args.to == "sqlite":
+        migrated = migrate_pickles_to_sqlite()
+        target = edutrack_core.DATA_DIR / edutrack_core.SQLITE_DB_FILE
+    else:
+        migrated = migrate_pickles_to_parquet()
+        target = edutrack_core.DATA_DIR / edutrack_core.COLUMNAR_DIR
+    print(f"Migrated {migrated} courses to {target}")
+    return 0
+
+
+def run_migrate_users(args):
+    edutrack_core.USERS_FILE = Path(args.users_file)
+    edutrack_core.USERS_DB_FILE = edutrack_core.USERS_FILE.with_name("users.db")
+    migrated = migrate_users_to_sqlite()
+    print(f"Migrated {migrated} user accounts to {edutrack_core.USERS_DB_FILE}")
+    return 0
+
+
+def run_provision(args):
+    edutrack_core.USERS_FILE = Path(args.users_file)
+    edutrack_core.USERS_DB_FILE = edutrack_core.USERS_FILE.with_name("users.db")
+
+    course_code = args.course.strip().upper()
+    results = load_course_results(args.semester, course_code)
+    if results is None:
+        print(f"No stored course {args.semester} {course_code}")
+        return 1
+
+    report = provision_course_accounts(results, batch=args.batch)
+    report['credentials'].to_csv(args.credentials, index=False)
+
+    print(f"Students: {report['students_created']} created, {report['students_skipped']} skipped")
+    print(f"Parents:  {report['parents_created']} created, {report['parents_skipped']} skipped")
+    print(f"Initial passwords written to {args.credentials}")
+    return 0
+
+
+def run_regrade(args):
+    scales = load_grade_scales()
+    if args.scale and args.scale not in scales:
+        print(f"Unknown grade scale '{args.scale}'; available: {', '.join(scales)}")
+        return 1
+
+    started = pd.Timestamp.now()
+    courses, students = regrade_semester(args.semester, args.scale)
+    elapsed = (pd.Timestamp.now() - started).total_seconds()
+    print(f"Re-graded {students} results in {courses} courses of {args.semester} in {elapsed:.2f}s")
+    return 0
+
+
+def run_rollup(args):
+    rollup = rebuild_program_rollup() if args.rebuild else None
+    table = program_attainment_table(rollup)
+    if table.empty:
+        print(f"No courses stored in {edutrack_core.DATA_DIR}")
+        return 0
+
+    print(table.to_string(index=False))
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"\nRollup written to {args.output}")
+    return 0
+
+
+def run_attainment(args):
+    started = pd.Timestamp.now()
+    courses = recompute_stored_attainment(args.semester, args.course and args.course.upper(),
+                                          attainment_config_from_args(args))
+    elapsed = (pd.Timestamp.now() - started).total_seconds()
+    print(f"Recomputed CO/PO attainment of {courses} courses in {elapsed:.2f}s")
+    return 0
+
+
+def run_transcript(args):
+    if args.rebuild:
+        started = pd.Timestamp.now()
+        students = rebuild_transcripts()
+        elapsed = (pd.Timestamp.now() - started).total_seconds()
+        print(f"Rebuilt transcripts of {students} students in {elapsed:.2f}s")
+    if not args.student:
+        return 0
+
+    transcript = load_student_transcript(args.student)
+    if not transcript['courses']:
+        print(f"No courses stored for student {args.student}")
+        return 1
+
+    print(pd.DataFrame(transcript['courses']).to_string(index=False))
+    print()
+    semesters = pd.DataFrame(transcript['semesters'])
+    semesters['courses'] = semesters['courses'].str.join(', ')
+    print(semesters.to_string(index=False))
+    return 0
+
+
+def run_standings(args):
+    edutrack_core.USERS_FILE = Path(args.users_file)
+    edutrack_core.USERS_DB_FILE = edutrack_core.USERS_FILE.with_name("users.db")
+
+    started = pd.Timestamp.now()
+    standings = compute_cohort_standings(args.batch, args.semester)
+    elapsed = (pd.Timestamp.now() - started).total_seconds()
+    if standings.empty:
+        print(f"No stored results for this cohort in {edutrack_core.DATA_DIR}")
+        return 0
+
+    if args.merit is not None:
+        standings = merit_list(standings, args.min_cgpa if args.min_cgpa is not None else MERIT_LIST_MIN_CGPA,
+                               args.merit or None)
+    elif args.probation:
+        standings = probation_list(standings, args.min_cgpa if args.min_cgpa is not None else PROBATION_CGPA)
+
+    print(standings.to_string(index=False))
+    print(f"\n{len(standings)} students, ranked in {elapsed:.2f}s")
+    if args.output:
+        standings.to_csv(args.output, index=False)
+        print(f"Standings written to {args.output}")
+    return 0
+
+
+def run_train_models(args):
+    if args.activate is not None:
+        try:
+            activate_prediction_models(args.activate)
+        except ValueError as e:
+            print(e)
+            return 1
+        print(f"Prediction model version {args.activate} is now active")
+        return 0
+
+    versions = list_prediction_models()
+    active = next((entry for entry in versions if entry['active']), None)
+    if not args.list:
+        age_days = (pd.Timestamp.now() - pd.Timestamp(active['trained_at'])).total_seconds() / 86400 if active else None
+        if args.if_older_than is not None and age_days is not None and age_days < args.if_older_than:
+            print(f"Version {active['version']} is {age_days:.1f} days old; not retraining")
+            return 0
+
+        started = pd.Timestamp.now()
+        trained = train_prediction_models()
+        elapsed = (pd.Timestamp.now() - started).total_seconds()
+        if trained is None:
+            print(f"Not enough stored results in {edutrack_core.DATA_DIR} to train on")
+            return 1
+        print(f"Trained version {trained['version']} on {trained['training_rows']} results from "
+              f"{trained['courses']} courses in {elapsed:.2f}s")
+        versions = list_prediction_models()
+
+    if versions:
+        print(pd.DataFrame(versions).to_string(index=False))
+    else:
+        print(f"No prediction models stored in {edutrack_core.DATA_DIR}")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    edutrack_core.DATA_DIR = Path(args.data_dir)
+
+    if args.command == "migrate":
+        return run_migrate(args)
+    if args.command == "migrate-users":
+        return run_migrate_users(args)
+    if args.command == "provision":
+        return run_provision(args)
+    if args.command == "regrade":
+        return run_regrade(args)
+    if args.command == "attainment":
+        return run_attainment(args)
+    if args.command == "transcript":
+        return run_transcript(args)
+    if args.command == "rollup":
+        return run_rollup(args)
+    if args.command == "standings":
+        return run_standings(args)
+    if args.command == "train-models":
+        return run_train_models(args)
+    if args.command == "stress":
+        return run_stress(args)
+    if args.command == "benchmark-predictions":
+        return run_benchmark_predictions(args)
+    return run_process(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3223 @@
+"""EduTrack Pro computation core.
+
+Grading, CO-PO attainment, marksheet ingestion and AI predictions, kept free of
+Streamlit so the same logic runs in the app, in worker processes and in
+headless batch jobs.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import OrderedDict
+from contextlib import contextmanager
+from copy import deepcopy
+from functools import lru_cache
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from scipy import sparse
+from sklearn.linear_model import LinearRegression
+from sklearn.ensemble import RandomForestClassifier
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CALCULATION FUNCTIONS
+# ==============================================================================
+# Default grade scale: (lowest total marks, letter grade, SGPA points, description),
+# highest band first. Below 40 the letter stays F while SGPA keeps stepping down.
+DEFAULT_GRADE_SCALE_NAME = "BAETE (default)"
+DEFAULT_GRADE_SCALE = [
+    (80, "A+", 4.00, "Excellent"),
+    (75, "A", 3.75, "Very Good"),
+    (70, "A-", 3.50, "Good"),
+    (65, "B+", 3.25, "Above Average"),
+    (60, "B", 3.00, "Average"),
+    (55, "B-", 2.75, "Below Average"),
+    (50, "C+", 2.50, "Satisfactory"),
+    (45, "C", 2.25, "Marginal"),
+    (40, "D", 2.00, "Pass"),
+    (35, "F", 1.75, "Fail"),
+    (30, "F", 1.50, "Fail"),
+    (25, "F", 1.25, "Fail"),
+    (20, "F", 1.00, "Fail"),
+    (0, "F", 0.00, "Fail")
+]
+
+BUILTIN_GRADE_SCALES = {
+    DEFAULT_GRADE_SCALE_NAME: DEFAULT_GRADE_SCALE,
+    # UGC uniform grading system for Bangladeshi universities: no grade points below 40
+    "UGC Uniform Grading": [row for row in DEFAULT_GRADE_SCALE if row[0] >= 40] + [(0, "F", 0.00, "Fail")]
+}
+
+
+def scale_row_passes(row):
+    """Whether a grade scale row is a passing band: it earns points and is not an F or "Fail" band"""
+    return float(row[2]) > 0 and str(row[1]).strip().upper() != "F" and str(row[3]).strip().lower() != "fail"
+
+
+def compile_grade_scale(scale):
+    """Turn scale rows into ascending boundary/grade/points arrays for searchsorted lookup"""
+    rows = sorted(scale, key=lambda row: row[0])
+    boundaries = np.array([-np.inf] + [float(row[0]) for row in rows[1:]])
+    return {
+        'boundaries': boundaries,
+        'grades': np.array([row[1] for row in rows], dtype=object),
+        'points': np.array([float(row[2]) for row in rows]),
+        'passing': np.array([scale_row_passes(row) for row in rows]),
+        'descriptions': {row[1]: row[3] for row in reversed(rows)}
+    }
+
+
+_DEFAULT_COMPILED_SCALE = compile_grade_scale(DEFAULT_GRADE_SCALE)
+
+
+def _scale_band(total_marks, scale):
+    compiled = _DEFAULT_COMPILED_SCALE if scale is None else scale
+    if not isinstance(compiled, dict):
+        compiled = compile_grade_scale(compiled)
+    marks = np.asarray(total_marks, dtype=float)
+    idx = np.searchsorted(compiled['boundaries'], marks, side='right') - 1
+    # A missing or non-finite total gets the lowest (failing) band, as the old if/elif chain gave NaN 0.00/F
+    return compiled, np.where(np.isfinite(marks), idx, 0)
+
+
+def grade_marks(total_marks, scale=None):
+    """Letter grades and SGPA points for a whole array of total marks in one lookup
+
+    `scale` is a list of scale rows or a compiled scale; the default scale if omitted.
+    """
+    compiled, idx = _scale_band(total_marks, scale)
+    return compiled['grades'][idx], compiled['points'][idx]
+
+
+def passing_marks(total_marks, scale=None):
+    """Boolean array: which total marks fall in a passing band of the scale (see scale_row_passes)"""
+    compiled, idx = _scale_band(total_marks, scale)
+    return compiled['passing'][idx]
+
+
+def calculate_sgpa(total_marks):
+    """Convert total marks to SGPA (4.0 scale)"""
+    return float(grade_marks([total_marks])[1][0])
+
+
+def get_grade_from_marks(total_marks):
+    """Get letter grade from total marks"""
+    return grade_marks([total_marks])[0][0]
+
+
+def get_grade_description(grade, scale=None):
+    """Get description for grade"""
+    compiled = _DEFAULT_COMPILED_SCALE if scale is None else compile_grade_scale(scale)
+    return compiled['descriptions'].get(grade, "Unknown")
+
+
+def calculate_total_marks(student_data):
+    """Calculate total marks out of 100"""
+    academic_marks = (
+            student_data['mid'] +
+            student_data['final'] +
+            student_data['ct'] +
+            student_data['assignment']
+    )
+    return min(academic_marks + student_data['attendance'], 100)
+
+
+def create_default_copo_mapping():
+    """Create default CO-PO mapping matrix (4 COs x 12 POs)"""
+    mapping = {
+        'PO1': [3, 3, 2, 1],
+        'PO2': [3, 3, 3, 1],
+        'PO3': [2, 3, 2, 1],
+        'PO4': [1, 2, 3, 2],
+        'PO5': [2, 2, 3, 1],
+        'PO6': [1, 1, 1, 3],
+        'PO7': [1, 1, 1, 2],
+        'PO8': [1, 1, 1, 3],
+        'PO9': [1, 2, 2, 3],
+        'PO10': [1, 2, 2, 3],
+        'PO11': [1, 2, 2, 2],
+        'PO12': [2, 2, 2, 3]
+    }
+
+    return pd.DataFrame(mapping, index=['CO1', 'CO2', 'CO3', 'CO4'])
+
+
+def _outcome_sort_key(name):
+    # PO1..PO12 before PSO1..PSOn, numerically within each prefix
+    match = re.match(r'^([A-Za-z]+)(\d*)$', str(name))
+    if not match:
+        return (2, str(name), 0)
+    prefix, number = match.groups()
+    return (0 if prefix.upper() == 'PO' else 1, prefix.upper(), int(number or 0))
+
+
+def sparse_copo_mapping(co_po_mapping):
+    """{CO: {PO: weight}} holding only the positive strengths of a mapping
+
+    Accepts a mapping DataFrame (COs x POs/PSOs) or an already sparse dict.
+    """
+    if co_po_mapping is None:
+        return None
+    if isinstance(co_po_mapping, dict):
+        return {co: {po: float(weight) for po, weight in row.items() if weight and weight > 0}
+                for co, row in co_po_mapping.items()}
+    values = co_po_mapping.apply(pd.to_numeric, errors='coerce').fillna(0)
+    return {str(co): {str(po): float(weight) for po, weight in row.items() if weight > 0}
+            for co, row in values.iterrows()}
+
+
+def mapping_outcomes(sparse_mapping):
+    """Sorted PO/PSO names that any CO of a sparse mapping contributes to"""
+    return sorted({po for row in sparse_mapping.values() for po in row}, key=_outcome_sort_key)
+
+
+def copo_mapping_frame(sparse_mapping, po_names=None):
+    """Dense COs x POs DataFrame of a sparse mapping, for display"""
+    po_names = po_names or mapping_outcomes(sparse_mapping)
+    return pd.DataFrame([[row.get(po, 0) for po in po_names] for row in sparse_mapping.values()],
+                        index=list(sparse_mapping.keys()), columns=po_names)
+
+
+def validate_copo_mapping(mapping_df):
+    """Check an uploaded CO-PO mapping (COs as rows, POs/PSOs as columns) and return it numeric
+
+    Any number of COs and outcome columns is accepted; strengths must be 0-3.
+    Raises ValueError describing the first problem found.
+    """
+    if mapping_df.empty or len(mapping_df.columns) == 0:
+        raise ValueError("Mapping file must have at least one CO row and one PO column")
+
+    values = mapping_df.apply(pd.to_numeric, errors='coerce')
+    if (values.isna() & mapping_df.notna()).any().any():
+        raise ValueError("Mapping strengths must be numbers between 0 and 3")
+    values = values.fillna(0)
+    if ((values < 0) | (values > 3)).any().any():
+        raise ValueError("Mapping strengths must be numbers between 0 and 3")
+    if values.index.astype(str).duplicated().any():
+        raise ValueError("Mapping file has duplicate CO rows")
+
+    values.index = values.index.astype(str).str.strip()
+    values.columns = values.columns.astype(str).str.strip()
+    return values
+
+
+def mapping_weight_matrix(co_po_mapping, co_names, po_names=None):
+    """Sparse (COs x POs) weight matrix of a mapping for the given CO order
+
+    COs missing from the mapping get empty rows. Returns (CSR matrix, PO names).
+    """
+    if not isinstance(co_po_mapping, dict) and po_names is None:
+        po_names = [str(po) for po in co_po_mapping.columns]
+    mapping = sparse_copo_mapping(co_po_mapping)
+    po_names = po_names or mapping_outcomes(mapping)
+    po_index = {po: j for j, po in enumerate(po_names)}
+
+    rows, cols, weights = [], [], []
+    for i, co in enumerate(co_names):
+        for po, weight in mapping.get(co, {}).items():
+            if po in po_index:
+                rows.append(i)
+                cols.append(po_index[po])
+                weights.append(weight)
+    matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(len(co_names), len(po_names)))
+    return matrix, po_names
+
+
+def calculate_po_attainment_matrix(co_matrix, co_names, co_po_mapping):
+    """PO attainment (%) for many CO score rows at once as one weighted matrix product
+
+    `co_matrix` is (rows x COs) of CO scores out of 20 in `co_names` order and
+    `co_po_mapping` a mapping DataFrame or sparse dict, for any number of COs
+    and POs/PSOs. Each PO is the average of its mapped COs' attainment
+    weighted by the positive mapping strengths, capped at 100. Returns
+    (rows x POs, PO names).
+    """
+    weights, po_names = mapping_weight_matrix(co_po_mapping, list(co_names))
+
+    scores = np.asarray(co_matrix, dtype=float).reshape(-1, len(co_names)) / CO_MAX_SCORE * 100
+    total_weight = np.asarray(weights.sum(axis=0)).ravel()
+    weighted = np.asarray((weights.T @ scores.T).T)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        po_matrix = np.where(total_weight > 0, np.minimum(100, weighted / total_weight), 0)
+    return po_matrix, po_names
+
+
+def calculate_po_attainment(co_scores, co_po_mapping):
+    """Calculate PO attainment from CO scores using mapping matrix"""
+    if co_po_mapping is None or not co_scores:
+        return None
+
+    co_names = list(co_scores.keys())
+    po_matrix, po_names = calculate_po_attainment_matrix([list(co_scores.values())], co_names, co_po_mapping)
+    return dict(zip(po_names, po_matrix[0].tolist()))
+
+
+def attach_student_po_attainment(students, co_po_mapping):
+    """Store each student's own PO attainment on their record, for all students in one product"""
+    students = list(students)
+    if not students or co_po_mapping is None:
+        return
+    co_names = list(students[0].get('co_scores', {}).keys())
+    if not co_names:
+        return
+
+    co_matrix = np.array([[student['co_scores'].get(co, 0.0) for co in co_names] for student in students])
+    po_matrix, po_names = calculate_po_attainment_matrix(co_matrix, co_names, co_po_mapping)
+    for student, po_row in zip(students, np.round(po_matrix, 2).tolist()):
+        student['po_attainment'] = dict(zip(po_names, po_row))
+
+
+CO_ATTAINMENT_METHODS = {
+    'average': "Class average (mean CO score %)",
+    'threshold': "Students reaching target (levels 1/2/3)"
+}
+
+DEFAULT_ATTAINMENT_CONFIG = {
+    'method': 'average',
+    'student_target': 60.0,
+    'level_thresholds': [50.0, 60.0, 70.0]
+}
+
+
+def normalize_attainment_config(config=None):
+    """Fill in defaults and check a course's CO attainment settings, raising ValueError
+
+    `student_target` is the CO score (% of its marks) a student must reach;
+    `level_thresholds` are the % of students reaching it for levels 1, 2 and 3.
+    """
+    config = {**DEFAULT_ATTAINMENT_CONFIG, **(config or {})}
+    if config['method'] not in CO_ATTAINMENT_METHODS:
+        raise ValueError(f"Unknown CO attainment method '{config['method']}'")
+
+    target = float(config['student_target'])
+    if not 0 < target <= 100:
+        raise ValueError("Student target must be between 0 and 100%")
+
+    thresholds = [float(value) for value in config['level_thresholds']]
+    if len(thresholds) != 3 or thresholds != sorted(thresholds) or not 0 <= thresholds[0] or thresholds[-1] > 100:
+        raise ValueError("Level thresholds must be three ascending percentages between 0 and 100")
+
+    return {'method': config['method'], 'student_target': target, 'level_thresholds': thresholds}
+
+
+def calculate_co_attainment(co_frame, config=None):
+    """CO attainment (%) per CO column of a (students x COs) frame, plus levels for the threshold method
+
+    'average' is the class mean score; 'threshold' is the share of students
+    scoring at least the target, mapped to level 0-3 by the level thresholds.
+    Returns (attainment, levels); levels is {} for the average method.
+    """
+    config = normalize_attainment_config(config)
+    if co_frame.empty:
+        return {}, {}
+
+    if config['method'] == 'average':
+        return {col: round(co_frame[col].mean() * 5, 2) for col in co_frame.columns}, {}
+
+    target_score = config['student_target'] / 100 * CO_MAX_SCORE
+    reaching = (co_frame.to_numpy(dtype=float) >= target_score).mean(axis=0) * 100
+    levels = np.searchsorted(config['level_thresholds'], reaching, side='right')
+    return (dict(zip(co_frame.columns, np.round(reaching, 2).tolist())),
+            dict(zip(co_frame.columns, levels.tolist())))
+
+
+def course_co_frame(students, co_names=None):
+    """(students x COs) frame of the CO scores stored on student records"""
+    frame = pd.DataFrame([student.get('co_scores', {}) for student in students])
+    if co_names:
+        frame = frame.reindex(columns=co_names)
+    return frame.fillna(0.0)
+
+
+# ==============================================================================
+# MARKSHEET INGESTION
+# ==============================================================================
+MARKSHEET_FILE_TYPES = ['xlsx', 'xls', 'csv', 'parquet']
+
+
+def read_marksheet(source, file_name):
+    """Read a whole marksheet, using Arrow's multithreaded readers for CSV and Parquet"""
+    name = file_name.lower()
+    if name.endswith('.csv'):
+        return pd.read_csv(source, engine='pyarrow')
+    if name.endswith('.parquet'):
+        return pd.read_parquet(source, engine='pyarrow')
+    if name.endswith('.xlsx'):
+        return pd.read_excel(source)
+    return pd.read_excel(source, engine='openpyxl')
+
+
+STREAM_CHUNK_ROWS = 5000
+
+
+def iter_excel_chunks(source, chunk_size=STREAM_CHUNK_ROWS, on_progress=None):
+    """Yield the first worksheet as DataFrame chunks through openpyxl's read-only row iterator"""
+    from openpyxl import load_workbook
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        columns = [str(name) if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+        width = len(columns)
+        total_rows = max((worksheet.max_row or 1) - 1, 0)
+
+        # Blank rows are skipped, but the index keeps each row's position in the sheet
+        # (spreadsheet row = index + 2) so validation reports the rows the user sees
+        rows_read = 0
+        buffer, positions = [], []
+        for position, row in enumerate(rows):
+            if all(value is None for value in row):
+                continue
+
+            buffer.append((tuple(row) + (None,) * width)[:width])
+            positions.append(position)
+            if len(buffer) == chunk_size:
+                yield pd.DataFrame.from_records(buffer, columns=columns, index=positions)
+                rows_read += len(buffer)
+                buffer, positions = [], []
+                if on_progress:
+                    on_progress(rows_read, total_rows)
+
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns, index=positions)
+            rows_read += len(buffer)
+            if on_progress:
+                on_progress(rows_read, total_rows)
+    finally:
+        workbook.close()
+
+
+def read_excel_preview(source, n_rows=10):
+    """Read only the header and first rows of a workbook for previewing"""
+    chunks = iter_excel_chunks(source, chunk_size=n_rows)
+    try:
+        return next(chunks, pd.DataFrame())
+    finally:
+        chunks.close()
+
+
+# ==============================================================================
+# DATA PROCESSING
+# ==============================================================================
+# Marksheet column, internal key and maximum marks for each assessed component
+MARK_COMPONENTS = [
+    ('Mid_Total', 'mid', 30),
+    ('Final_Total', 'final', 40),
+    ('CT_Total', 'ct', 20),
+    ('Assignment_Total', 'assignment', 5),
+    ('Attendance_Total', 'attendance', 5)
+]
+
+# Marksheets may carry any number of CO1, CO2, ... columns; these four are assumed when none are present
+CO_COLUMNS = [f'CO{i}' for i in range(1, 5)]
+CO_COLUMN_PATTERN = re.compile(r'^CO(\d+)$')
+CO_MAX_SCORE = 20
+
+
+def detect_co_columns(columns):
+    """CO columns of a marksheet in numeric order (CO1, CO2, ..., CO10)"""
+    found = [str(column) for column in columns if CO_COLUMN_PATTERN.match(str(column))]
+    if not found:
+        return list(CO_COLUMNS)
+    return sorted(found, key=lambda column: int(CO_COLUMN_PATTERN.match(column).group(1)))
+
+
+def _numeric_column(df, column, maximum, invalid):
+    """Clip one marksheet column to [0, maximum], flagging non-numeric cells in `invalid`"""
+    if column not in df.columns:
+        return np.zeros(len(df))
+
+    raw = df[column]
+    values = pd.to_numeric(raw, errors='coerce')
+    invalid |= (values.isna() & raw.notna()).to_numpy()
+    return values.fillna(0).clip(0, maximum).to_numpy(dtype=float)
+
+
+def compute_marksheet(df, semester, course_code, grade_scale=None, co_columns=None):
+    """Grade a whole marksheet column-wise and build the per-student result dicts
+
+    `grade_scale` is a list of scale rows; the admin's active scale if omitted.
+    `co_columns` are detected from the marksheet if omitted.
+    """
+    co_columns = co_columns or detect_co_columns(df.columns)
+    compiled_scale = compile_grade_scale(grade_scale if grade_scale is not None else get_active_grade_scale()[1])
+    n_rows = len(df)
+    invalid = np.zeros(n_rows, dtype=bool)
+
+    marks = {key: _numeric_column(df, column, maximum, invalid)
+             for column, key, maximum in MARK_COMPONENTS}
+    co_matrix = np.column_stack([_numeric_column(df, co, CO_MAX_SCORE, invalid) for co in co_columns])
+
+    academic_total = marks['mid'] + marks['final'] + marks['ct'] + marks['assignment']
+    total_with_attendance = academic_total + marks['attendance']
+
+    grades, sgpas = grade_marks(total_with_attendance, compiled_scale)
+    grade_list = grades.tolist()
+    sgpa_list = sgpas.tolist()
+    passing_list = passing_marks(total_with_attendance, compiled_scale).tolist()
+
+    def text_column(column, default):
+        # Blank cells get the same default as a missing column, never the text 'nan' or 'None'
+        if column in df.columns:
+            return [default(idx) if pd.isna(value) else str(value) for idx, value in zip(df.index, df[column].tolist())]
+        return [default(idx) for idx in df.index]
+
+    student_ids = text_column('Student_ID', lambda idx: f'STU{idx}')
+    student_names = text_column('Student_Name', lambda idx: f'Student {idx}')
+    student_emails = text_column('Student_Email', lambda idx: '')
+    parent_emails = text_column('Parent_Email', lambda idx: '')
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    grade_descs = compiled_scale['descriptions']
+    mark_lists = {key: values.tolist() for key, values in marks.items()}
+    academic_list = academic_total.tolist()
+    total_list = total_with_attendance.tolist()
+    co_list = co_matrix.tolist()
+
+    students = {}
+    for i in range(n_rows):
+        if invalid[i]:
+            continue
+
+        grade = grade_list[i]
+        students[student_ids[i]] = {
+            'id': student_ids[i],
+            'name': student_names[i],
+            **{key: values[i] for key, values in mark_lists.items()},
+            'academic_total': round(academic_list[i], 1),
+            'total_marks': round(total_list[i], 1),
+            'sgpa': sgpa_list[i],
+            'grade': grade,
+            'grade_desc': grade_descs.get(grade, "Unknown"),
+            'co_scores': dict(zip(co_columns, co_list[i])),
+            'student_email': student_emails[i],
+            'parent_email': parent_emails[i],
+            'course_code': course_code,
+            'semester': semester,
+            'status': 'Pass' if passing_list[i] else 'Fail',
+            'timestamp': timestamp
+        }
+
+    co_frame = pd.DataFrame(co_matrix[~invalid], columns=co_columns)
+    invalid_rows = df.index[invalid].tolist()
+
+    return students, co_frame, invalid_rows
+
+
+DEFAULT_CREDIT_HOURS = 3.0
+
+
+def build_course_results(chunks, semester, course_code, co_po_mapping=None, credit_hours=None,
+                         attainment_config=None):
+    """Grade marksheet chunks and compute course stats, CO-PO attainment and predictions
+
+    `attainment_config` selects how CO attainment is measured (see
+    normalize_attainment_config). Returns the course results together with
+    the labels of rows skipped for non-numeric marks.
+    """
+    results = {
+        'students': {},
+        'course_stats': {},
+        'co_attainment': {},
+        'po_attainment': {},
+        'semester': semester,
+        'course_code': course_code,
+        'credit_hours': float(credit_hours or DEFAULT_CREDIT_HOURS),
+        'attainment_config': normalize_attainment_config(attainment_config),
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+    results['grade_scale'], grade_scale = get_active_grade_scale()
+
+    co_frames = []
+    invalid_rows = []
+    for chunk in chunks:
+        students, chunk_co_frame, chunk_invalid_rows = compute_marksheet(chunk, semester, course_code, grade_scale)
+        results['students'].update(students)
+        co_frames.append(chunk_co_frame)
+        invalid_rows.extend(chunk_invalid_rows)
+
+    co_frame = pd.concat(co_frames, ignore_index=True) if co_frames else pd.DataFrame(columns=CO_COLUMNS)
+
+    if results['students']:
+        marks_list = [s['total_marks'] for s in results['students'].values()]
+        academic_marks = [s['academic_total'] for s in results['students'].values()]
+        sgpas = [s['sgpa'] for s in results['students'].values()]
+
+        passing_students = len([s for s in results['students'].values() if s['status'] == 'Pass'])
+        total_students = len(marks_list)
+
+        results['course_stats'] = {
+            'average_marks': round(np.mean(marks_list), 2) if marks_list else 0.0,
+            'academic_average': round(np.mean(academic_marks), 2) if academic_marks else 0.0,
+            'highest_marks': round(max(marks_list), 2) if marks_list else 0.0,
+            'lowest_marks': round(min(marks_list), 2) if marks_list else 0.0,
+            'average_sgpa': round(np.mean(sgpas), 2) if sgpas else 0.0,
+            'total_students': total_students,
+            'passing_students': passing_students,
+            'pass_percentage': round((passing_students / total_students * 100) if total_students > 0 else 0, 1),
+            'fail_percentage': round(
+                ((total_students - passing_students) / total_students * 100) if total_students > 0 else 0, 1),
+            'std_deviation': round(np.std(marks_list), 2) if marks_list else 0.0
+        }
+    else:
+        results['course_stats'] = {
+            'average_marks': 0.0,
+            'academic_average': 0.0,
+            'highest_marks': 0.0,
+            'lowest_marks': 0.0,
+            'average_sgpa': 0.0,
+            'total_students': 0,
+            'passing_students': 0,
+            'pass_percentage': 0.0,
+            'fail_percentage': 0.0,
+            'std_deviation': 0.0
+        }
+
+    mapping = sparse_copo_mapping(co_po_mapping if co_po_mapping is not None else create_default_copo_mapping())
+    results['co_po_mapping'] = mapping
+
+    if not co_frame.empty:
+        results['co_attainment'], results['co_attainment_levels'] = calculate_co_attainment(
+            co_frame, results['attainment_config'])
+        results['po_attainment'] = calculate_po_attainment(
+            {co: score / 5 for co, score in results['co_attainment'].items()},
+            mapping
+        )
+
+    attach_student_po_attainment(results['students'].values(), mapping)
+
+    results['predictions'] = generate_ai_predictions(results)
+    results['running_totals'] = compute_running_totals(results['students'])
+
+    return results, invalid_rows
+
+
+# ==============================================================================
+# INCREMENTAL (DELTA) UPDATES
+# ==============================================================================
+def compute_running_totals(students):
+    """Running sums from which course stats and CO attainment are maintained incrementally"""
+    totals = {
+        'count': 0,
+        'passing': 0,
+        'sum_total': 0.0,
+        'sum_sq_total': 0.0,
+        'sum_academic': 0.0,
+        'sum_sgpa': 0.0,
+        'highest': None,
+        'lowest': None,
+        'co_sums': {}
+    }
+    for student in students.values():
+        _add_to_running_totals(totals, student)
+    return totals
+
+
+def _add_to_running_totals(totals, student):
+    total = student['total_marks']
+    totals['count'] += 1
+    totals['passing'] += 1 if student['status'] == 'Pass' else 0
+    totals['sum_total'] += total
+    totals['sum_sq_total'] += total * total
+    totals['sum_academic'] += student['academic_total']
+    totals['sum_sgpa'] += student['sgpa']
+    totals['highest'] = total if totals['highest'] is None else max(totals['highest'], total)
+    totals['lowest'] = total if totals['lowest'] is None else min(totals['lowest'], total)
+    for co, score in student.get('co_scores', {}).items():
+        totals['co_sums'][co] = totals['co_sums'].get(co, 0.0) + score
+
+
+def _remove_from_running_totals(totals, student):
+    """Remove a student's contribution; returns True if highest/lowest need a rescan"""
+    total = student['total_marks']
+    totals['count'] -= 1
+    totals['passing'] -= 1 if student['status'] == 'Pass' else 0
+    totals['sum_total'] -= total
+    totals['sum_sq_total'] -= total * total
+    totals['sum_academic'] -= student['academic_total']
+    totals['sum_sgpa'] -= student['sgpa']
+    for co, score in student.get('co_scores', {}).items():
+        totals['co_sums'][co] = totals['co_sums'].get(co, 0.0) - score
+    return total in (totals['highest'], totals['lowest'])
+
+
+def course_stats_from_totals(totals):
+    """Build the course_stats dict from running totals"""
+    count = totals['count']
+    if count == 0:
+        return {
+            'average_marks': 0.0,
+            'academic_average': 0.0,
+            'highest_marks': 0.0,
+            'lowest_marks': 0.0,
+            'average_sgpa': 0.0,
+            'total_students': 0,
+            'passing_students': 0,
+            'pass_percentage': 0.0,
+            'fail_percentage': 0.0,
+            'std_deviation': 0.0
+        }
+
+    mean = totals['sum_total'] / count
+    variance = max(totals['sum_sq_total'] / count - mean * mean, 0.0)
+    return {
+        'average_marks': round(mean, 2),
+        'academic_average': round(totals['sum_academic'] / count, 2),
+        'highest_marks': round(totals['highest'], 2),
+        'lowest_marks': round(totals['lowest'], 2),
+        'average_sgpa': round(totals['sum_sgpa'] / count, 2),
+        'total_students': count,
+        'passing_students': totals['passing'],
+        'pass_percentage': round(totals['passing'] / count * 100, 1),
+        'fail_percentage': round((count - totals['passing']) / count * 100, 1),
+        'std_deviation': round(variance ** 0.5, 2)
+    }
+
+
+def apply_delta_results(course_results, delta_df, co_po_mapping=None):
+    """Add or update only the students in `delta_df` on top of existing course results
+
+    Course stats, CO and PO attainment are maintained from running sums
+    instead of being recomputed over every student. Returns the updated
+    results, the IDs of the students that changed and the skipped rows.
+    """
+    semester = course_results['semester']
+    course_code = course_results['course_code']
+
+    # Grade corrections on the course's own scale, even if the active one changed since
+    grade_scale = load_grade_scales().get(course_results.get('grade_scale'), get_active_grade_scale()[1])
+    # Only COs the delta actually carries are regraded; a stored course never falls back to the default COs
+    course_cos = list(course_results.get('co_attainment') or {})
+    delta_cos = [co for co in detect_co_columns(delta_df.columns) if co in delta_df.columns]
+    co_columns = course_cos + [co for co in delta_cos if co not in course_cos] if course_cos else None
+    students, _, invalid_rows = compute_marksheet(delta_df, semester, course_code, grade_scale, co_columns)
+
+    # Course COs missing from the delta keep each student's stored scores
+    carried_cos = [co for co in course_cos if co not in delta_cos]
+    for student_id, student in students.items() if carried_cos else ():
+        stored_scores = course_results['students'].get(student_id, {}).get('co_scores', {})
+        student['co_scores'].update({co: stored_scores.get(co, 0.0) for co in carried_cos})
+
+    totals = course_results.get('running_totals') or compute_running_totals(course_results['students'])
+    rescan_extremes = False
+
+    # A delta keeps the course's stored mapping unless a new one is given
+    if co_po_mapping is not None:
+        course_results['co_po_mapping'] = sparse_copo_mapping(co_po_mapping)
+    mapping = course_results.get('co_po_mapping') or sparse_copo_mapping(create_default_copo_mapping())
+    attach_student_po_attainment(students.values(), mapping)
+
+    # Marks-only corrections of enrolled students leave CO attainment exactly as stored
+    co_changed = not course_cos or bool(delta_cos) or any(student_id not in course_results['students']
+                                                          for student_id in students)
+
+    for student_id, student in students.items():
+        previous = course_results['students'].get(student_id)
+        if previous is not None:
+            rescan_extremes |= _remove_from_running_totals(totals, previous)
+        course_results['students'][student_id] = student
+        _add_to_running_totals(totals, student)
+
+    if rescan_extremes:
+        marks_list = [s['total_marks'] for s in course_results['students'].values()]
+        totals['highest'] = max(marks_list)
+        totals['lowest'] = min(marks_list)
+
+    course_results['running_totals'] = totals
+    course_results['course_stats'] = course_stats_from_totals(totals)
+
+    config = normalize_attainment_config(course_results.get('attainment_config'))
+    if totals['count'] and co_changed and config['method'] == 'threshold':
+        # Shares of students over the target need every student's scores, in one column-wise pass
+        course_results['co_attainment'], course_results['co_attainment_levels'] = calculate_co_attainment(
+            course_co_frame(course_results['students'].values(), list(totals['co_sums'])), config)
+    elif totals['count'] and co_changed:
+        course_results['co_attainment'] = {co: round(total / totals['count'] * 5, 2)
+                                           for co, total in totals['co_sums'].items()}
+    if totals['count'] and (co_changed or co_po_mapping is not None):
+        course_results['po_attainment'] = calculate_po_attainment(
+            {co: score / 5 for co, score in course_results['co_attainment'].items()},
+            mapping
+        )
+
+    changed = list(students)
+    predictions = course_results.setdefault('predictions', {})
+    predictions.update(generate_ai_predictions(course_results, only_students=set(changed)))
+    course_results['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    return course_results, changed, invalid_rows
+
+
+# ==============================================================================
+# MARKSHEET VALIDATION
+# ==============================================================================
+REQUIRED_COLUMNS = ['Student_ID', 'Student_Name', 'Parent_Email']
+EMAIL_COLUMNS = ['Student_Email', 'Parent_Email']
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+VALIDATION_COLUMNS = ['Row', 'Student_ID', 'Column', 'Value', 'Problem']
+
+
+def validate_marksheet(df, check_duplicates=True):
+    """Check schema, types, ranges, duplicate IDs and emails column-wise in one pass
+
+    Returns one row per problem, with spreadsheet row numbers (header is row 1).
+    An empty frame means the marksheet is valid.
+    """
+    problems = [pd.DataFrame({'Column': [column], 'Problem': ["Missing required column"]})
+                for column in REQUIRED_COLUMNS if column not in df.columns]
+
+    rows = pd.Series(df.index, index=df.index) + 2
+    ids = df['Student_ID'] if 'Student_ID' in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+    def report(mask, column, problem):
+        if mask.any():
+            problems.append(pd.DataFrame({
+                'Row': rows[mask],
+                'Student_ID': ids[mask],
+                'Column': column,
+                'Value': df.loc[mask, column],
+                'Problem': problem
+            }))
+
+    ranges = ([(column, maximum) for column, _, maximum in MARK_COMPONENTS]
+              + [(co, CO_MAX_SCORE) for co in detect_co_columns(df.columns) if co in df.columns])
+    for column, maximum in ranges:
+        if column not in df.columns:
+            continue
+
+        raw = df[column]
+        values = pd.to_numeric(raw, errors='coerce')
+        report(values.isna() & raw.notna(), column, "Not a number")
+        report((values < 0) | (values > maximum), column, f"Out of range (0-{maximum})")
+
+    if 'Student_ID' in df.columns:
+        blank = ids.isna() | (ids.astype(str).str.strip() == '')
+        report(blank, 'Student_ID', "Missing student ID")
+        if check_duplicates:
+            report(ids.duplicated(keep=False) & ~blank, 'Student_ID', "Duplicate student ID")
+
+    for column in EMAIL_COLUMNS:
+        if column in df.columns:
+            emails = df[column].astype(str).str.strip()
+            blank = df[column].isna() | (emails == '')
+            if column in REQUIRED_COLUMNS:
+                report(blank, column, "Missing email")
+            report(~blank & ~emails.str.match(EMAIL_PATTERN), column, "Malformed email")
+
+    if not problems:
+        return pd.DataFrame(columns=VALIDATION_COLUMNS)
+    return pd.concat(problems, ignore_index=True).reindex(columns=VALIDATION_COLUMNS)
+
+
+def validate_marksheet_chunks(chunks):
+    """Validate a chunked marksheet, including duplicate IDs across chunks"""
+    problems = []
+    id_chunks = []
+    for chunk in chunks:
+        problems.append(validate_marksheet(chunk, check_duplicates=False))
+        if 'Student_ID' in chunk.columns:
+            id_chunks.append(chunk['Student_ID'])
+
+    if id_chunks:
+        ids = pd.concat(id_chunks)
+        ids = ids[ids.notna() & (ids.astype(str).str.strip() != '')]
+        duplicated = ids[ids.duplicated(keep=False)]
+        problems.append(pd.DataFrame({
+            'Row': duplicated.index + 2,
+            'Student_ID': duplicated.values,
+            'Column': 'Student_ID',
+            'Value': duplicated.values,
+            'Problem': "Duplicate student ID"
+        }))
+
+    problems = [frame for frame in problems if not frame.empty]
+    if not problems:
+        return pd.DataFrame(columns=VALIDATION_COLUMNS)
+    return pd.concat(problems, ignore_index=True).reindex(columns=VALIDATION_COLUMNS)
+
+
+# ==============================================================================
+# AI PREDICTION MODULE
+# ==============================================================================
+CAREER_SECTORS = [
+    "Power Systems & Energy",
+    "Electronics & Embedded Systems",
+    "Telecommunications",
+    "Control & Automation",
+    "Research & Academia",
+    "Renewable Energy",
+    "AI & Machine Learning in EEE"
+]
+
+# Performance category and advice by current total marks: below 40, 40-60, 60-70, 70-80, 80 and up
+PERFORMANCE_BAND_MARKS = [40, 60, 70, 80]
+PERFORMANCE_BANDS = [
+    ("Needs Improvement", "Seek academic support and focus on fundamentals"),
+    ("Satisfactory", "Maintain consistency and seek guidance"),
+    ("Average", "Improve weak areas through practice and mentorship"),
+    ("Good", "Focus on specialization in your strong areas"),
+    ("Excellent", "Consider graduate studies or research positions")
+]
+
+# Strength listed when a student scores at least 15 on the CO
+CO_STRENGTHS = [
+    ('CO1', "Strong theoretical foundation"),
+    ('CO2', "Good problem-solving ability"),
+    ('CO3', "Analytical and investigative skills"),
+    ('CO4', "Strong professional and communication skills")
+]
+
+
+def prediction_features(results):
+    """Student IDs and the feature matrix the prediction models use, one row per student"""
+    students_data = []
+    student_ids = []
+
+    for student_id, student in results['students'].items():
+        co_scores = student.get('co_scores')
+        # Extract features for prediction
+        students_data.append((
+            student.get('total_marks', 0),
+            student.get('mid', 0),
+            student.get('final', 0),
+            student.get('ct', 0),
+            student.get('assignment', 0),
+            student.get('sgpa', 0),
+            sum(co_scores.values()) / len(co_scores) if co_scores else 0
+        ))
+        student_ids.append(student_id)
+
+    return student_ids, np.array(students_data, dtype=float).reshape(len(student_ids), 7)
+
+
+def fit_prediction_models(X):
+    """Fit the academic-growth and career-sector models on a feature matrix"""
+    # 1. Predict future academic performance (next semester)
+    y_academic = X[:, 0]  # Current total marks as target (simplified)
+
+    # Create synthetic next semester prediction
+    model_academic = LinearRegression()
+    model_academic.fit(X[:, 1:], y_academic)
+
+    # 2. Predict career sector suitability
+    # Create synthetic career labels based on performance patterns
+    total_marks, final, ct, sgpa, co_avg = X[:, 0], X[:, 2], X[:, 3], X[:, 5], X[:, 6]
+    y_career = np.select([
+        (total_marks >= 80) & (sgpa >= 3.5),  # Research & Academia
+        (total_marks >= 75) & (ct >= 15),  # Electronics & Embedded Systems
+        (total_marks >= 70) & (final >= 30),  # Power Systems
+        (total_marks >= 65) & (co_avg >= 15),  # Control & Automation
+        total_marks >= 60,  # Telecommunications
+        total_marks >= 50  # Renewable Energy
+    ], [0, 1, 2, 3, 4, 5], default=6)  # AI & ML in EEE
+
+    model_career = RandomForestClassifier(n_estimators=50, random_state=42)
+    model_career.fit(X[:, 1:], y_career)
+
+    return {'academic': model_academic, 'career': model_career, 'training_rows': len(X)}
+
+
+def generate_ai_predictions(results, only_students=None, models=None):
+    """Generate AI predictions for each student's academic growth and career prospects
+
+    Uses the stored prediction models (see PREDICTION MODEL STORE), or
+    `models` if given; a store without models is seeded by fitting on this
+    course when it is large enough (see seed_prediction_models). `only_students` limits which students get a prediction built
+    (used by delta uploads).
+    """
+    predictions = {}
+
+    if not results.get('students'):
+        return predictions
+
+    student_ids, X = prediction_features(results)
+    models = models or load_prediction_models()
+
+    if models is None and len(student_ids) < PREDICTION_MODEL_MIN_FIT_ROWS:
+        # Not enough data for proper ML predictions
+        for student_id, student in results['students'].items():
+            if only_students is None or student_id in only_students:
+                predictions[student_id] = generate_rule_based_prediction(student)
+        return predictions
+
+    if models is None:
+        models = seed_prediction_models(X, results.get('semester'), results.get('course_code'))
+    model_academic = models['academic']
+    model_career = models['career']
+
+    # Score every selected student with one predict call per model
+    rows = [idx for idx, student_id in enumerate(student_ids) if only_students is None or student_id in only_students]
+    if not rows:
+        return predictions
+    X = X[rows]
+    current_marks = X[:, 0]
+    next_sem_pred = np.clip(model_academic.predict(X[:, 1:]), 40, 95)
+    career_idx = model_career.predict(X[:, 1:])
+    growth_percent = np.where(current_marks > 0,
+                              (next_sem_pred - current_marks) / np.where(current_marks > 0, current_marks, 1) * 100, 0)
+    band = np.searchsorted(PERFORMANCE_BAND_MARKS, current_marks, side='right')
+    confidence = "Medium" if models['training_rows'] >= 5 else "Low"
+
+    for student_id, marks, next_sem, growth, career, band_idx in zip(
+            [student_ids[idx] for idx in rows], current_marks.tolist(), next_sem_pred.tolist(),
+            growth_percent.tolist(), career_idx.tolist(), band.tolist()):
+        student = results['students'][student_id]
+        performance, recommendation = PERFORMANCE_BANDS[band_idx]
+
+        # Skill assessment based on CO scores
+        co_scores = student.get('co_scores', {})
+        skills = [skill for co, skill in CO_STRENGTHS if co_scores.get(co, 0) >= 15]
+
+        if not skills:
+            skills = ["Developing core engineering skills"]
+
+        predictions[student_id] = {
+            'student_name': student['name'],
+            'current_performance': f"{marks:.1f} marks ({performance})",
+            'predicted_next_semester': f"{next_sem:.1f} marks",
+            'growth_percentage': f"{growth:.1f}%",
+            'recommended_career_sector': CAREER_SECTORS[career],
+            'key_strengths': skills[:3],
+            'recommendation': recommendation,
+            'confidence_level': confidence
+        }
+
+    return predictions
+
+
+def generate_rule_based_prediction(student):
+    """Generate rule-based predictions when insufficient data for ML"""
+    total_marks = student.get('total_marks', 0)
+
+    if total_marks >= 80:
+        performance = "Excellent"
+        next_sem = min(95, total_marks + np.random.uniform(0, 5))
+        career = np.random.choice(["Research & Academia", "Power Systems Design", "Advanced Electronics"])
+        recommendation = "Pursue graduate studies or competitive industry positions"
+    elif total_marks >= 70:
+        performance = "Good"
+        next_sem = min(90, total_marks + np.random.uniform(-2, 8))
+        career = np.random.choice(["Energy Management", "Control Systems", "Telecommunications"])
+        recommendation = "Focus on specialization and internships"
+    elif total_marks >= 60:
+        performance = "Average"
+        next_sem = min(85, total_marks + np.random.uniform(-5, 10))
+        career = np.random.choice(["Renewable Energy", "Maintenance Engineering", "Technical Sales"])
+        recommendation = "Improve fundamentals and seek practical experience"
+    elif total_marks >= 40:
+        performance = "Satisfactory"
+        next_sem = max(40, total_marks + np.random.uniform(-10, 15))
+        career = "General Engineering with focused skill development"
+        recommendation = "Maintain consistency and seek academic guidance"
+    else:
+        performance = "Needs Improvement"
+        next_sem = max(30, total_marks + np.random.uniform(-5, 20))
+        career = "Foundation strengthening required"
+        recommendation = "Seek academic support and focus on core concepts"
+
+    strengths = []
+    if student.get('mid', 0) >= 20:
+        strengths.append("Good exam preparation skills")
+    if student.get('final', 0) >= 30:
+        strengths.append("Strong comprehensive understanding")
+    if student.get('ct', 0) >= 15:
+        strengths.append("Consistent performance in assessments")
+    if student.get('assignment', 0) >= 4:
+        strengths.append("Good assignment completion")
+
+    if not strengths:
+        strengths = ["Developing engineering competencies"]
+
+    growth = ((next_sem - total_marks) / total_marks * 100) if total_marks > 0 else 0
+
+    return {
+        'student_name': student['name'],
+        'current_performance': f"{total_marks:.1f} marks ({performance})",
+        'predicted_next_semester': f"{next_sem:.1f} marks",
+        'growth_percentage': f"{growth:.1f}%",
+        'recommended_career_sector': career,
+        'key_strengths': strengths[:3],
+        'recommendation': recommendation,
+        'confidence_level': "Low (Rule-based)"
+    }
+
+
+# ==============================================================================
+# DATA STORAGE SYSTEM
+# ==============================================================================
+# Root of the persistent course store; the app and headless jobs share it
+DATA_DIR = Path("course_data")
+
+# "pickle", "parquet", "sqlite" or "auto" (use whichever store exists, pickle files by default)
+STORAGE_BACKEND = os.environ.get("EDUTRACK_STORAGE_BACKEND", "auto")
+
+
+def active_storage_backend():
+    """Name of the storage backend in use"""
+    if STORAGE_BACKEND != "auto":
+        return STORAGE_BACKEND
+    if (DATA_DIR / SQLITE_DB_FILE).exists():
+        return "sqlite"
+    if (DATA_DIR / COLUMNAR_DIR).exists():
+        return "parquet"
+    return "pickle"
+
+
+# Lock files guard read-modify-write of shared files (student records, indexes)
+# across Streamlit session threads and CLI processes alike
+LOCK_TIMEOUT = 60  # seconds to wait for a lock before giving up
+LOCK_STALE_AFTER = 300  # a lock older than this was left behind by a crashed writer
+
+
+@contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT):
+    """Hold an exclusive `<path>.lock` file, retrying with backoff until `timeout`"""
+    lock_file = Path(f"{path}.lock")
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while True:
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock_file.stat().st_mtime > LOCK_STALE_AFTER:
+                    lock_file.unlink(missing_ok=True)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for the lock on {path}")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+    try:
+        yield
+    finally:
+        lock_file.unlink(missing_ok=True)
+
+
+def _temp_path(target_file):
+    return target_file.with_name(f".{target_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def write_file_atomic(target_file, write, mode='wb', retries=5):
+    """Write via `write(f)` to a temp file and rename it over `target_file`
+
+    Readers never see a half-written file. The rename is retried because it
+    can fail briefly on Windows while another process has the target open.
+    """
+    target_file = Path(target_file)
+    target_file.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = _temp_path(target_file)
+    try:
+        with open(temp_file, mode) as f:
+            write(f)
+        for attempt in range(retries):
+            try:
+                os.replace(temp_file, target_file)
+                return
+            except PermissionError:
+                if attempt == retries - 1:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+    finally:
+        if temp_file.exists():
+            temp_file.unlink()
+
+
+def persist_course_data(semester, course_code, results, upload_key=None, student_ids=None):
+    """Save course data to file for persistent storage, raising on failure
+
+    `student_ids` limits which per-student files are rewritten (delta
+    uploads); course-wide figures for everyone else come from the course index.
+    """
+    # Create data directory if it doesn't exist
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+    backend = active_storage_backend()
+    if backend == "sqlite":
+        write_course_sqlite(semester, course_code, results, student_ids)
+    elif backend == "parquet":
+        write_course_parquet(semester, course_code, results)
+    else:
+        write_course_pickle(semester, course_code, results, student_ids)
+
+    # Derived stores are updated the same way whichever backend holds the course
+    update_course_index(semester, course_code, results)
+    update_program_rollup(semester, course_code, results)
+    update_transcripts(semester, course_code, results, student_ids)
+    record_saved_upload_key(semester, course_code, upload_key)
+    clear_load_cache()
+
+
+def write_course_pickle(semester, course_code, results, student_ids=None):
+    """Write the course file and add the course to each student's file"""
+    data_dir = DATA_DIR
+
+    # Save each student's data individually for easy access
+    for student_id, student_data in results['students'].items():
+        if student_ids is not None and student_id not in student_ids:
+            continue
+
+        student_file = data_dir / f"student_{student_id}.pkl"
+
+        # Other uploads may be adding their course to the same student right now
+        with file_lock(student_file):
+            # Load existing student data or create new
+            if student_file.exists():
+                with open(student_file, 'rb') as f:
+                    all_student_data = pickle.load(f)
+            else:
+                all_student_data = {}
+
+            # Add/update course data
+            course_key = f"{semester}_{course_code}"
+            all_student_data[course_key] = {
+                'course_code': course_code,
+                'semester': semester,
+                'student_data': student_data,
+                'course_stats': results.get('course_stats', {}),
+                'co_attainment': results.get('co_attainment', {}),
+                'po_attainment': results.get('po_attainment', {}),
+                'predictions': results.get('predictions', {}).get(student_id, {}),
+                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+
+            # Save back to file
+            write_file_atomic(student_file, lambda f: pickle.dump(all_student_data, f))
+
+    # Also save course-wide data
+    course_file = data_dir / f"course_{semester}_{course_code}.pkl"
+    write_file_atomic(course_file, lambda f: pickle.dump(results, f))
+
+
+COURSE_WIDE_FIELDS = ['course_stats', 'co_attainment', 'po_attainment']
+
+
+def _read_course_index(index_file):
+    try:
+        if index_file.exists():
+            with open(index_file, 'r') as f:
+                return json.load(f)
+    except Exception:
+        pass
+    return {}
+
+
+def _load_course_index():
+    index_file = DATA_DIR / "course_index.json"
+    return cached_load(('course_index',), [index_file], lambda: _read_course_index(index_file))
+
+
+def _course_index_entry(semester, course_code, results):
+    return {
+        'semester': semester,
+        'course_code': course_code,
+        'student_count': len(results.get('students', {})),
+        'credit_hours': results.get('credit_hours', DEFAULT_CREDIT_HOURS),
+        **{field: results.get(field) or {} for field in COURSE_WIDE_FIELDS},
+        'timestamp': results.get('timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    }
+
+
+def _write_course_index(index):
+    write_file_atomic(DATA_DIR / "course_index.json", lambda f: json.dump(index, f, indent=4, default=float),
+                      mode='w')
+
+
+def update_course_index(semester, course_code, results):
+    """Keep the latest course-wide figures of every course in one small JSON index"""
+    with file_lock(DATA_DIR / "course_index.json"):
+        index = dict(_load_course_index())
+        index[f"{semester}_{course_code}"] = _course_index_entry(semester, course_code, results)
+        _write_course_index(index)
+
+
+def load_course_catalog():
+    """List every stored course with its course-wide figures, without loading student records
+
+    Keyed like load_all_courses ("semester - course_code"). Pickle courses
+    saved before the index existed are indexed once, on first sight.
+    """
+    index = dict(_load_course_index())
+
+    if active_storage_backend() == "pickle" and DATA_DIR.exists():
+        missing = [course_file for course_file in DATA_DIR.glob("course_*.pkl")
+                   if course_file.stem[len("course_"):] not in index
+                   or 'student_count' not in index[course_file.stem[len("course_"):]]]
+        for course_file in missing:
+            try:
+                with open(course_file, 'rb') as f:
+                    results = pickle.load(f)
+                index[f"{results['semester']}_{results['course_code']}"] = _course_index_entry(
+                    results['semester'], results['course_code'], results)
+            except Exception:
+                continue
+        if missing:
+            with file_lock(DATA_DIR / "course_index.json"):
+                _write_course_index({**_load_course_index(), **index})
+
+    return {f"{entry['semester']} - {entry['course_code']}": entry
+            for entry in index.values()}
+
+
+def load_course_results(semester, course_code):
+    """Load the full stored results of one course, or None if it was never saved"""
+    if active_storage_backend() == "sqlite":
+        return read_course_sqlite(semester, course_code)
+    if active_storage_backend() == "parquet":
+        return read_course_parquet(semester, course_code)
+
+    course_file = DATA_DIR / f"course_{semester}_{course_code}.pkl"
+    if not course_file.exists():
+        return None
+    with open(course_file, 'rb') as f:
+        return pickle.load(f)
+
+
+def _load_student_pickle(student_file):
+    if not student_file.exists():
+        return {}
+    with open(student_file, 'rb') as f:
+        student_data = pickle.load(f)
+
+    # Delta uploads only rewrite changed students, so take course-wide figures from the index
+    course_index = _load_course_index()
+    for course_key, course_info in student_data.items():
+        if course_key in course_index:
+            course_info.update({field: course_index[course_key][field] for field in COURSE_WIDE_FIELDS})
+    return student_data
+
+
+def load_student_data(student_id):
+    """Load all course data for a specific student (cached; treat the result as read-only)"""
+    try:
+        backend = active_storage_backend()
+        if backend == "sqlite":
+            return cached_load(('student', backend, str(student_id)), _sqlite_files(),
+                               lambda: load_student_data_sqlite(student_id))
+        if backend == "parquet":
+            return cached_load(('student', backend, str(student_id)), _columnar_files(),
+                               lambda: load_student_data_parquet(student_id))
+
+        student_file = DATA_DIR / f"student_{student_id}.pkl"
+        return cached_load(('student', backend, str(student_id)), [student_file, DATA_DIR / "course_index.json"],
+                           lambda: _load_student_pickle(student_file))
+    except Exception:
+        logger.exception("Could not load course data of student %s", student_id)
+        return {}
+
+
+def _load_all_course_pickles(course_files):
+    courses = {}
+    for file in course_files:
+        with open(file, 'rb') as f:
+            course_data = pickle.load(f)
+            key = f"{course_data.get('semester')} - {course_data.get('course_code')}"
+            courses[key] = course_data
+    return courses
+
+
+def load_all_courses():
+    """Load all available courses from data directory (cached; treat the result as read-only)"""
+    courses = {}
+    try:
+        backend = active_storage_backend()
+        if backend == "sqlite":
+            return cached_load(('all_courses', backend), _sqlite_files(), load_all_courses_sqlite)
+        if backend == "parquet":
+            return cached_load(('all_courses', backend), _columnar_files(), load_all_courses_parquet)
+
+        data_dir = DATA_DIR
+        if data_dir.exists():
+            course_files = sorted(data_dir.glob("course_*.pkl"))
+            return cached_load(('all_courses', backend), course_files,
+                               lambda: _load_all_course_pickles(course_files))
+    except Exception:
+        logger.exception("Could not load the stored courses from %s", DATA_DIR)
+    return courses
+
+
+def get_student_cgpa_data(student_id):
+    """Get CGPA progression data for a student, in chronological semester order
+
+    Read from the materialized transcript, which every course save keeps current.
+    """
+    transcript = load_student_transcript(student_id)
+    return transcript['semesters'] or None
+
+
+# ==============================================================================
+# SHARED LOAD CACHE
+# ==============================================================================
+# Loaded student and course data is shared by every session of this process.
+# Entries are keyed on the files they were read from (inode, mtime and size),
+# so saves by other processes are picked up on the next read; saves made here
+# clear the cache outright.
+LOAD_CACHE_MAX_ENTRIES = 2000
+
+_load_cache = OrderedDict()
+_load_cache_lock = threading.Lock()
+
+
+def _file_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((str(path), stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((str(path), None))
+    return tuple(signature)
+
+
+def cached_load(key, paths, loader):
+    """Return `loader()`, reusing the previous result while none of `paths` changed on disk"""
+    key = (str(DATA_DIR),) + tuple(key)
+    signature = _file_signature(paths)
+    with _load_cache_lock:
+        entry = _load_cache.get(key)
+        if entry is not None and entry[0] == signature:
+            _load_cache.move_to_end(key)
+            return entry[1]
+
+    # Load outside the lock; a file changing meanwhile only makes the next read reload
+    value = loader()
+    with _load_cache_lock:
+        _load_cache[key] = (signature, value)
+        _load_cache.move_to_end(key)
+        while len(_load_cache) > LOAD_CACHE_MAX_ENTRIES:
+            _load_cache.popitem(last=False)
+    return value
+
+
+def clear_load_cache():
+    """Drop every cached load, e.g. after this process saved course data"""
+    with _load_cache_lock:
+        _load_cache.clear()
+
+
+def _sqlite_files():
+    db_file = DATA_DIR / SQLITE_DB_FILE
+    return [db_file, Path(f"{db_file}-wal")]
+
+
+def _columnar_files():
+    return sorted((DATA_DIR / COLUMNAR_DIR).rglob("*.parquet"))
+
+
+# ==============================================================================
+# COLUMNAR (PARQUET) STORE
+# ==============================================================================
+# students/semester=<...>/course_code=<...>/part-0.parquet holds one row per
+# student; courses/... holds the course-wide figures once per course instead
+# of copying them into every student's record.
+COLUMNAR_DIR = "columnar"
+# Nested per-student fields, stored as JSON strings so partitions never disagree on schema
+STUDENT_JSON_FIELDS = ('co_scores', 'po_attainment')
+PARTITIONING = ds.partitioning(pa.schema([('semester', pa.string()), ('course_code', pa.string())]),
+                               flavor='hive')
+
+
+def _partition_dir(table_name, semester, course_code):
+    return (DATA_DIR / COLUMNAR_DIR / table_name /
+            f"semester={quote(str(semester), safe='')}" / f"course_code={quote(str(course_code), safe='')}")
+
+
+def _write_parquet_atomic(table, target_file):
+    write_file_atomic(target_file, lambda f: pq.write_table(table, f))
+
+
+def write_course_parquet(semester, course_code, results):
+    """Write a whole course as one student partition plus one course row"""
+    predictions = results.get('predictions', {})
+    student_rows = []
+    for student_id, student in results['students'].items():
+        row = {key: value for key, value in student.items()
+               if key not in ('semester', 'course_code') + STUDENT_JSON_FIELDS}
+        row['id'] = str(student_id)
+        for field in STUDENT_JSON_FIELDS:
+            if field in student:
+                row[field] = json.dumps(student[field])
+        row['prediction'] = json.dumps(predictions.get(student_id, {}), default=str)
+        student_rows.append(row)
+
+    _write_parquet_atomic(pa.Table.from_pylist(student_rows),
+                          _partition_dir("students", semester, course_code) / "part-0.parquet")
+
+    course_meta = {key: value for key, value in results.items() if key not in ('students', 'predictions')}
+    course_row = {'course_meta': json.dumps(course_meta, default=float)}
+    _write_parquet_atomic(pa.Table.from_pylist([course_row]),
+                          _partition_dir("courses", semester, course_code) / "part-0.parquet")
+
+
+def _columnar_dataset(table_name):
+    root = DATA_DIR / COLUMNAR_DIR / table_name
+    if not root.exists():
+        return None
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+    # Courses saved by older versions may lack newer columns; read all columns of all parts
+    schema = pa.unify_schemas([fragment.physical_schema for fragment in dataset.get_fragments()]
+                              + [PARTITIONING.schema])
+    return ds.dataset(root, format='parquet', partitioning=PARTITIONING, schema=schema)
+
+
+def _read_columnar(table_name, filter_expr=None):
+    dataset = _columnar_dataset(table_name)
+    if dataset is None:
+        return pd.DataFrame()
+    return dataset.to_table(filter=filter_expr).to_pandas()
+
+
+def _student_from_row(row):
+    student = {key: value for key, value in row.items()
+               if key not in STUDENT_JSON_FIELDS + ('prediction',)
+               and not (isinstance(value, float) and np.isnan(value))}
+    for field in STUDENT_JSON_FIELDS:
+        if isinstance(row.get(field), str):
+            student[field] = json.loads(row[field])
+    return student, json.loads(row['prediction'])
+
+
+def _course_meta_by_key(filter_expr=None):
+    courses = _read_columnar("courses", filter_expr)
+    return {(row['semester'], row['course_code']): json.loads(row['course_meta'])
+            for row in courses.to_dict('records')}
+
+
+def _read_partition_meta(semester, course_code):
+    # One course row per partition: read that file alone rather than scanning the courses dataset
+    course_file = _partition_dir("courses", semester, course_code) / "part-0.parquet"
+    if not course_file.exists():
+        return {}
+    return json.loads(pq.read_table(course_file, columns=['course_meta']).column('course_meta')[0].as_py())
+
+
+def load_student_data_parquet(student_id):
+    """Answer a load_student_data query with predicate pushdown on the student ID
+
+    Course-wide figures are read only from the partitions holding the student's rows.
+    """
+    rows = _read_columnar("students", ds.field('id') == str(student_id))
+    if rows.empty:
+        return {}
+
+    rows = rows.to_dict('records')
+    course_meta = {key: _read_partition_meta(*key)
+                   for key in {(row['semester'], row['course_code']) for row in rows}}
+    student_data = {}
+    for row in rows:
+        student, prediction = _student_from_row(row)
+        meta = course_meta[(row['semester'], row['course_code'])]
+        student_data[f"{row['semester']}_{row['course_code']}"] = {
+            'course_code': row['course_code'],
+            'semester': row['semester'],
+            'student_data': student,
+            'course_stats': meta.get('course_stats', {}),
+            'co_attainment': meta.get('co_attainment', {}),
+            'po_attainment': meta.get('po_attainment', {}),
+            'predictions': prediction,
+            'timestamp': meta.get('timestamp', student.get('timestamp', ''))
+        }
+    return student_data
+
+
+def _results_from_rows(meta, rows):
+    results = dict(meta)
+    results['students'] = {}
+    results['predictions'] = {}
+    for row in rows:
+        student, prediction = _student_from_row(row)
+        results['students'][student['id']] = student
+        if prediction:
+            results['predictions'][student['id']] = prediction
+    return results
+
+
+def read_course_parquet(semester, course_code):
+    """Load one course's full results from its partitions"""
+    partition = (ds.field('semester') == semester) & (ds.field('course_code') == course_code)
+    meta = _course_meta_by_key(partition).get((semester, course_code))
+    if meta is None:
+        return None
+    rows = _read_columnar("students", partition)
+    return _results_from_rows(meta, rows.to_dict('records'))
+
+
+def load_all_courses_parquet():
+    """Load every course's full results from the columnar store"""
+    course_meta = _course_meta_by_key()
+    rows = _read_columnar("students")
+    grouped = {key: [] for key in course_meta}
+    for row in rows.to_dict('records'):
+        grouped.setdefault((row['semester'], row['course_code']), []).append(row)
+
+    return {f"{semester} - {course_code}": _results_from_rows(course_meta[(semester, course_code)], course_rows)
+            for (semester, course_code), course_rows in grouped.items() if (semester, course_code) in course_meta}
+
+
+def migrate_pickles_to_parquet():
+    """One-time migration of every course_*.pkl into the columnar store; returns the number of courses"""
+    migrated = 0
+    for course_file in sorted(DATA_DIR.glob("course_*.pkl")):
+        with open(course_file, 'rb') as f:
+            results = pickle.load(f)
+        write_course_parquet(results['semester'], results['course_code'], results)
+        update_course_index(results['semester'], results['course_code'], results)
+        migrated += 1
+
+    (DATA_DIR / COLUMNAR_DIR).mkdir(parents=True, exist_ok=True)
+    return migrated
+
+
+# ==============================================================================
+# SQLITE STORE
+# ==============================================================================
+# One embedded database in WAL mode, so app sessions keep reading while a
+# teacher's upload is being written. Course-wide figures live once in
+# `courses`; `student_courses` holds one row per student per course, indexed
+# for the student/parent page lookups.
+SQLITE_DB_FILE = "edutrack.db"
+SQLITE_BUSY_TIMEOUT = 30  # seconds a writer waits for another writer's lock
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    semester TEXT NOT NULL,
+    course_code TEXT NOT NULL,
+    results BLOB NOT NULL,
+    timestamp TEXT,
+    PRIMARY KEY (semester, course_code)
+);
+CREATE TABLE IF NOT EXISTS student_courses (
+    student_id TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    course_code TEXT NOT NULL,
+    student_data BLOB NOT NULL,
+    prediction BLOB,
+    timestamp TEXT,
+    PRIMARY KEY (semester, course_code, student_id)
+);
+CREATE INDEX IF NOT EXISTS idx_student_courses_student ON student_courses (student_id);
+CREATE INDEX IF NOT EXISTS idx_student_courses_semester ON student_courses (semester);
+CREATE INDEX IF NOT EXISTS idx_student_courses_course ON student_courses (course_code);
+"""
+
+
+def _connect_sqlite(db_file, schema):
+    Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_file, timeout=SQLITE_BUSY_TIMEOUT)
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+        # Switching to WAL ignores the busy timeout, so processes creating the database together take
+        # turns; callers may already hold file_lock(db_file) itself, hence the separate lock
+        with file_lock(f"{db_file}.wal-setup"):
+            conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(schema)
+    return conn
+
+
+def _sqlite_connect():
+    return _connect_sqlite(DATA_DIR / SQLITE_DB_FILE, SQLITE_SCHEMA)
+
+
+def write_course_sqlite(semester, course_code, results, student_ids=None):
+    """Upsert a course in one transaction; `student_ids` limits which student rows are rewritten"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    predictions = results.get('predictions', {})
+    course_meta = {key: value for key, value in results.items() if key not in ('students', 'predictions')}
+
+    student_rows = [
+        (str(student_id), semester, course_code, pickle.dumps(student_data),
+         pickle.dumps(predictions.get(student_id, {})), timestamp)
+        for student_id, student_data in results['students'].items()
+        if student_ids is None or student_id in student_ids
+    ]
+
+    conn = _sqlite_connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO courses VALUES (?, ?, ?, ?)",
+                         (semester, course_code, pickle.dumps(course_meta), timestamp))
+            if student_ids is None:
+                conn.execute("DELETE FROM student_courses WHERE semester = ? AND course_code = ?",
+                             (semester, course_code))
+            # Upsert keeps the rowid, so students stay in upload order after a delta
+            conn.executemany(
+                "INSERT INTO student_courses VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (semester, course_code, student_id) DO UPDATE SET "
+                "student_data = excluded.student_data, prediction = excluded.prediction, "
+                "timestamp = excluded.timestamp", student_rows)
+    finally:
+        conn.close()
+
+
+def load_student_data_sqlite(student_id):
+    """Answer a load_student_data query with one indexed lookup"""
+    conn = _sqlite_connect()
+    try:
+        rows = conn.execute(
+            "SELECT s.semester, s.course_code, s.student_data, s.prediction, c.results, s.timestamp "
+            "FROM student_courses s JOIN courses c USING (semester, course_code) "
+            "WHERE s.student_id = ?", (str(student_id),)).fetchall()
+    finally:
+        conn.close()
+
+    student_data = {}
+    for semester, course_code, student_blob, prediction_blob, course_blob, timestamp in rows:
+        course_meta = pickle.loads(course_blob)
+        student_data[f"{semester}_{course_code}"] = {
+            'course_code': course_code,
+            'semester': semester,
+            'student_data': pickle.loads(student_blob),
+            **{field: course_meta.get(field, {}) for field in COURSE_WIDE_FIELDS},
+            'predictions': pickle.loads(prediction_blob) if prediction_blob else {},
+            'timestamp': timestamp
+        }
+    return student_data
+
+
+def _results_from_sqlite(course_blob, student_rows):
+    results = pickle.loads(course_blob)
+    results['students'] = {}
+    results['predictions'] = {}
+    for student_id, student_blob, prediction_blob in student_rows:
+        results['students'][student_id] = pickle.loads(student_blob)
+        prediction = pickle.loads(prediction_blob) if prediction_blob else {}
+        if prediction:
+            results['predictions'][student_id] = prediction
+    return results
+
+
+def read_course_sqlite(semester, course_code):
+    """Load one course's full results, or None if it was never saved"""
+    conn = _sqlite_connect()
+    try:
+        course = conn.execute("SELECT results FROM courses WHERE semester = ? AND course_code = ?",
+                              (semester, course_code)).fetchone()
+        if course is None:
+            return None
+        student_rows = conn.execute(
+            "SELECT student_id, student_data, prediction FROM student_courses "
+            "WHERE semester = ? AND course_code = ? ORDER BY rowid", (semester, course_code)).fetchall()
+    finally:
+        conn.close()
+    return _results_from_sqlite(course[0], student_rows)
+
+
+def load_all_courses_sqlite():
+    """Load every course's full results from the database"""
+    conn = _sqlite_connect()
+    try:
+        courses = conn.execute("SELECT semester, course_code, results FROM courses").fetchall()
+        grouped = {(semester, course_code): [] for semester, course_code, _ in courses}
+        for semester, course_code, *row in conn.execute(
+                "SELECT semester, course_code, student_id, student_data, prediction FROM student_courses "
+                "ORDER BY rowid"):
+            grouped.setdefault((semester, course_code), []).append(row)
+    finally:
+        conn.close()
+
+    return {f"{semester} - {course_code}": _results_from_sqlite(course_blob, grouped[(semester, course_code)])
+            for semester, course_code, course_blob in courses}
+
+
+def migrate_pickles_to_sqlite():
+    """One-time migration of every course_*.pkl into the database; returns the number of courses"""
+    migrated = 0
+    for course_file in sorted(DATA_DIR.glob("course_*.pkl")):
+        with open(course_file, 'rb') as f:
+            results = pickle.load(f)
+        write_course_sqlite(results['semester'], results['course_code'], results)
+        update_course_index(results['semester'], results['course_code'], results)
+        migrated += 1
+
+    _sqlite_connect().close()
+    return migrated
+
+
+# ==============================================================================
+# GRADE SCALES
+# ==============================================================================
+# grade_scales.json holds admin-defined scales and the name of the active one:
+# {"active": name, "scales": {name: [[min_marks, grade, points, description], ...]}}
+GRADE_SCALES_FILE = "grade_scales.json"
+
+
+def _read_grade_scales_file(scales_file):
+    if scales_file.exists():
+        with open(scales_file, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def _grade_scale_settings():
+    scales_file = DATA_DIR / GRADE_SCALES_FILE
+    try:
+        return cached_load(('grade_scales',), [scales_file], lambda: _read_grade_scales_file(scales_file))
+    except Exception:
+        return {}
+
+
+def load_grade_scales():
+    """Built-in and admin-defined grade scales by name"""
+    custom = {name: [tuple(row) for row in rows] for name, rows in _grade_scale_settings().get('scales', {}).items()}
+    return {**BUILTIN_GRADE_SCALES, **custom}
+
+
+def get_active_grade_scale():
+    """(name, rows) of the scale applied to new uploads"""
+    scales = load_grade_scales()
+    name = _grade_scale_settings().get('active', DEFAULT_GRADE_SCALE_NAME)
+    if name not in scales:
+        name = DEFAULT_GRADE_SCALE_NAME
+    return name, scales[name]
+
+
+def validate_grade_scale(rows):
+    """Normalise scale rows to (min_marks, grade, points, description), highest band first
+
+    Raises ValueError describing the first problem found.
+    """
+    scale = []
+    for number, row in enumerate(rows, start=1):
+        if len(row) < 3:
+            raise ValueError(f"Row {number}: needs minimum marks, grade and points")
+        min_marks, grade, points = row[0], str(row[1]).strip(), row[2]
+        description = str(row[3]).strip() if len(row) > 3 and row[3] is not None else ""
+        try:
+            min_marks, points = float(min_marks), float(points)
+        except (TypeError, ValueError):
+            raise ValueError(f"Row {number}: minimum marks and points must be numbers")
+        if not 0 <= min_marks <= 100:
+            raise ValueError(f"Row {number}: minimum marks must be between 0 and 100")
+        if points < 0 or not grade:
+            raise ValueError(f"Row {number}: needs a grade and non-negative points")
+        scale.append((min_marks, grade, points, description))
+
+    if not scale:
+        raise ValueError("A grade scale needs at least one row")
+    boundaries = [row[0] for row in scale]
+    if len(set(boundaries)) != len(boundaries):
+        raise ValueError("Minimum marks must be unique")
+    if min(boundaries) != 0:
+        raise ValueError("The lowest band must start at 0 marks")
+    return sorted(scale, key=lambda row: row[0], reverse=True)
+
+
+def _update_grade_scale_settings(change):
+    scales_file = DATA_DIR / GRADE_SCALES_FILE
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    with file_lock(scales_file):
+        settings = deepcopy(_read_grade_scales_file(scales_file))
+        change(settings)
+        write_file_atomic(scales_file, lambda f: json.dump(settings, f, indent=4), mode='w')
+
+
+def save_grade_scale(name, rows):
+    """Add or replace an admin-defined scale; built-in scales cannot be overwritten"""
+    if name in BUILTIN_GRADE_SCALES:
+        raise ValueError(f"'{name}' is a built-in scale - save your variant under a new name")
+    scale = validate_grade_scale(rows)
+    _update_grade_scale_settings(
+        lambda settings: settings.setdefault('scales', {}).__setitem__(name, [list(row) for row in scale]))
+    return scale
+
+
+def set_active_grade_scale(name):
+    """Choose the scale applied to new uploads"""
+    if name not in load_grade_scales():
+        raise ValueError(f"Unknown grade scale '{name}'")
+    _update_grade_scale_settings(lambda settings: settings.__setitem__('active', name))
+
+
+def regrade_results(results, scale_name=None):
+    """Re-grade every student of a course under another scale in one vectorized pass
+
+    Grades, SGPA, pass/fail status, the course's pass figures and the AI
+    predictions (which use SGPA) all follow the new scale.
+    """
+    scales = load_grade_scales()
+    scale_name = scale_name or get_active_grade_scale()[0]
+    compiled = compile_grade_scale(scales[scale_name])
+
+    students = list(results['students'].values())
+    total_marks = [student['total_marks'] for student in students]
+    grades, points = grade_marks(total_marks, compiled)
+    passing = passing_marks(total_marks, compiled)
+    for student, grade, sgpa, passed in zip(students, grades.tolist(), points.tolist(), passing.tolist()):
+        student['grade'] = grade
+        student['sgpa'] = sgpa
+        student['grade_desc'] = compiled['descriptions'].get(grade, "Unknown")
+        student['status'] = 'Pass' if passed else 'Fail'
+
+    if students:
+        passing_students = int(passing.sum())
+        results['course_stats'].update({
+            'average_sgpa': round(float(points.mean()), 2),
+            'passing_students': passing_students,
+            'pass_percentage': round(passing_students / len(students) * 100, 1),
+            'fail_percentage': round((len(students) - passing_students) / len(students) * 100, 1)
+        })
+    if results.get('running_totals'):
+        results['running_totals']['sum_sgpa'] = float(points.sum())
+        results['running_totals']['passing'] = int(passing.sum())
+    results['grade_scale'] = scale_name
+    results['predictions'] = generate_ai_predictions(results)
+    return results
+
+
+def regrade_semester(semester, scale_name=None):
+    """Re-grade and re-save every stored course of a semester; returns (courses, students) regraded"""
+    courses = students = 0
+    for course in load_course_catalog().values():
+        if course['semester'] != semester:
+            continue
+        results = load_course_results(semester, course['course_code'])
+        if results is None:
+            continue
+        regrade_results(results, scale_name)
+        persist_course_data(semester, course['course_code'], results)
+        courses += 1
+        students += len(results['students'])
+    return courses, students
+
+
+# ==============================================================================
+# CO ATTAINMENT RECOMPUTE
+# ==============================================================================
+def recompute_co_attainment(results, attainment_config=None):
+    """Re-measure a stored course's CO and PO attainment from its students' CO scores
+
+    Settings in `attainment_config` override the course's own; the rest are kept.
+    """
+    config = normalize_attainment_config({**(results.get('attainment_config') or {}), **(attainment_config or {})})
+    results['attainment_config'] = config
+    results.pop('co_attainment_levels', None)
+
+    co_names = list(results.get('co_attainment') or {}) or None
+    co_frame = course_co_frame(results['students'].values(), co_names)
+    if co_frame.empty:
+        return results
+
+    results['co_attainment'], results['co_attainment_levels'] = calculate_co_attainment(co_frame, config)
+    mapping = results.get('co_po_mapping') or sparse_copo_mapping(create_default_copo_mapping())
+    results['po_attainment'] = calculate_po_attainment(
+        {co: score / 5 for co, score in results['co_attainment'].items()},
+        mapping
+    )
+    return results
+
+
+def recompute_stored_attainment(semester=None, course_code=None, attainment_config=None):
+    """Batch job: recompute CO/PO attainment of stored courses without re-uploading them
+
+    Limited to one semester and/or course if given. Returns the number of courses updated.
+    """
+    courses = 0
+    for course in load_course_catalog().values():
+        if semester and course['semester'] != semester:
+            continue
+        if course_code and course['course_code'] != course_code:
+            continue
+        results = load_course_results(course['semester'], course['course_code'])
+        if results is None:
+            continue
+        recompute_co_attainment(results, attainment_config)
+        # Student records are unchanged; course-wide figures are read from the course index
+        persist_course_data(course['semester'], course['course_code'], results, student_ids=[])
+        courses += 1
+    return courses
+
+
+# ==============================================================================
+# PROGRAM ROLLUP
+# ==============================================================================
+PROGRAM_ROLLUP_FILE = "program_rollup.json"
+
+
+def _rollup_contribution(entry):
+    """One course's share of the program rollup, weighted by credit hours x enrolled students"""
+    weight = float(entry.get('credit_hours') or DEFAULT_CREDIT_HOURS) * entry.get('student_count', 0)
+    co_values = list((entry.get('co_attainment') or {}).values())
+    return {
+        'semester': entry['semester'],
+        'course_code': entry['course_code'],
+        'credit_hours': float(entry.get('credit_hours') or DEFAULT_CREDIT_HOURS),
+        'students': entry.get('student_count', 0),
+        'weight': weight,
+        'co_attainment': float(np.mean(co_values)) if co_values else None,
+        'po_attainment': {po: float(value) for po, value in (entry.get('po_attainment') or {}).items()}
+    }
+
+
+def _apply_rollup_contribution(rollup, contribution, sign):
+    totals = rollup['semesters'].setdefault(contribution['semester'], {
+        'courses': 0, 'students': 0, 'weight': 0.0,
+        'co_sum': 0.0, 'co_weight': 0.0, 'po_sums': {}, 'po_weights': {}
+    })
+    weight = contribution['weight']
+    totals['courses'] += sign
+    totals['students'] += sign * contribution['students']
+    totals['weight'] += sign * weight
+    if contribution['co_attainment'] is not None:
+        totals['co_sum'] += sign * weight * contribution['co_attainment']
+        totals['co_weight'] += sign * weight
+    for po, value in contribution['po_attainment'].items():
+        totals['po_sums'][po] = totals['po_sums'].get(po, 0.0) + sign * weight * value
+        totals['po_weights'][po] = totals['po_weights'].get(po, 0.0) + sign * weight
+    if totals['courses'] <= 0:
+        del rollup['semesters'][contribution['semester']]
+
+
+def _read_program_rollup(rollup_file):
+    try:
+        if rollup_file.exists():
+            with open(rollup_file, 'r') as f:
+                return json.load(f)
+    except Exception:
+        pass
+    return None
+
+
+def _write_program_rollup(rollup):
+    write_file_atomic(DATA_DIR / PROGRAM_ROLLUP_FILE, lambda f: json.dump(rollup, f, indent=4), mode='w')
+
+
+def _build_program_rollup(catalog):
+    rollup = {'courses': {}, 'semesters': {}}
+    for entry in catalog.values():
+        contribution = _rollup_contribution(entry)
+        rollup['courses'][f"{entry['semester']}_{entry['course_code']}"] = contribution
+        _apply_rollup_contribution(rollup, contribution, 1)
+    return rollup
+
+
+def update_program_rollup(semester, course_code, results):
+    """Swap one course's contribution in the program rollup instead of re-reading every course"""
+    rollup_file = DATA_DIR / PROGRAM_ROLLUP_FILE
+    with file_lock(rollup_file):
+        rollup = _read_program_rollup(rollup_file)
+        if rollup is None:
+            # First save since the rollup existed: the index already holds this course
+            rollup = _build_program_rollup(load_course_catalog())
+        else:
+            course_key = f"{semester}_{course_code}"
+            previous = rollup['courses'].pop(course_key, None)
+            if previous is not None:
+                _apply_rollup_contribution(rollup, previous, -1)
+            contribution = _rollup_contribution(_course_index_entry(semester, course_code, results))
+            rollup['courses'][course_key] = contribution
+            _apply_rollup_contribution(rollup, contribution, 1)
+        _write_program_rollup(rollup)
+
+
+def rebuild_program_rollup():
+    """Recompute the program rollup from the course catalog, e.g. for stores saved before it existed"""
+    with file_lock(DATA_DIR / PROGRAM_ROLLUP_FILE):
+        rollup = _build_program_rollup(load_course_catalog())
+        _write_program_rollup(rollup)
+    clear_load_cache()
+    return rollup
+
+
+def load_program_rollup():
+    """The maintained program rollup, built once from the catalog if it does not exist yet"""
+    rollup_file = DATA_DIR / PROGRAM_ROLLUP_FILE
+    rollup = cached_load(('program_rollup',), [rollup_file], lambda: _read_program_rollup(rollup_file))
+    if rollup is None and load_course_catalog():
+        rollup = rebuild_program_rollup()
+    return rollup or {'courses': {}, 'semesters': {}}
+
+
+def _rollup_row(label, totals_list):
+    weight = sum(totals['weight'] for totals in totals_list)
+    co_weight = sum(totals['co_weight'] for totals in totals_list)
+    row = {
+        'Semester': label,
+        'Courses': sum(totals['courses'] for totals in totals_list),
+        'Enrolments': sum(totals['students'] for totals in totals_list),
+        'Credit-weighted Enrolment': round(weight, 1),
+        'CO Attainment': round(sum(totals['co_sum'] for totals in totals_list) / co_weight, 2) if co_weight > 0 else None
+    }
+    pos = sorted({po for totals in totals_list for po in totals['po_weights']}, key=_outcome_sort_key)
+    for po in pos:
+        po_weight = sum(totals['po_weights'].get(po, 0.0) for totals in totals_list)
+        po_sum = sum(totals['po_sums'].get(po, 0.0) for totals in totals_list)
+        row[po] = round(po_sum / po_weight, 2) if po_weight > 0 else None
+    return row
+
+
+def program_attainment_table(rollup=None):
+    """Program-level CO/PO attainment per semester plus an all-semesters row
+
+    Every course counts with weight credit hours x enrolled students; a PO is
+    averaged only over the courses that map to it.
+    """
+    rollup = rollup or load_program_rollup()
+    semesters = rollup['semesters']
+    if not semesters:
+        return pd.DataFrame()
+
+    rows = [_rollup_row(semester, [semesters[semester]]) for semester in sorted(semesters, key=semester_sort_key)]
+    rows.append(_rollup_row("All semesters", list(semesters.values())))
+    table = pd.DataFrame(rows)
+    summary_columns = ['Semester', 'Courses', 'Enrolments', 'Credit-weighted Enrolment', 'CO Attainment']
+    po_columns = sorted((column for column in table.columns if column not in summary_columns), key=_outcome_sort_key)
+    return table[summary_columns + po_columns]
+
+
+def program_course_contributions(rollup=None, semester=None):
+    """Per-course rows behind the rollup: credit hours, enrolment, weight and PO attainment"""
+    rollup = rollup or load_program_rollup()
+    rows = [{
+        'Semester': course['semester'],
+        'Course': course['course_code'],
+        'Credit Hours': course['credit_hours'],
+        'Students': course['students'],
+        'Weight': course['weight'],
+        'CO Attainment': round(course['co_attainment'], 2) if course['co_attainment'] is not None else None,
+        **course['po_attainment']
+    } for course in rollup['courses'].values() if semester is None or course['semester'] == semester]
+    return pd.DataFrame(rows)
+
+
+# ==============================================================================
+# TRANSCRIPTS
+# ==============================================================================
+# A materialized transcript per student: one row per course taken, with the
+# course's real credit hours, and one row per semester with SGPA and the
+# running CGPA in chronological order. Kept in its own SQLite database next
+# to whichever course store is active; each save rewrites only the rows of
+# the students it touched.
+TRANSCRIPTS_DB_FILE = "transcripts.db"
+
+TRANSCRIPTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcript_courses (
+    student_id TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    course_code TEXT NOT NULL,
+    credit_hours REAL NOT NULL,
+    total_marks REAL,
+    grade TEXT,
+    sgpa REAL NOT NULL,
+    status TEXT,
+    PRIMARY KEY (student_id, semester, course_code)
+);
+CREATE INDEX IF NOT EXISTS idx_transcript_courses_course ON transcript_courses (semester, course_code);
+CREATE TABLE IF NOT EXISTS transcript_students (
+    student_id TEXT PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS transcript_semesters (
+    student_id TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    term_rank INTEGER NOT NULL,
+    semester_credits REAL NOT NULL,
+    semester_sgpa REAL NOT NULL,
+    credits_completed REAL NOT NULL,
+    cumulative_cgpa REAL NOT NULL,
+    PRIMARY KEY (student_id, semester)
+);
+"""
+
+SEMESTER_TERMS = {'winter': 0, 'spring': 1, 'summer': 2, 'fall': 3, 'autumn': 3}
+
+
+def semester_sort_key(semester):
+    """Chronological sort key for names like "Spring 2025" (year first, then term)
+
+    Names that are not "<term> <year>" sort after all others, alphabetically.
+    """
+    parts = str(semester).split()
+    if len(parts) == 2 and parts[0].lower() in SEMESTER_TERMS and parts[1].isdigit():
+        return (0, int(parts[1]), SEMESTER_TERMS[parts[0].lower()], '')
+    return (1, 0, 0, str(semester))
+
+
+def _term_rank(semester):
+    unparsed, year, term, _ = semester_sort_key(semester)
+    return 10 ** 6 if unparsed else year * 10 + term
+
+
+def _transcripts_connect():
+    return _connect_sqlite(DATA_DIR / TRANSCRIPTS_DB_FILE, TRANSCRIPTS_SCHEMA)
+
+
+def _transcript_name_rows(results, student_ids=None):
+    return [(str(student_id), student.get('name'))
+            for student_id, student in results['students'].items()
+            if student_ids is None or student_id in student_ids]
+
+
+def _transcript_course_rows(semester, course_code, results, student_ids=None):
+    credit_hours = float(results.get('credit_hours') or DEFAULT_CREDIT_HOURS)
+    return [(str(student_id), semester, course_code, credit_hours, student.get('total_marks'),
+             student.get('grade'), float(student.get('sgpa', 0.0)), student.get('status'))
+            for student_id, student in results['students'].items()
+            if student_ids is None or student_id in student_ids]
+
+
+def _refresh_transcript_semesters(conn, affected_ids):
+    """Recompute semester SGPA and running CGPA of the given students in one grouped pass"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS affected_students (student_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM affected_students")
+    conn.executemany("INSERT OR IGNORE INTO affected_students VALUES (?)", [(str(sid),) for sid in affected_ids])
+
+    courses = pd.read_sql_query(
+        "SELECT c.student_id, c.semester, c.course_code, c.credit_hours, c.sgpa FROM transcript_courses c "
+        "JOIN affected_students a USING (student_id)", conn)
+    conn.execute("DELETE FROM transcript_semesters WHERE student_id IN (SELECT student_id FROM affected_students)")
+    if courses.empty:
+        return
+
+    courses['points'] = courses['sgpa'] * courses['credit_hours']
+    semesters = courses.groupby(['student_id', 'semester'], sort=False).agg(
+        semester_credits=('credit_hours', 'sum'),
+        points=('points', 'sum')
+    ).reset_index()
+    semesters['term_rank'] = semesters['semester'].map({name: _term_rank(name) for name in semesters['semester'].unique()})
+    semesters = semesters.sort_values(['student_id', 'term_rank', 'semester'], kind='stable')
+
+    running = semesters.groupby('student_id', sort=False)
+    semesters['credits_completed'] = running['semester_credits'].cumsum()
+    cumulative_points = running['points'].cumsum()
+    credits = semesters['semester_credits']
+    semesters['semester_sgpa'] = np.where(credits > 0, semesters['points'] / credits.where(credits > 0, 1), 0.0)
+    completed = semesters['credits_completed']
+    semesters['cumulative_cgpa'] = np.where(completed > 0, cumulative_points / completed.where(completed > 0, 1), 0.0)
+
+    columns = ['student_id', 'semester', 'term_rank', 'semester_credits', 'semester_sgpa',
+               'credits_completed', 'cumulative_cgpa']
+    conn.executemany("INSERT INTO transcript_semesters VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     zip(*(semesters[column].tolist() for column in columns)))
+
+
+def update_transcripts(semester, course_code, results, student_ids=None):
+    """Write one course's results into the materialized transcripts
+
+    `student_ids` limits the students updated (delta uploads); a full save
+    also drops students no longer in the course. Stores that predate the
+    transcripts are backfilled from every stored course on first use.
+    """
+    if not (DATA_DIR / TRANSCRIPTS_DB_FILE).exists():
+        rebuild_transcripts()
+        return
+
+    rows = _transcript_course_rows(semester, course_code, results, student_ids)
+    conn = _transcripts_connect()
+    try:
+        with conn:
+            affected = {row[0] for row in rows}
+            if student_ids is None:
+                kept = {str(student_id) for student_id in results['students']}
+                affected |= {student_id for (student_id,) in conn.execute(
+                    "SELECT student_id FROM transcript_courses WHERE semester = ? AND course_code = ?",
+                    (semester, course_code)) if student_id not in kept}
+                conn.execute("DELETE FROM transcript_courses WHERE semester = ? AND course_code = ?",
+                             (semester, course_code))
+            conn.executemany("INSERT OR REPLACE INTO transcript_courses VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT OR REPLACE INTO transcript_students VALUES (?, ?)",
+                             _transcript_name_rows(results, student_ids))
+            if affected:
+                _refresh_transcript_semesters(conn, affected)
+    finally:
+        conn.close()
+
+
+def rebuild_transcripts():
+    """Recompute every student's transcript from the stored courses; returns the number of students"""
+    transcripts_file = DATA_DIR / TRANSCRIPTS_DB_FILE
+    with file_lock(transcripts_file):
+        conn = _transcripts_connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM transcript_courses")
+                for course in load_course_catalog().values():
+                    results = load_course_results(course['semester'], course['course_code'])
+                    if results is not None:
+                        conn.executemany("INSERT OR REPLACE INTO transcript_courses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                         _transcript_course_rows(course['semester'], course['course_code'], results))
+                        conn.executemany("INSERT OR REPLACE INTO transcript_students VALUES (?, ?)",
+                                         _transcript_name_rows(results))
+                students = [student_id for (student_id,) in
+                            conn.execute("SELECT DISTINCT student_id FROM transcript_courses")]
+                _refresh_transcript_semesters(conn, students)
+        finally:
+            conn.close()
+    return len(students)
+
+
+def _ensure_transcripts():
+    """Backfill the transcripts of a store that predates them; False if nothing is stored"""
+    if (DATA_DIR / TRANSCRIPTS_DB_FILE).exists():
+        return True
+    if not load_course_catalog():
+        return False
+    rebuild_transcripts()
+    return True
+
+
+def load_student_transcript(student_id):
+    """A student's materialized transcript: courses and semester/CGPA rows, oldest semester first
+
+    Returns {'courses': [...], 'semesters': [...], 'cgpa': float, 'credits_completed': float}.
+    """
+    if not _ensure_transcripts():
+        return {'courses': [], 'semesters': [], 'cgpa': 0.0, 'credits_completed': 0.0}
+
+    conn = _transcripts_connect()
+    try:
+        semester_rows = conn.execute(
+            "SELECT semester, semester_credits, semester_sgpa, credits_completed, cumulative_cgpa "
+            "FROM transcript_semesters WHERE student_id = ? ORDER BY term_rank, semester",
+            (str(student_id),)).fetchall()
+        course_rows = conn.execute(
+            "SELECT c.semester, c.course_code, c.credit_hours, c.total_marks, c.grade, c.sgpa, c.status "
+            "FROM transcript_courses c JOIN transcript_semesters s USING (student_id, semester) "
+            "WHERE c.student_id = ? ORDER BY s.term_rank, c.semester, c.course_code",
+            (str(student_id),)).fetchall()
+    finally:
+        conn.close()
+
+    courses = [dict(zip(('semester', 'course_code', 'credit_hours', 'total_marks', 'grade', 'sgpa', 'status'), row))
+               for row in course_rows]
+    semesters = [{
+        'semester': semester,
+        'courses': [course['course_code'] for course in courses if course['semester'] == semester],
+        'semester_credits': semester_credits,
+        'semester_sgpa': round(semester_sgpa, 2),
+        'cumulative_cgpa': round(cumulative_cgpa, 2),
+        'credits_completed': credits_completed
+    } for semester, semester_credits, semester_sgpa, credits_completed, cumulative_cgpa in semester_rows]
+
+    return {
+        'courses': courses,
+        'semesters': semesters,
+        'cgpa': semesters[-1]['cumulative_cgpa'] if semesters else 0.0,
+        'credits_completed': semesters[-1]['credits_completed'] if semesters else 0.0
+    }
+
+
+# ==============================================================================
+# COHORT STANDINGS
+# ==============================================================================
+MERIT_LIST_MIN_CGPA = 3.75
+PROBATION_CGPA = 2.00
+
+STANDINGS_COLUMNS = ['Student_ID', 'Name', 'Batch', 'Latest Semester', 'Credits', 'SGPA', 'CGPA',
+                     'Rank', 'Percentile']
+
+
+def _transcript_files():
+    db_file = DATA_DIR / TRANSCRIPTS_DB_FILE
+    return [db_file, Path(f"{db_file}-wal")]
+
+
+def student_batches():
+    """{student_id: batch} of every student account that records a batch"""
+    return {str(account['student_id']): str(account.get('batch', ''))
+            for account in load_user_directory().get('students', {}).values()
+            if account.get('student_id')}
+
+
+def _compute_cohort_standings(batch, through_semester):
+    if not _ensure_transcripts():
+        return pd.DataFrame(columns=STANDINGS_COLUMNS)
+
+    # The latest materialized semester of each student already carries their running CGPA;
+    # SQLite returns the other columns from the row holding MAX(term_rank)
+    conn = _transcripts_connect()
+    try:
+        latest = pd.read_sql_query(
+            "SELECT s.student_id, s.semester, MAX(s.term_rank) AS term_rank, s.semester_sgpa, "
+            "s.credits_completed, s.cumulative_cgpa, n.name FROM transcript_semesters s "
+            "LEFT JOIN transcript_students n USING (student_id) WHERE s.term_rank <= ? GROUP BY s.student_id",
+            conn, params=(_term_rank(through_semester) if through_semester else 10 ** 6,))
+    finally:
+        conn.close()
+
+    batches = student_batches()
+    latest['batch'] = latest['student_id'].map(batches).fillna('')
+    if batch is not None:
+        latest = latest[latest['batch'] == batch]
+    if latest.empty:
+        return pd.DataFrame(columns=STANDINGS_COLUMNS)
+
+    cgpa = latest['cumulative_cgpa'].round(2)
+    standings = pd.DataFrame({
+        'Student_ID': latest['student_id'],
+        'Name': latest['name'].fillna(''),
+        'Batch': latest['batch'],
+        'Latest Semester': latest['semester'],
+        'Credits': latest['credits_completed'],
+        'SGPA': latest['semester_sgpa'].round(2),
+        'CGPA': cgpa,
+        # Ties share the better rank; percentile = share of the cohort at or below this CGPA
+        'Rank': cgpa.rank(ascending=False, method='min').astype(int),
+        'Percentile': (cgpa.rank(pct=True, method='max') * 100).round(1)
+    })
+    return standings.sort_values(['Rank', 'Student_ID'], kind='stable').reset_index(drop=True)
+
+
+def compute_cohort_standings(batch=None, through_semester=None):
+    """SGPA, CGPA, rank and percentile of every student of a batch in one grouped pass
+
+    `batch` limits the cohort to student accounts of that batch (None for
+    every stored student); `through_semester` ranks on results up to and
+    including that semester. Cached until the next upload or account change;
+    treat the result as read-only.
+    """
+    user_files = [USERS_FILE, USERS_DB_FILE, Path(f"{USERS_DB_FILE}-wal")]
+    return cached_load(('cohort_standings', batch, through_semester), _transcript_files() + user_files,
+                       lambda: _compute_cohort_standings(batch, through_semester))
+
+
+def merit_list(standings, min_cgpa=MERIT_LIST_MIN_CGPA, top=None):
+    """Students at or above `min_cgpa`, best first, optionally only the first `top`"""
+    merit = standings[standings['CGPA'] >= min_cgpa]
+    return merit.head(top) if top else merit
+
+
+def probation_list(standings, below_cgpa=PROBATION_CGPA):
+    """Students with a CGPA under `below_cgpa`, lowest first"""
+    return standings[standings['CGPA'] < below_cgpa].sort_values(['CGPA', 'Student_ID'], kind='stable')
+
+
+def student_standing(student_id, batch=None):
+    """One student's row of the cohort standings as a dict, or None if they have no results"""
+    standings = compute_cohort_standings(batch)
+    row = standings[standings['Student_ID'] == str(student_id)]
+    return row.iloc[0].to_dict() if not row.empty else None
+
+
+# ==============================================================================
+# PREDICTION MODEL STORE
+# ==============================================================================
+# Fitted prediction models are kept as numbered versions under course_data/models
+# and shared by every upload, session and batch job. The first large enough
+# course processed seeds version 1; after that models are refitted only on
+# request (System Settings, or `edutrack_cli.py train-models` from cron), on
+# every stored course at once. index.json records the versions and which one
+# is active.
+PREDICTION_MODELS_DIR = "models"
+PREDICTION_MODEL_KEEP_VERSIONS = 5
+PREDICTION_MODEL_MIN_FIT_ROWS = 3  # fewer students get rule-based predictions
+PREDICTION_MODEL_MIN_SEED_ROWS = 30  # smaller courses fit their own models instead of seeding the shared ones
+
+
+def _models_dir():
+    return DATA_DIR / PREDICTION_MODELS_DIR
+
+
+def _model_index_file():
+    return _models_dir() / "index.json"
+
+
+def _model_file(version):
+    return _models_dir() / f"prediction_models_v{version}.pkl"
+
+
+def _load_model_index():
+    try:
+        with open(_model_index_file(), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'active': None, 'versions': []}
+
+
+def _read_active_models():
+    version = _load_model_index().get('active')
+    if version is None:
+        return None
+    try:
+        with open(_model_file(version), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load_prediction_models():
+    """The active model version as {'version', 'academic', 'career', 'training_rows', ...}, or None
+
+    Loaded once per process and reused until another version is activated.
+    """
+    return cached_load(('prediction_models',), [_model_index_file()], _read_active_models)
+
+
+def list_prediction_models():
+    """Metadata of every kept model version, newest first, with an 'active' flag"""
+    index = _load_model_index()
+    return [{**entry, 'active': entry['version'] == index.get('active')}
+            for entry in sorted(index['versions'], key=lambda entry: entry['version'], reverse=True)]
+
+
+def _save_prediction_models(models, courses):
+    """Store fitted models as a new active version; the caller holds the index lock"""
+    index = _load_model_index()
+    version = max([entry['version'] for entry in index['versions']], default=0) + 1
+    models = {**models, 'version': version, 'trained_at': datetime.now().isoformat(timespec='seconds'),
+              'courses': courses}
+    write_file_atomic(_model_file(version), lambda f: pickle.dump(models, f))
+
+    index['versions'].append({'version': version, 'trained_at': models['trained_at'],
+                              'training_rows': models['training_rows'], 'courses': len(courses)})
+    index['active'] = version
+    for stale in sorted(index['versions'], key=lambda entry: entry['version'])[:-PREDICTION_MODEL_KEEP_VERSIONS]:
+        _model_file(stale['version']).unlink(missing_ok=True)
+        index['versions'].remove(stale)
+    write_file_atomic(_model_index_file(), lambda f: json.dump(index, f, indent=4), mode='w')
+    return models
+
+
+def seed_prediction_models(X, semester, course_code):
+    """Fit and store the first model version from one course, unless another writer got there first
+
+    A course below PREDICTION_MODEL_MIN_SEED_ROWS students is too small to
+    stand in for every later upload: its models are fitted for this course
+    only and not stored.
+    """
+    if len(X) < PREDICTION_MODEL_MIN_SEED_ROWS:
+        return fit_prediction_models(X)
+
+    _models_dir().mkdir(parents=True, exist_ok=True)
+    with file_lock(_model_index_file()):
+        models = _read_active_models()
+        if models is None:
+            models = _save_prediction_models(fit_prediction_models(X), [f"{semester}_{course_code}"])
+    return models
+
+
+def train_prediction_models():
+    """Refit the models on every stored course and activate them as a new version
+
+    Returns the new version's metadata, or None with fewer than
+    PREDICTION_MODEL_MIN_FIT_ROWS stored students.
+    """
+    courses, matrices = [], []
+    for course in load_course_catalog().values():
+        results = load_course_results(course['semester'], course['course_code'])
+        if results and results.get('students'):
+            courses.append(f"{course['semester']}_{course['course_code']}")
+            matrices.append(prediction_features(results)[1])
+    if sum(len(X) for X in matrices) < PREDICTION_MODEL_MIN_FIT_ROWS:
+        return None
+
+    models = fit_prediction_models(np.vstack(matrices))
+    _models_dir().mkdir(parents=True, exist_ok=True)
+    with file_lock(_model_index_file()):
+        models = _save_prediction_models(models, courses)
+    return next(entry for entry in list_prediction_models() if entry['version'] == models['version'])
+
+
+def activate_prediction_models(version):
+    """Make a kept model version the active one again, e.g. to roll back a retrain"""
+    _models_dir().mkdir(parents=True, exist_ok=True)
+    with file_lock(_model_index_file()):
+        index = _load_model_index()
+        if version not in [entry['version'] for entry in index['versions']]:
+            raise ValueError(f"No stored prediction model version {version}")
+        index['active'] = version
+        write_file_atomic(_model_index_file(), lambda f: json.dump(index, f, indent=4), mode='w')
+
+
+# ==============================================================================
+# UPLOAD RESULT CACHE
+# ==============================================================================
+UPLOAD_CACHE_MAX_ENTRIES = 20
+
+
+def _upload_cache_dir():
+    return DATA_DIR / "upload_cache"
+
+
+def upload_cache_key(file_bytes, semester, course_code, co_po_mapping, credit_hours=None, attainment_config=None):
+    """Hash the uploaded file together with everything else that affects its results"""
+    digest = hashlib.sha256(file_bytes)
+    digest.update(f"|{semester}|{course_code}|{float(credit_hours or DEFAULT_CREDIT_HOURS)}|".encode())
+    digest.update(json.dumps(normalize_attainment_config(attainment_config), sort_keys=True).encode())
+    mapping = sparse_copo_mapping(co_po_mapping)
+    digest.update(json.dumps(mapping, sort_keys=True).encode() if mapping is not None else b"default")
+    digest.update(json.dumps(get_active_grade_scale()).encode())
+    digest.update(f"|models:{_load_model_index().get('active')}".encode())
+    return digest.hexdigest()
+
+
+def load_cached_results(upload_key):
+    """Return cached results for an upload key, or None on a miss"""
+    cache_file = _upload_cache_dir() / f"{upload_key}.pkl"
+    try:
+        if cache_file.exists():
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+    except Exception:
+        logger.warning("Ignoring unreadable upload cache entry %s", cache_file, exc_info=True)
+    return None
+
+
+def store_cached_results(upload_key, results):
+    """Cache processed results, evicting the oldest entries beyond the size limit"""
+    try:
+        write_file_atomic(_upload_cache_dir() / f"{upload_key}.pkl", lambda f: pickle.dump(results, f))
+
+        entries = sorted(_upload_cache_dir().glob("*.pkl"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in entries[UPLOAD_CACHE_MAX_ENTRIES:]:
+            stale.unlink()
+    except Exception:
+        logger.exception("Could not cache the results of upload %s", upload_key)
+
+
+def _load_upload_index():
+    index_file = _upload_cache_dir() / "index.json"
+    try:
+        if index_file.exists():
+            with open(index_file, 'r') as f:
+                return json.load(f)
+    except Exception:
+        logger.warning("Ignoring unreadable upload index %s", index_file, exc_info=True)
+    return {}
+
+
+def get_saved_upload_key(semester, course_code):
+    """Upload key of the results currently persisted for a course, if known"""
+    return _load_upload_index().get(f"{semester}_{course_code}")
+
+
+def record_saved_upload_key(semester, course_code, upload_key):
+    """Remember which upload the persisted course data came from"""
+    course_key = f"{semester}_{course_code}"
+    if _load_upload_index().get(course_key) == upload_key:
+        return
+
+    try:
+        _upload_cache_dir().mkdir(parents=True, exist_ok=True)
+        with file_lock(_upload_cache_dir() / "index.json"):
+            index = _load_upload_index()
+            if upload_key:
+                index[course_key] = upload_key
+            else:
+                index.pop(course_key, None)
+            write_file_atomic(_upload_cache_dir() / "index.json", lambda f: json.dump(index, f, indent=4), mode='w')
+    except Exception:
+        logger.exception("Could not record the upload key of %s", course_key)
+
+
+# ==============================================================================
+# USER DIRECTORY
+# ==============================================================================
+# users.json holds {category: {username: account}}, which is already the index
+# authentication needs. The parsed directory is shared by every session and
+# re-read only when the file changes. Large installations move accounts into
+# users.db (see USER STORE below), which the same functions then use.
+USERS_FILE = Path("users.json")
+USERS_DB_FILE = Path("users.db")
+
+# "json", "sqlite" or "auto" (users.db once it exists, users.json otherwise)
+USER_STORE_BACKEND = os.environ.get("EDUTRACK_USER_BACKEND", "auto")
+
+
+def active_user_backend():
+    """Name of the user store in use"""
+    if USER_STORE_BACKEND != "auto":
+        return USER_STORE_BACKEND
+    if USERS_DB_FILE.exists():
+        return "sqlite"
+    return "json"
+
+
+def hash_password(password):
+    """Hash password using SHA-256"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _hashed_default_users():
+    return {
+        "admins": {
+            "admin": {
+                "username": "admin",
+                "password": hash_password("admin123"),
+                "email": "admin@stamford.edu.bd",
+                "full_name": "System Administrator",
+                "department": "IT & Administration",
+                "designation": "System Admin",
+                "user_type": "admin"
+            }
+        },
+        "teachers": {
+            "teacher": {
+                "username": "teacher",
+                "password": hash_password("teacher123"),
+                "email": "teacher@stamford.edu.bd",
+                "full_name": "Dr. Dilshad Mahajabeen",
+                "department": "Electrical & Electronic Engineering",
+                "designation": "Professor & Chairman",
+                "user_type": "teacher"
+            }
+        },
+        "students": {
+            "student": {
+                "username": "student",
+                "password": hash_password("student123"),
+                "email": "student@stamford.edu.bd",
+                "full_name": "John Smith",
+                "student_id": "2021001",
+                "batch": "2021",
+                "guardian_email": "parent@email.com",
+                "user_type": "student"
+            },
+            "fahmida": {
+                "username": "fahmida",
+                "password": hash_password("fahmida123"),
+                "email": "fahmida@stamford.edu.bd",
+                "full_name": "Fahmida Islam",
+                "student_id": "2021002",
+                "batch": "2021",
+                "guardian_email": "parent2@email.com",
+                "user_type": "student"
+            },
+            "rowshan": {
+                "username": "rowshan",
+                "password": hash_password("rowshan123"),
+                "email": "rowshan@stamford.edu.bd",
+                "full_name": "Rowshan-E- Gule Jannat",
+                "student_id": "2021003",
+                "batch": "2021",
+                "guardian_email": "parent3@email.com",
+                "user_type": "student"
+            },
+            "sawkat": {
+                "username": "sawkat",
+                "password": hash_password("sawkat123"),
+                "email": "sawkat@stamford.edu.bd",
+                "full_name": "Sawkat Islam",
+                "student_id": "2021004",
+                "batch": "2021",
+                "guardian_email": "parent4@email.com",
+                "user_type": "student"
+            }
+        },
+        "parents": {
+            "parent": {
+                "username": "parent",
+                "password": hash_password("parent123"),
+                "email": "parent@email.com",
+                "full_name": "Sarah Johnson",
+                "student_linked": "2021001",
+                "user_type": "parent"
+            }
+        }
+    }
+
+
+def default_users():
+    """Built-in demo accounts used until users.json exists (hashed once per process)"""
+    return deepcopy(_hashed_default_users())
+
+
+def _read_users_file():
+    if USERS_FILE.exists():
+        with open(USERS_FILE, 'r') as f:
+            return json.load(f)
+    return default_users()
+
+
+def load_user_directory():
+    """All accounts keyed by category and username (cached; treat the result as read-only)"""
+    if active_user_backend() == "sqlite":
+        return cached_load(('users', 'sqlite'), [USERS_DB_FILE, Path(f"{USERS_DB_FILE}-wal")], _read_users_db)
+    return cached_load(('users',), [USERS_FILE], _read_users_file)
+
+
+def save_user_directory(users):
+    """Atomically replace users.json and keep the cached directory in step"""
+    if active_user_backend() == "sqlite":
+        _update_users_db(lambda current: _replace_accounts(current, users))
+        return
+    with file_lock(USERS_FILE):
+        _write_user_directory(users)
+
+
+def _write_user_directory(users):
+    write_file_atomic(USERS_FILE, lambda f: json.dump(users, f, indent=4), mode='w')
+    cached_load(('users',), [USERS_FILE], lambda: users)
+
+
+def update_user_directory(change):
+    """Apply `change(users)` under the users.json lock; it returns True if it changed anything
+
+    Only changed directories are written back; on the SQLite store only the
+    accounts `change` added, edited or removed are written. Returns what
+    `change` returned.
+    """
+    if active_user_backend() == "sqlite":
+        return _update_users_db(change)
+
+    with file_lock(USERS_FILE):
+        users = {category: dict(accounts) for category, accounts in load_user_directory().items()}
+        changed = change(users)
+        if changed:
+            _write_user_directory(users)
+    return changed
+
+
+def find_user(category, username):
+    """Look up one account by category ("students", ...) and username, or None"""
+    if active_user_backend() == "sqlite":
+        return _query_users_db("WHERE category = ? AND username = ?", (category, username), single=True)
+    return load_user_directory().get(category, {}).get(username)
+
+
+def add_user(category, username, account):
+    """Add an account as a single row; returns False if the username is taken"""
+    if active_user_backend() == "sqlite":
+        conn = _users_db_connect()
+        try:
+            with conn:
+                inserted = conn.execute("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?, ?)",
+                                        _user_row(category, username, account)).rowcount
+        finally:
+            conn.close()
+        return inserted == 1
+
+    def insert(users):
+        if username in users.setdefault(category, {}):
+            return False
+        users[category][username] = account
+        return True
+    return update_user_directory(insert)
+
+
+def remove_user(category, username):
+    """Delete one account; returns False if it did not exist"""
+    if active_user_backend() == "sqlite":
+        conn = _users_db_connect()
+        try:
+            with conn:
+                deleted = conn.execute("DELETE FROM users WHERE category = ? AND username = ?",
+                                       (category, username)).rowcount
+        finally:
+            conn.close()
+        return deleted == 1
+
+    def delete(users):
+        if username not in users.get(category, {}):
+            return False
+        del users[category][username]
+        return True
+    return update_user_directory(delete)
+
+
+def add_users(accounts):
+    """Add many (category, username, account) triples in one write
+
+    Usernames that are already taken are left untouched. Returns the
+    (category, username) pairs that were added.
+    """
+    added = []
+    if active_user_backend() == "sqlite":
+        conn = _users_db_connect()
+        try:
+            with conn:
+                for category, username, account in accounts:
+                    if conn.execute("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?, ?)",
+                                    _user_row(category, username, account)).rowcount:
+                        added.append((category, username))
+        finally:
+            conn.close()
+        return added
+
+    def insert_all(users):
+        for category, username, account in accounts:
+            if username not in users.setdefault(category, {}):
+                users[category][username] = account
+                added.append((category, username))
+        return bool(added)
+    update_user_directory(insert_all)
+    return added
+
+
+def list_users(offset=0, limit=None):
+    """One page of (category, username, account) triples in creation order"""
+    if active_user_backend() == "sqlite":
+        conn = _users_db_connect()
+        try:
+            rows = conn.execute("SELECT category, username, account FROM users ORDER BY rowid LIMIT ? OFFSET ?",
+                                (-1 if limit is None else limit, offset)).fetchall()
+        finally:
+            conn.close()
+        return [(category, username, json.loads(account)) for category, username, account in rows]
+
+    accounts = [(category, username, account)
+                for category, category_accounts in load_user_directory().items()
+                for username, account in category_accounts.items()]
+    return accounts[offset:None if limit is None else offset + limit]
+
+
+def count_users_by_type():
+    """Number of accounts per user_type without loading them"""
+    if active_user_backend() == "sqlite":
+        conn = _users_db_connect()
+        try:
+            return dict(conn.execute("SELECT user_type, COUNT(*) FROM users GROUP BY user_type").fetchall())
+        finally:
+            conn.close()
+
+    counts = {}
+    for category, accounts in load_user_directory().items():
+        for account in accounts.values():
+            user_type = account.get('user_type', category[:-1])
+            counts[user_type] = counts.get(user_type, 0) + 1
+    return counts
+
+
+# ==============================================================================
+# USER STORE (SQLITE)
+# ==============================================================================
+# One row per account, indexed on the three ways the app finds people, so a
+# registration or deletion touches one row instead of rewriting every account.
+USERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    category TEXT NOT NULL,
+    username TEXT NOT NULL,
+    user_type TEXT,
+    student_id TEXT,
+    student_linked TEXT,
+    account TEXT NOT NULL,
+    PRIMARY KEY (category, username)
+);
+CREATE INDEX IF NOT EXISTS idx_users_username ON users (username);
+CREATE INDEX IF NOT EXISTS idx_users_student_id ON users (student_id);
+CREATE INDEX IF NOT EXISTS idx_users_student_linked ON users (student_linked);
+"""
+
+
+def _users_db_connect():
+    return _connect_sqlite(USERS_DB_FILE, USERS_SCHEMA)
+
+
+def _user_row(category, username, account):
+    return (category, username, account.get('user_type', category[:-1]),
+            str(account.get('student_id', '')), str(account.get('student_linked', '')), json.dumps(account))
+
+
+def _query_users_db(where, params, single=False):
+    conn = _users_db_connect()
+    try:
+        rows = conn.execute(f"SELECT account FROM users {where}", params).fetchall()
+    finally:
+        conn.close()
+    accounts = [json.loads(row[0]) for row in rows]
+    if single:
+        return accounts[0] if accounts else None
+    return accounts
+
+
+def _read_users_db(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = _users_db_connect()
+    try:
+        rows = conn.execute("SELECT category, username, account FROM users ORDER BY rowid").fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+    users = {}
+    for category, username, account in rows:
+        users.setdefault(category, {})[username] = json.loads(account)
+    return users
+
+
+def _replace_users_db(users):
+    conn = _users_db_connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)",
+                             [_user_row(category, username, account)
+                              for category, accounts in users.items() for username, account in accounts.items()])
+    finally:
+        conn.close()
+
+
+def _replace_accounts(current, users):
+    current.clear()
+    current.update({category: dict(accounts) for category, accounts in users.items()})
+    return True
+
+
+def _update_users_db(change):
+    """Apply `change(users)` in one write transaction, writing only the accounts it touched
+
+    BEGIN IMMEDIATE takes the database write lock before the accounts are
+    read, so concurrent updates are applied one after the other instead of
+    overwriting each other.
+    """
+    conn = _users_db_connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = _read_users_db(conn)
+            users = deepcopy(before)
+            changed = change(users)
+            if changed:
+                old_keys = {(category, username) for category, accounts in before.items() for username in accounts}
+                new_keys = {(category, username) for category, accounts in users.items() for username in accounts}
+                edited = [(category, username, account)
+                          for category, accounts in users.items() for username, account in accounts.items()
+                          if (category, username) in old_keys and before[category][username] != account]
+                conn.executemany("DELETE FROM users WHERE category = ? AND username = ?", old_keys - new_keys)
+                conn.executemany(
+                    "UPDATE users SET user_type = ?, student_id = ?, student_linked = ?, account = ? "
+                    "WHERE category = ? AND username = ?",
+                    [_user_row(category, username, account)[2:] + (category, username)
+                     for category, username, account in edited])
+                conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)",
+                                 [_user_row(category, username, account)
+                                  for category, accounts in users.items() for username, account in accounts.items()
+                                  if (category, username) not in old_keys])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+    return changed
+
+
+def migrate_users_to_sqlite():
+    """One-time copy of users.json (or the default accounts) into users.db; returns the number of accounts"""
+    users = _read_users_file()
+    _replace_users_db(users)
+    return sum(len(accounts) for accounts in users.values())
+
+
+# ==============================================================================
+# ACCOUNT PROVISIONING
+# ==============================================================================
+# Student accounts use the student ID as username and parent accounts
+# "parent_<student ID>". Each new account gets a random initial password that
+# is returned once, for distribution, and stored only as a hash.
+PROVISION_PASSWORD_BYTES = 6
+PROVISION_POOL_MIN_ACCOUNTS = 2000  # below this, worker start-up costs more than hashing inline
+USER_LOOKUP_CHUNK = 300  # student IDs per IN query, well under SQLite's bound-parameter limit
+MISSING_TEXT_VALUES = {'', 'nan', 'none', 'null'}
+
+
+def hash_passwords(passwords, max_workers=None):
+    """Hash many passwords, spreading large batches over a process pool"""
+    if len(passwords) < PROVISION_POOL_MIN_ACCOUNTS:
+        return [hash_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunksize = max(1, len(passwords) // ((max_workers or os.cpu_count() or 1) * 4))
+        return list(executor.map(hash_password, passwords, chunksize=chunksize))
+
+
+def _has_email(value):
+    # Courses stored before blank cells were kept as '' carry the text 'nan' or 'None'
+    return value is not None and str(value).strip().lower() not in MISSING_TEXT_VALUES
+
+
+def _existing_course_accounts(student_ids):
+    """(student IDs with a student account, student IDs with a linked parent, taken usernames)
+
+    Only the accounts of the given students are looked up; on the SQLite
+    store that is a handful of indexed IN queries instead of loading every account.
+    """
+    if active_user_backend() != "sqlite":
+        users = load_user_directory()
+        return ({str(account.get('student_id', '')) for account in users.get('students', {}).values()},
+                {str(account.get('student_linked', '')) for account in users.get('parents', {}).values()},
+                {(category, username) for category, accounts in users.items() for username in accounts})
+
+    known_students, linked_parents, taken = set(), set(), set()
+    conn = _users_db_connect()
+    try:
+        for start in range(0, len(student_ids), USER_LOOKUP_CHUNK):
+            chunk = student_ids[start:start + USER_LOOKUP_CHUNK]
+            marks = ', '.join('?' * len(chunk))
+            known_students.update(row[0] for row in conn.execute(
+                f"SELECT student_id FROM users WHERE student_id IN ({marks}) AND category = 'students'", chunk))
+            linked_parents.update(row[0] for row in conn.execute(
+                f"SELECT student_linked FROM users WHERE student_linked IN ({marks}) AND category = 'parents'", chunk))
+            usernames = chunk + [f"parent_{student_id}" for student_id in chunk]
+            taken.update(conn.execute(
+                f"SELECT category, username FROM users WHERE username IN ({', '.join('?' * len(usernames))})",
+                usernames).fetchall())
+    finally:
+        conn.close()
+    return known_students, linked_parents, taken
+
+
+def plan_course_accounts(results, batch=''):
+    """Split a processed course's students into accounts to create and ones to skip
+
+    Returns (to_create, skipped); to_create holds (category, username, account)
+    triples without passwords, skipped holds (user_type, student_id, reason).
+    """
+    student_ids = [str(student_id) for student_id in results.get('students', {})]
+    known_students, linked_parents, taken = _existing_course_accounts(student_ids)
+
+    to_create, skipped = [], []
+    for student_id, student in zip(student_ids, results.get('students', {}).values()):
+        parent_email = student.get('parent_email') if _has_email(student.get('parent_email')) else ''
+
+        if student_id in known_students or ('students', student_id) in taken:
+            skipped.append(('student', student_id, "account exists"))
+        else:
+            to_create.append(('students', student_id, {
+                "username": student_id,
+                "full_name": student.get('name', ''),
+                "email": student.get('student_email', '') if _has_email(student.get('student_email')) else '',
+                "user_type": "student",
+                "student_id": student_id,
+                "batch": batch,
+                "guardian_email": parent_email
+            }))
+
+        parent_username = f"parent_{student_id}"
+        if not parent_email:
+            skipped.append(('parent', student_id, "no parent email"))
+        elif student_id in linked_parents or ('parents', parent_username) in taken:
+            skipped.append(('parent', student_id, "account exists"))
+        else:
+            to_create.append(('parents', parent_username, {
+                "username": parent_username,
+                "full_name": f"Parent of {student.get('name', student_id)}",
+                "email": parent_email,
+                "user_type": "parent",
+                "student_linked": student_id
+            }))
+
+    return to_create, skipped
+
+
+def provision_course_accounts(results, batch='', max_workers=None):
+    """Create every missing student and linked parent account of a processed course in one write
+
+    Returns a report with created/skipped counts per user type, the skipped
+    rows and a credentials table of the new accounts' initial passwords.
+    """
+    to_create, skipped = plan_course_accounts(results, batch)
+
+    passwords = [secrets.token_urlsafe(PROVISION_PASSWORD_BYTES) for _ in to_create]
+    for (category, username, account), password_hash in zip(to_create, hash_passwords(passwords, max_workers)):
+        account['password'] = password_hash
+
+    added = set(add_users(to_create))
+
+    credentials = []
+    for (category, username, account), password in zip(to_create, passwords):
+        if (category, username) not in added:
+            # Registered by someone else between planning and the write
+            skipped.append((account['user_type'], account.get('student_id', account.get('student_linked', '')),
+                            "account exists"))
+            continue
+        credentials.append({'username': username, 'user_type': account['user_type'],
+                            'full_name': account['full_name'], 'email': account['email'],
+                            'student_id': account.get('student_id', account.get('student_linked', '')),
+                            'initial_password': password})
+
+    credentials = pd.DataFrame(credentials, columns=['username', 'user_type', 'full_name', 'email', 'student_id',
+                                                     'initial_password'])
+    skipped = pd.DataFrame(skipped, columns=['user_type', 'student_id', 'reason'])
+
+    created_by_type = credentials['user_type'].value_counts()
+    skipped_by_type = skipped['user_type'].value_counts()
+    return {
+        'students_created': int(created_by_type.get('student', 0)),
+        'parents_created': int(created_by_type.get('parent', 0)),
+        'students_skipped': int(skipped_by_type.get('student', 0)),
+        'parents_skipped': int(skipped_by_type.get('parent', 0)),
+        'skipped': skipped,
+        'credentials': credentials
+    }
+
+
+# ==============================================================================
+# BATCH INGEST
+# ==============================================================================
+_batch_workbook = None
+
+
+def _init_batch_worker(workbook_bytes):
+    """Keep the workbook bytes in each worker so they are shipped once per process"""
+    global _batch_workbook
+    _batch_workbook = workbook_bytes
+
+
+def _process_sheet_job(job):
+    """Worker entry point: read one worksheet and build its course results"""
+    sheet_name, semester, course_code, credit_hours, co_po_mapping, attainment_config = job
+    df = pd.read_excel(BytesIO(_batch_workbook), sheet_name=sheet_name)
+
+    problems = validate_marksheet(df)
+    if not problems.empty:
+        first = problems.iloc[0]
+        raise ValueError(f"{len(problems)} validation problems (first: {first['Column']} - {first['Problem']})")
+
+    return build_course_results([df], semester, course_code, co_po_mapping, credit_hours, attainment_config)
+
+
+def list_workbook_sheets(source):
+    """List worksheet names of an Excel workbook"""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return pd.ExcelFile(source).sheet_names
+
+
+def process_workbook_batch(workbook_bytes, jobs, co_po_mapping=None, max_workers=None, attainment_config=None):
+    """Process one course per worksheet in parallel worker processes
+
+    `jobs` is a list of (sheet_name, semester, course_code, credit_hours)
+    tuples; `co_po_mapping` and `attainment_config` apply to every course.
+    Yields (job, results, invalid_rows, error) in completion order so the
+    caller can persist each course and report progress as sheets finish.
+    """
+    if not jobs:
+        return
+
+    max_workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker,
+                             initargs=(workbook_bytes,)) as executor:
+        futures = {
+            executor.submit(_process_sheet_job, (sheet_name, semester, course_code, credit_hours,
+                                                 co_po_mapping, attainment_config)):
+                (sheet_name, semester, course_code, credit_hours)
+            for sheet_name, semester, course_code, credit_hours in jobs
+        }
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                results, invalid_rows = future.result()
+                yield job, results, invalid_rows, None
+            except Exception as e:
+                yield job, None, [], str(e)
@@ -0,0 +1,62 @@
+"""Concurrent persist_course_data calls must not lose course or student records"""
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import edutrack_core  # noqa: E402
+from edutrack_cli import _stress_upload, make_stress_marksheet  # noqa: E402
+
+SEMESTER = "Stress Test"
+UPLOADS = 6
+STUDENTS = 40
+WORKERS = 4
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(edutrack_core, "DATA_DIR", tmp_path / "course_data")
+    edutrack_core.clear_load_cache()
+    yield edutrack_core.DATA_DIR
+    edutrack_core.clear_load_cache()
+
+
+def build_jobs(data_dir, backend):
+    # Courses share one student pool, so most students are written by several uploads at once
+    rng = np.random.default_rng(0)
+    pool = np.arange(10000, 10000 + STUDENTS * 2).astype(str)
+    jobs, expected = [], {}
+    for upload in range(UPLOADS):
+        course_code = f"STR{upload:03d}"
+        student_ids = list(rng.choice(pool, STUDENTS, replace=False))
+        results, _ = edutrack_core.build_course_results([make_stress_marksheet(student_ids, upload)],
+                                                        SEMESTER, course_code)
+        jobs.append((str(data_dir), backend, SEMESTER, course_code, results))
+        for student_id in student_ids:
+            expected.setdefault(student_id, set()).add(f"{SEMESTER}_{course_code}")
+    return jobs, expected
+
+
+@pytest.mark.parametrize("backend", ["pickle", "parquet", "sqlite"])
+@pytest.mark.parametrize("executor", [ThreadPoolExecutor, ProcessPoolExecutor], ids=["thread", "process"])
+def test_concurrent_persist_keeps_every_record(data_dir, monkeypatch, backend, executor):
+    monkeypatch.setattr(edutrack_core, "STORAGE_BACKEND", backend)
+    jobs, expected = build_jobs(data_dir, backend)
+
+    with executor(max_workers=WORKERS) as pool:
+        saved = list(pool.map(_stress_upload, jobs))
+    assert sorted(saved) == [job[3] for job in jobs]
+
+    edutrack_core.clear_load_cache()
+    catalog = edutrack_core.load_course_catalog()
+    for job in jobs:
+        assert edutrack_core.load_course_results(SEMESTER, job[3]) is not None
+        assert f"{SEMESTER} - {job[3]}" in catalog
+
+    lost = {student_id: courses - set(edutrack_core.load_student_data(student_id))
+            for student_id, courses in expected.items()}
+    assert {student_id: courses for student_id, courses in lost.items() if courses} == {}